@@ -5,11 +5,22 @@ from fastapi import Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.application.account.service import AccountService
-from app.core.security import decode_access_token
+from app.core.identity import identity_registry
+from app.core.result_cache import order_search_cache
+from app.core.security import AccessClaims, decode_access_claims
 from app.application.courier.service import CourierService
 from app.application.customer.service import CustomerService
 from app.application.order.service import OrderService
 from app.application.review.service import ReviewService
+from app.domain.account.repository import IAccountRepository
+from app.domain.courier.repository import ICourierRepository
+from app.domain.customer.repository import ICustomerRepository
+from app.infrastructure.cache import (
+    CachedAccountRepository,
+    CachedCourierRepository,
+    CachedCustomerRepository,
+    entity_cache,
+)
 from app.infrastructure.database import get_db
 from app.infrastructure.persistence import (
     AccountRepository,
@@ -20,19 +31,25 @@ from app.infrastructure.persistence import (
 )
 
 
-def get_account_repository(session: AsyncSession = Depends(get_db)) -> AccountRepository:
-    return AccountRepository(session)
+# Аккаунты, заказчики и курьеры — через кэш сущностей, если он включён (entity_cache_enabled).
+
+
+def get_account_repository(session: AsyncSession = Depends(get_db)) -> IAccountRepository:
+    repo = AccountRepository(session)
+    return CachedAccountRepository(repo, session) if entity_cache.enabled else repo
 
 
-def get_customer_repository(session: AsyncSession = Depends(get_db)) -> CustomerRepository:
-    return CustomerRepository(session)
+def get_customer_repository(session: AsyncSession = Depends(get_db)) -> ICustomerRepository:
+    repo = CustomerRepository(session)
+    return CachedCustomerRepository(repo, session) if entity_cache.enabled else repo
 
 
-def get_courier_repository(session: AsyncSession = Depends(get_db)) -> CourierRepository:
-    return CourierRepository(session)
+def get_courier_repository(session: AsyncSession = Depends(get_db)) -> ICourierRepository:
+    repo = CourierRepository(session)
+    return CachedCourierRepository(repo, session) if entity_cache.enabled else repo
 
 
-def get_account_service(repo: AccountRepository = Depends(get_account_repository)) -> AccountService:
+def get_account_service(repo: IAccountRepository = Depends(get_account_repository)) -> AccountService:
     return AccountService(repo)
 
 
@@ -45,12 +62,12 @@ def get_review_repository(session: AsyncSession = Depends(get_db)) -> ReviewRepo
 
 
 def get_customer_service(
-    repo: CustomerRepository = Depends(get_customer_repository),
+    repo: ICustomerRepository = Depends(get_customer_repository),
 ) -> CustomerService:
     return CustomerService(repo)
 
 
-def get_courier_service(repo: CourierRepository = Depends(get_courier_repository)) -> CourierService:
+def get_courier_service(repo: ICourierRepository = Depends(get_courier_repository)) -> CourierService:
     return CourierService(repo)
 
 
@@ -58,68 +75,98 @@ def get_order_service(
     repo: OrderRepository = Depends(get_order_repository),
     account_service: AccountService = Depends(get_account_service),
 ) -> OrderService:
-    return OrderService(repo, account_service)
+    return OrderService(repo, account_service, order_search_cache)
 
 
 def get_review_service(repo: ReviewRepository = Depends(get_review_repository)) -> ReviewService:
     return ReviewService(repo)
 
 
-# --- Авторизация: JWT → account_id, проверка ролей по БД ---
+# --- Авторизация: JWT → account_id и роль ---
+# Роль (customer_id/courier_id) берётся из claims токена без запроса в БД, если реестр
+# app.core.identity не сообщал об изменении роли аккаунта после выдачи токена.
+# Старые токены без claims и токены с устаревшими claims — проверка роли по БД.
+
+
+def _bearer_claims(authorization: str | None) -> AccessClaims | None:
+    if not authorization or not authorization.startswith("Bearer "):
+        return None
+    return decode_access_claims(authorization[7:].strip())
 
 
-async def get_current_account_id(
+async def get_access_claims(
     authorization: str | None = Header(None, alias="Authorization"),
-) -> int:
-    """Извлечь account_id из JWT (Bearer). 401 если нет/неверный токен."""
+) -> AccessClaims:
+    """Claims из JWT (Bearer). 401 если нет/неверный токен."""
     if not authorization or not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Требуется авторизация")
-    token = authorization[7:].strip()
-    account_id = decode_access_token(token)
-    if account_id is None:
+    claims = _bearer_claims(authorization)
+    if claims is None:
         raise HTTPException(status_code=401, detail="Неверный или истёкший токен")
-    return account_id
+    return claims
 
 
-async def get_optional_account_id(
+async def get_optional_access_claims(
     authorization: str | None = Header(None, alias="Authorization"),
+) -> AccessClaims | None:
+    """Claims из JWT если заголовок передан. Иначе None (без 401)."""
+    return _bearer_claims(authorization)
+
+
+async def get_current_account_id(claims: AccessClaims = Depends(get_access_claims)) -> int:
+    """Извлечь account_id из JWT (Bearer). 401 если нет/неверный токен."""
+    return claims.account_id
+
+
+async def get_optional_account_id(
+    claims: AccessClaims | None = Depends(get_optional_access_claims),
 ) -> int | None:
     """Извлечь account_id из JWT если заголовок передан. Иначе None (без 401)."""
-    if not authorization or not authorization.startswith("Bearer "):
-        return None
-    token = authorization[7:].strip()
-    return decode_access_token(token)
+    return claims.account_id if claims else None
+
+
+async def _resolve_customer_id(claims: AccessClaims, repo: ICustomerRepository) -> int | None:
+    if identity_registry.trusts(claims):
+        return claims.customer_id
+    customer = await repo.get_by_account_id(claims.account_id)
+    return customer.id if customer else None
+
+
+async def _resolve_courier_id(claims: AccessClaims, repo: ICourierRepository) -> int | None:
+    if identity_registry.trusts(claims):
+        return claims.courier_id
+    courier = await repo.get_by_account_id(claims.account_id)
+    return courier.id if courier else None
 
 
 async def get_optional_courier_id(
-    account_id: int | None = Depends(get_optional_account_id),
-    repo: CourierRepository = Depends(get_courier_repository),
+    claims: AccessClaims | None = Depends(get_optional_access_claims),
+    repo: ICourierRepository = Depends(get_courier_repository),
 ) -> int | None:
     """Если пользователь авторизован как курьер — вернуть courier_id, иначе None."""
-    if account_id is None:
+    if claims is None:
         return None
-    courier = await repo.get_by_account_id(account_id)
-    return courier.id if courier else None
+    return await _resolve_courier_id(claims, repo)
 
 
 async def get_current_customer_id(
-    account_id: int = Depends(get_current_account_id),
-    repo: CustomerRepository = Depends(get_customer_repository),
+    claims: AccessClaims = Depends(get_access_claims),
+    repo: ICustomerRepository = Depends(get_customer_repository),
 ) -> int:
     """Текущий пользователь должен быть заказчиком (есть запись в customers). 403 иначе."""
-    customer = await repo.get_by_account_id(account_id)
-    if not customer:
+    customer_id = await _resolve_customer_id(claims, repo)
+    if customer_id is None:
         raise HTTPException(
             status_code=403,
             detail="Доступ только для заказчика",
         )
-    return customer.id
+    return customer_id
 
 
 async def get_optional_current_customer_id(
     only_own: bool = Query(False, alias="only_own"),
-    account_id: int | None = Depends(get_optional_account_id),
-    repo: CustomerRepository = Depends(get_customer_repository),
+    claims: AccessClaims | None = Depends(get_optional_access_claims),
+    repo: ICustomerRepository = Depends(get_customer_repository),
 ) -> int | None:
     """
     Если `only_own=true`, то возвращаем customer_id текущего заказчика.
@@ -127,23 +174,23 @@ async def get_optional_current_customer_id(
     """
     if not only_own:
         return None
-    if account_id is None:
+    if claims is None:
         raise HTTPException(status_code=401, detail="Требуется авторизация")
-    customer = await repo.get_by_account_id(account_id)
-    if not customer:
+    customer_id = await _resolve_customer_id(claims, repo)
+    if customer_id is None:
         raise HTTPException(status_code=403, detail="Доступ только для заказчика")
-    return customer.id
+    return customer_id
 
 
 async def get_current_courier_id(
-    account_id: int = Depends(get_current_account_id),
-    repo: CourierRepository = Depends(get_courier_repository),
+    claims: AccessClaims = Depends(get_access_claims),
+    repo: ICourierRepository = Depends(get_courier_repository),
 ) -> int:
     """Текущий пользователь должен быть курьером. 403 иначе."""
-    courier = await repo.get_by_account_id(account_id)
-    if not courier:
+    courier_id = await _resolve_courier_id(claims, repo)
+    if courier_id is None:
         raise HTTPException(
             status_code=403,
             detail="Доступ только для курьера",
         )
-    return courier.id
+    return courier_id
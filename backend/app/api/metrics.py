@@ -0,0 +1,59 @@
+"""GET /metrics: метрики процесса API и Celery-воркеров в текстовом формате Prometheus."""
+
+import redis.asyncio as redis
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app.config import settings
+from app.core.metrics import Family, metrics
+from app.core.result_cache import order_search_cache
+from app.core.security import token_cache
+from app.infrastructure.cache import entity_cache
+from app.infrastructure.worker_metrics import worker_families
+
+router = APIRouter(tags=["metrics"])
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_redis: redis.Redis | None = None
+
+
+def _cache_families() -> list[Family]:
+    """Статистика кэшей (stats()): каждое числовое поле — gauge cache_<поле>{cache=...}."""
+    families: dict[str, Family] = {}
+    for cache, stats in (
+        ("token", token_cache.stats()),
+        ("entity", entity_cache.stats()),
+        ("order_search", order_search_cache.stats()),
+    ):
+        for key, value in stats.items():
+            if not isinstance(value, (int, float)):
+                continue
+            family = families.get(key)
+            if family is None:
+                family = families[key] = Family(f"cache_{key}", "gauge", f"Кэш: {key}")
+            family.samples.append(({"cache": cache}, int(value) if isinstance(value, bool) else value))
+    return list(families.values())
+
+
+metrics.add_collector(_cache_families)
+
+
+def _worker_redis() -> redis.Redis:
+    global _redis
+    if _redis is None:
+        _redis = redis.Redis.from_url(settings.redis_url, socket_timeout=1, socket_connect_timeout=1)
+    return _redis
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics() -> PlainTextResponse:
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+    body = metrics.render()
+    if settings.worker_metrics_enabled:
+        lines, families = await worker_families(_worker_redis())
+        for family in families:
+            lines.extend(family.render())
+        body += "\n".join(lines) + "\n"
+    return PlainTextResponse(body, media_type=CONTENT_TYPE)
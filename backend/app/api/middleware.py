@@ -0,0 +1,110 @@
+"""
+SqlTimingMiddleware: SQL-статистика каждого HTTP-запроса.
+MetricsMiddleware: запросы в обработке и гистограмма длительности по шаблону маршрута.
+
+Запросы к БД, выполненные при обработке (см. app.infrastructure.sql_stats), уходят
+в заголовок Server-Timing (db — число запросов и суммарное время, db-slowest — самый
+долгий, app — время до начала ответа) и в строку лога после окончания ответа.
+У потоковых ответов (выгрузка, /orders/stream) заголовок отправляется до тела, поэтому
+в нём только запросы до начала ответа; строка лога учитывает все.
+"""
+
+import logging
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.core.metrics import http_request_duration, http_requests_in_flight
+from app.infrastructure.sql_stats import QueryStats, track_queries
+
+logger = logging.getLogger("app.sql")
+
+
+def _one_line(statement: str | None, limit: int = 200) -> str | None:
+    if statement is None:
+        return None
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= limit else statement[:limit] + "…"
+
+
+def server_timing(stats: QueryStats, app_seconds: float) -> str:
+    parts = [f'db;dur={stats.seconds * 1000:.1f};desc="{stats.count} queries"']
+    if stats.count:
+        parts.append(f"db-slowest;dur={stats.slowest_seconds * 1000:.1f}")
+    parts.append(f"app;dur={app_seconds * 1000:.1f}")
+    return ", ".join(parts)
+
+
+class SqlTimingMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        with track_queries() as stats:
+            async def send_with_timing(message: Message) -> None:
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    header = server_timing(stats, time.perf_counter() - started)
+                    message["headers"] = [*message.get("headers", []), (b"server-timing", header.encode("latin-1"))]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                if settings.sql_request_log:
+                    logger.info(
+                        "request method=%s path=%s status=%s duration_ms=%.1f db_queries=%s db_ms=%.1f "
+                        "db_slowest_ms=%.1f db_slowest=%r",
+                        scope["method"], scope["path"], status, (time.perf_counter() - started) * 1000,
+                        stats.count, stats.seconds * 1000, stats.slowest_seconds * 1000,
+                        _one_line(stats.slowest_statement),
+                        extra={
+                            "http_method": scope["method"],
+                            "http_path": scope["path"],
+                            "http_status": status,
+                            "db_queries": stats.count,
+                            "db_ms": round(stats.seconds * 1000, 1),
+                            "db_slowest_ms": round(stats.slowest_seconds * 1000, 1),
+                            "db_slowest_statement": stats.slowest_statement,
+                        },
+                    )
+
+
+class MetricsMiddleware:
+    """Метка route — шаблон пути (/api/v1/orders/{order_id}), а не сам путь: число серий ограничено."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_flight.dec()
+            route = scope.get("route")
+            http_request_duration.labels(
+                scope["method"], getattr(route, "path", "unmatched"), str(status)
+            ).observe(time.perf_counter() - started)
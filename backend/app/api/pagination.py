@@ -0,0 +1,25 @@
+"""Keyset-пагинация: кодирование/декодирование непрозрачного курсора."""
+
+import base64
+import binascii
+import json
+from datetime import date, datetime
+
+
+def encode_cursor(sort: str, value: date | datetime, id: int) -> str:
+    """Курсор = base64url(JSON) с ключом сортировки, значением ключа и id последней строки."""
+    raw = json.dumps({"s": sort, "v": value.isoformat(), "id": id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> tuple[date | datetime, int]:
+    """Разобрать курсор. ValueError, если он повреждён или выдан для другой сортировки."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if data["s"] != sort:
+            raise ValueError("Курсор выдан для другой сортировки")
+        value = date.fromisoformat(data["v"]) if sort == "date_when" else datetime.fromisoformat(data["v"])
+        return value, int(data["id"])
+    except (KeyError, TypeError, json.JSONDecodeError, UnicodeDecodeError, binascii.Error) as e:
+        raise ValueError("Неверный курсор") from e
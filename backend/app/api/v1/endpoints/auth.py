@@ -1,11 +1,11 @@
-"""Логин и регистрация: phone + password → JWT с account_id (sub)."""
+"""Логин и регистрация: phone + password → JWT с account_id (sub) и claims роли."""
 
 from fastapi import APIRouter, Depends, HTTPException
 
 from app.api.dependencies import (
+    get_access_claims,
     get_account_service,
     get_courier_service,
-    get_current_account_id,
     get_customer_service,
 )
 from app.api.dto.account import AccountRead
@@ -13,35 +13,55 @@ from app.api.dto.auth import LoginRequest, RegisterRequest, TokenResponse
 from app.application.account.service import AccountService
 from app.application.courier.service import CourierService
 from app.application.customer.service import CustomerService
-from app.core.security import create_access_token
+from app.core.identity import identity_registry
+from app.core.security import AccessClaims, create_access_token
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
 @router.get("/me", response_model=AccountRead)
 async def get_me(
-    account_id: int = Depends(get_current_account_id),
+    claims: AccessClaims = Depends(get_access_claims),
     service: AccountService = Depends(get_account_service),
     customer_service: CustomerService = Depends(get_customer_service),
     courier_service: CourierService = Depends(get_courier_service),
 ):
-    """Текущий аккаунт по JWT. 401 если не авторизован. Роль по наличию в customers/couriers."""
-    account = await service.get_by_id(account_id)
+    """Текущий аккаунт по JWT. 401 если не авторизован. Роль — из claims токена или по наличию в customers/couriers."""
+    account = await service.get_by_id(claims.account_id)
     if not account:
         raise HTTPException(status_code=404, detail="Аккаунт не найден")
-    customer = await customer_service.get_by_account_id(account_id)
-    courier = await courier_service.get_by_account_id(account_id)
-    role: str = "customer" if customer else "courier" if courier else "customer"
-    customer_id = customer.id if customer else None
-    courier_id = courier.id if courier else None
+    if identity_registry.trusts(claims):
+        customer_id, courier_id = claims.customer_id, claims.courier_id
+    else:
+        customer_id, courier_id = await _lookup_roles(claims.account_id, customer_service, courier_service)
+    role: str = "customer" if customer_id else "courier" if courier_id else "customer"
     data = AccountRead.model_validate(account)
     return AccountRead(**{**data.model_dump(), "role": role, "customer_id": customer_id, "courier_id": courier_id})
 
 
+async def _lookup_roles(
+    account_id: int,
+    customer_service: CustomerService,
+    courier_service: CourierService,
+) -> tuple[int | None, int | None]:
+    """(customer_id, courier_id) аккаунта по БД."""
+    customer = await customer_service.get_by_account_id(account_id)
+    courier = await courier_service.get_by_account_id(account_id)
+    return (customer.id if customer else None, courier.id if courier else None)
+
+
+def _issue_token(account_id: int, customer_id: int | None, courier_id: int | None) -> str:
+    """JWT с claims роли — зависимости авторизации не ходят за ролью в БД."""
+    role = "customer" if customer_id else "courier" if courier_id else None
+    return create_access_token(account_id, role=role, customer_id=customer_id, courier_id=courier_id)
+
+
 @router.post("/login", response_model=TokenResponse)
 async def login(
     data: LoginRequest,
     service: AccountService = Depends(get_account_service),
+    customer_service: CustomerService = Depends(get_customer_service),
+    courier_service: CourierService = Depends(get_courier_service),
 ):
     """Авторизация по телефону и паролю. Возвращает JWT с account_id в sub."""
     account = await service.get_by_phone(data.phone)
@@ -49,7 +69,8 @@ async def login(
         raise HTTPException(status_code=401, detail="Неверный телефон или пароль")
     if account.password != data.password:
         raise HTTPException(status_code=401, detail="Неверный телефон или пароль")
-    token = create_access_token(account.id)
+    customer_id, courier_id = await _lookup_roles(account.id, customer_service, courier_service)
+    token = _issue_token(account.id, customer_id, courier_id)
     return TokenResponse(access_token=token)
 
 
@@ -71,10 +92,12 @@ async def register(
         raise HTTPException(status_code=400, detail=str(e))
 
     phone = data.phone.strip()
+    customer_id: int | None = None
+    courier_id: int | None = None
     if data.role == "customer":
-        await customer_service.create(phone=phone, account_id=account.id)
+        customer_id = (await customer_service.create(phone=phone, account_id=account.id)).id
     else:
-        await courier_service.create(phone=phone, account_id=account.id)
+        courier_id = (await courier_service.create(phone=phone, account_id=account.id)).id
 
-    token = create_access_token(account.id)
+    token = _issue_token(account.id, customer_id, courier_id)
     return TokenResponse(access_token=token)
@@ -1,8 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException
 
-from app.api.dependencies import get_account_service, get_courier_service
-from app.application.account.service import AccountService
+from app.api.dependencies import get_courier_service
 from app.application.courier.service import CourierService
+from app.domain.courier.entity import Courier
 from app.api.dto.courier import CourierCreate, CourierRead, CourierUpdate
 
 router = APIRouter(prefix="/couriers", tags=["couriers"])
@@ -14,25 +14,25 @@ async def list_couriers(
     skip: int = 0,
     limit: int = 100,
 ):
-    entities = await service.get_all(skip=skip, limit=limit)
-    return [CourierRead.model_validate(e) for e in entities]
+    """Курьеры с именем аккаунта — один запрос с JOIN на всю страницу."""
+    rows = await service.get_all_with_account(skip=skip, limit=limit)
+    return [_courier_read(entity, name) for entity, name, _ in rows]
 
 
 @router.get("/{courier_id}", response_model=CourierRead)
 async def get_courier(
     courier_id: int,
     service: CourierService = Depends(get_courier_service),
-    account_service: AccountService = Depends(get_account_service),
 ):
-    entity = await service.get_by_id(courier_id)
-    if not entity:
+    row = await service.get_by_id_with_account(courier_id)
+    if not row:
         raise HTTPException(status_code=404, detail="Courier not found")
+    entity, name, _ = row
+    return _courier_read(entity, name)
+
+
+def _courier_read(entity: Courier, name: str | None) -> CourierRead:
     data = CourierRead.model_validate(entity)
-    name = None
-    if entity.account_id:
-        account = await account_service.get_by_id(entity.account_id)
-        if account:
-            name = account.name
     return CourierRead(**{**data.model_dump(), "name": name})
 
 
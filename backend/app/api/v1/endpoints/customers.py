@@ -1,8 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException
 
-from app.api.dependencies import get_account_service, get_customer_service
-from app.application.account.service import AccountService
+from app.api.dependencies import get_customer_service
 from app.application.customer.service import CustomerService
+from app.domain.customer.entity import Customer
 from app.api.dto.customer import CustomerCreate, CustomerRead, CustomerUpdate
 
 router = APIRouter(prefix="/customers", tags=["customers"])
@@ -11,43 +11,28 @@ router = APIRouter(prefix="/customers", tags=["customers"])
 @router.get("", response_model=list[CustomerRead])
 async def list_customers(
     service: CustomerService = Depends(get_customer_service),
-    account_service: AccountService = Depends(get_account_service),
     skip: int = 0,
     limit: int = 100,
 ):
-    entities = await service.get_all(skip=skip, limit=limit)
-    result: list[CustomerRead] = []
-    for entity in entities:
-        base = CustomerRead.model_validate(entity)
-        name: str | None = None
-        balance: float | None = None
-        if entity.account_id:
-            account = await account_service.get_by_id(entity.account_id)
-            if account:
-                name = account.name
-                balance = account.balance
-        result.append(CustomerRead(**{**base.model_dump(), "name": name, "balance": balance}))
-    return result
+    """Заказчики с именем и балансом аккаунта — один запрос с JOIN на всю страницу."""
+    rows = await service.get_all_with_account(skip=skip, limit=limit)
+    return [_customer_read(entity, name, balance) for entity, name, balance in rows]
 
 
 @router.get("/{customer_id}", response_model=CustomerRead)
 async def get_customer(
     customer_id: int,
     service: CustomerService = Depends(get_customer_service),
-    account_service: AccountService = Depends(get_account_service),
 ):
-    entity = await service.get_by_id(customer_id)
-    if not entity:
+    row = await service.get_by_id_with_account(customer_id)
+    if not row:
         raise HTTPException(status_code=404, detail="Customer not found")
-    data = CustomerRead.model_validate(entity)
-    name: str | None = None
-    balance: float | None = None
-    if entity.account_id:
-        account = await account_service.get_by_id(entity.account_id)
-        if account:
-            name = account.name
-            balance = account.balance
-    return CustomerRead(**{**data.model_dump(), "name": name, "balance": balance})
+    return _customer_read(*row)
+
+
+def _customer_read(entity: Customer, name: str | None, balance: float | None) -> CustomerRead:
+    base = CustomerRead.model_validate(entity)
+    return CustomerRead(**{**base.model_dump(), "name": name, "balance": balance})
 
 
 @router.post("", response_model=CustomerRead, status_code=201)
@@ -1,27 +1,46 @@
+import asyncio
+import csv
+import io
+import json
 import logging
+from collections.abc import AsyncIterator
 from datetime import date
+from typing import Literal
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import StreamingResponse
 
 from app.api.dependencies import (
+    get_current_account_id,
     get_current_customer_id,
-    get_customer_service,
     get_current_courier_id,
     get_optional_courier_id,
     get_optional_current_customer_id,
     get_order_service,
 )
-from app.application.customer.service import CustomerService
 from app.application.order.service import OrderService
 from app.api.dto.order import OrderCreate, OrderRead, OrderUpdate, OrderStatus
+from app.api.pagination import decode_cursor, encode_cursor
 from app.constants import ORDER_CREATION_PRICE
+from app.infrastructure.database import async_session
+from app.infrastructure.order_events import OrderSubscription, order_event_hub
+from app.infrastructure.persistence import OrderRepository
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/orders", tags=["orders"])
 
 
+def _effective_statuses(status: OrderStatus | None, statuses: str | None) -> list[str] | None:
+    """statuses (через запятую) имеет приоритет над одиночным status."""
+    statuses_list = (
+        [s.strip() for s in statuses.split(",") if s.strip()] if statuses is not None else None
+    )
+    return statuses_list if statuses_list is not None else ([str(status)] if status is not None else None)
+
+
 @router.get("", response_model=list[OrderRead])
 async def list_orders(
+    response: Response,
     service: OrderService = Depends(get_order_service),
     skip: int = 0,
     limit: int = 100,
@@ -32,27 +51,142 @@ async def list_orders(
     date_to: date | None = None,
     place: str | None = None,
     only_own: bool = False,
+    sort: Literal["created_at", "date_when"] | None = None,
+    cursor: str | None = None,
     customer_id: int | None = Depends(get_optional_current_customer_id),
 ):
-    statuses_list = (
-        [s.strip() for s in statuses.split(",") if s.strip()] if statuses is not None else None
-    )
-    effective_statuses = (
-        statuses_list if statuses_list is not None else ([str(status)] if status is not None else None)
-    )
+    """
+    Список заказов с фильтрами. По умолчанию — skip/limit (OFFSET).
+    Если передан sort или cursor — keyset-пагинация: следующий курсор приходит
+    в заголовке X-Next-Cursor (нет заголовка — страниц больше нет), skip игнорируется.
+    """
+    if cursor is not None and sort is None:
+        sort = "created_at"
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor, sort)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
     entities = await service.search(
         skip=skip,
         limit=limit,
-        statuses=effective_statuses,
+        statuses=_effective_statuses(status, statuses),
         customer_name=customer_name,
         date_from=date_from,
         date_to=date_to,
         place=place,
         customer_id=customer_id,
+        order_by=sort,
+        after=after,
     )
+    if sort is not None and len(entities) == limit and entities:
+        last = entities[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(sort, getattr(last, sort), last.id)
     return [OrderRead.model_validate(e) for e in entities]
 
 
+EXPORT_CSV_FIELDS = list(OrderRead.model_fields)
+
+
+def _csv_chunk(rows: list[dict], header: bool = False) -> str:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_CSV_FIELDS)
+    if header:
+        writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+async def _export_chunks(export_format: str, filters: dict) -> AsyncIterator[str]:
+    """
+    Чанки выгрузки: одна пачка серверного курсора → один чанк ответа.
+    Своя сессия: зависимость get_db закрывается до отправки тела ответа.
+    Следующая пачка читается из БД, только когда предыдущий чанк ушёл клиенту.
+    """
+    async with async_session() as session:
+        service = OrderService(OrderRepository(session))
+        if export_format == "csv":
+            yield _csv_chunk([], header=True)
+        async for batch in service.stream_search(**filters):
+            if export_format == "csv":
+                yield _csv_chunk([OrderRead.model_validate(e).model_dump(mode="json") for e in batch])
+            else:
+                yield "".join(OrderRead.model_validate(e).model_dump_json() + "\n" for e in batch)
+
+
+@router.get("/export")
+async def export_orders(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    status: OrderStatus | None = None,
+    statuses: str | None = None,
+    customer_name: str | None = None,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    place: str | None = None,
+    only_own: bool = False,
+    customer_id: int | None = Depends(get_optional_current_customer_id),
+):
+    """Выгрузка всех заказов по тем же фильтрам, что и GET /orders, потоком NDJSON или CSV."""
+    filters = {
+        "statuses": _effective_statuses(status, statuses),
+        "customer_name": customer_name,
+        "customer_id": customer_id,
+        "date_from": date_from,
+        "date_to": date_to,
+        "place": place,
+    }
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        _export_chunks(format, filters),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="orders.{format}"'},
+    )
+
+
+SSE_HEARTBEAT_SECONDS = 15.0
+
+
+async def _sse_events(subscription: OrderSubscription) -> AsyncIterator[str]:
+    """События подписки в формате SSE; комментарий-пинг, если событий долго нет."""
+    try:
+        yield ": connected\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), timeout=SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            if event is None:
+                return
+            yield f"event: {event['event']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+    finally:
+        order_event_hub.unsubscribe(subscription)
+
+
+@router.get("/stream")
+async def stream_orders(
+    status: OrderStatus | None = None,
+    statuses: str | None = None,
+    place: str | None = None,
+):
+    """
+    Лента изменений заказов (Server-Sent Events) вместо опроса GET /orders.
+    События: created, updated, accepted, unassigned (с заказом), expired (массовое, без заказа).
+    Фильтры status/statuses и place применяются к заказу в событии.
+    """
+    effective_statuses = _effective_statuses(status, statuses)
+    subscription = await order_event_hub.subscribe(
+        statuses=set(effective_statuses) if effective_statuses else None,
+        place=place,
+    )
+    return StreamingResponse(
+        _sse_events(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/{order_id}", response_model=OrderRead)
 async def get_order(order_id: int, service: OrderService = Depends(get_order_service)):
     entity = await service.get_by_id(order_id)
@@ -64,19 +198,16 @@ async def get_order(order_id: int, service: OrderService = Depends(get_order_ser
 @router.post("", response_model=OrderRead, status_code=201)
 async def create_order(
     data: OrderCreate,
+    account_id: int = Depends(get_current_account_id),
     customer_id: int = Depends(get_current_customer_id),
     order_service: OrderService = Depends(get_order_service),
-    customer_service: CustomerService = Depends(get_customer_service),
 ):
     """Создать заказ. Только заказчик; списание с баланса. 400 при недостатке средств."""
-    customer = await customer_service.get_by_id(customer_id)
-    if not customer or not customer.account_id:
-        logger.warning("create_order: у заказчика нет account_id customer_id=%s", customer_id)
-        raise HTTPException(status_code=403, detail="У заказчика нет привязанного аккаунта")
-    logger.info("create_order: customer_id=%s account_id=%s deduction=%s", customer_id, customer.account_id, ORDER_CREATION_PRICE)
+    # customer_id найден по account_id из токена, значит это и есть аккаунт заказчика.
+    logger.info("create_order: customer_id=%s account_id=%s deduction=%s", customer_id, account_id, ORDER_CREATION_PRICE)
     try:
         entity = await order_service.create_with_balance_deduction(
-            account_id=customer.account_id,
+            account_id=account_id,
             where_to=data.where_to,
             where_from=data.where_from,
             date_when=data.date_when,
@@ -129,12 +260,10 @@ async def accept_order(
     courier_id: int = Depends(get_current_courier_id),
 ):
     """Курьер принимает заказ: можно только курьеру и только если у заказа ещё нет курьера."""
-    order = await service.get_by_id(order_id)
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
-    if order.courier_id is not None:
-        raise HTTPException(status_code=400, detail="Order already has courier")
-    entity = await service.update(order_id, courier_id=courier_id)
+    try:
+        entity = await service.accept(order_id, courier_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not entity:
         raise HTTPException(status_code=404, detail="Order not found")
     return OrderRead.model_validate(entity)
@@ -1,31 +1,73 @@
 """Эндпоинт для заполнения и очистки БД тестовыми данными."""
 
-from fastapi import APIRouter, Depends
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.dependencies import (
     get_account_service,
     get_courier_service,
     get_customer_service,
-    get_order_service,
-    get_review_service,
 )
+from app.api.dto.order import OrderStatus
 from app.application.account.service import AccountService
 from app.application.courier.service import CourierService
 from app.application.customer.service import CustomerService
-from app.application.order.service import OrderService
-from app.application.review.service import ReviewService
 from app.data.seed_data import ACCOUNTS, COURIERS, CUSTOMERS
+from app.infrastructure.bulk_seed import BulkSeedParams, bulk_fill, parse_status_mix, truncate_all
+from app.infrastructure.database import get_db
 
 router = APIRouter(prefix="/seed", tags=["seed"])
 
 
 @router.get("/fill")
 async def fill_test_data(
+    mode: Literal["fixtures", "bulk"] = "fixtures",
+    accounts: int = Query(1000, ge=0, le=10_000_000),
+    courier_share: float = Query(0.2, ge=0, le=1),
+    orders: int = Query(100_000, ge=0, le=100_000_000),
+    reviews: int = Query(10_000, ge=0, le=100_000_000),
+    days_back: int = Query(30, ge=0, le=3650),
+    days_ahead: int = Query(30, ge=0, le=3650),
+    status_mix: str = Query("active:60,completed:30,canceled:10", description="статус:вес через запятую"),
+    assigned_share: float = Query(0.3, ge=0, le=1),
+    seed: int | None = None,
+    session: AsyncSession = Depends(get_db),
     account_service: AccountService = Depends(get_account_service),
     customer_service: CustomerService = Depends(get_customer_service),
     courier_service: CourierService = Depends(get_courier_service),
 ):
-    """Заполнить БД тестовыми данными: аккаунты, 5 кастомеров, 5 курьеров."""
+    """
+    Заполнить БД тестовыми данными.
+    mode=fixtures — аккаунты, 5 кастомеров, 5 курьеров из app.data.seed_data (параметры не нужны).
+    mode=bulk — сгенерировать accounts аккаунтов (доля courier_share — курьеры), orders заказов
+    с date_when в [сегодня - days_back, сегодня + days_ahead] и статусами по status_mix, reviews
+    отзывов; загрузка через COPY. seed — для воспроизводимых данных.
+    """
+    if mode == "bulk":
+        try:
+            mix = parse_status_mix(status_mix)
+            unknown = set(mix) - {s.value for s in OrderStatus}
+            if unknown:
+                raise ValueError(f"Неизвестные статусы: {', '.join(sorted(unknown))}")
+            params = BulkSeedParams(
+                accounts=accounts,
+                courier_share=courier_share,
+                orders=orders,
+                reviews=reviews,
+                days_back=days_back,
+                days_ahead=days_ahead,
+                status_mix=mix,
+                assigned_share=assigned_share,
+                seed=seed,
+            )
+            params.validate()
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        counts = await bulk_fill(session, params)
+        return {"message": "Тестовые данные сгенерированы", **counts}
+
     created_accounts = []
     for item in ACCOUNTS:
         acc = await account_service.create(
@@ -64,36 +106,7 @@ async def fill_test_data(
 
 
 @router.delete("/clear")
-async def clear_all_data(
-    account_service: AccountService = Depends(get_account_service),
-    customer_service: CustomerService = Depends(get_customer_service),
-    courier_service: CourierService = Depends(get_courier_service),
-    order_service: OrderService = Depends(get_order_service),
-    review_service: ReviewService = Depends(get_review_service),
-):
-    """Удалить все данные: отзывы, заказы, заказчиков, курьеров, аккаунты (порядок из-за FK)."""
-    reviews = await review_service.get_all(skip=0, limit=10_000)
-    orders = await order_service.get_all(skip=0, limit=10_000)
-    customers = await customer_service.get_all(skip=0, limit=10_000)
-    couriers = await courier_service.get_all(skip=0, limit=10_000)
-    accounts = await account_service.get_all(skip=0, limit=10_000)
-
-    for r in reviews:
-        await review_service.delete(r.id)
-    for o in orders:
-        await order_service.delete(o.id)
-    for c in customers:
-        await customer_service.delete(c.id)
-    for c in couriers:
-        await courier_service.delete(c.id)
-    for a in accounts:
-        await account_service.delete(a.id)
-
-    return {
-        "message": "Все данные удалены",
-        "reviews": len(reviews),
-        "orders": len(orders),
-        "customers": len(customers),
-        "couriers": len(couriers),
-        "accounts": len(accounts),
-    }
+async def clear_all_data(session: AsyncSession = Depends(get_db)):
+    """Удалить все данные одним TRUNCATE ... RESTART IDENTITY CASCADE (id начнутся с 1)."""
+    counts = await truncate_all(session)
+    return {"message": "Все данные удалены", **counts}
@@ -44,7 +44,7 @@ class AccountService:
     async def update(
         self, id: int, name: str | None = None, phone: str | None = None, password: str | None = None
     ) -> Account | None:
-        account = await self._repo.get_by_id(id)
+        account = await self._repo.get_for_update(id)
         if not account:
             return None
         if phone is not None and phone.strip() != account.phone:
@@ -55,39 +55,40 @@ class AccountService:
         return await self._repo.save(account)
 
     async def delete(self, id: int) -> bool:
-        account = await self._repo.get_by_id(id)
+        account = await self._repo.get_for_update(id)
         if not account:
             return False
         await self._repo.delete(account)
         return True
 
-    async def deduct_balance(self, account_id: int, amount: float) -> None:
-        """Списать сумму с баланса. ValueError при недостатке средств."""
+    async def deduct_balance(self, account_id: int, amount: float) -> float:
+        """Списать сумму с баланса одним условным UPDATE. Возвращает новый баланс. ValueError при недостатке средств."""
         logger.info("deduct_balance: account_id=%s amount=%s", account_id, amount)
         if amount < 0:
             raise ValueError("Сумма списания не может быть отрицательной")
+        new_balance = await self._repo.try_deduct_balance(account_id, amount)
+        if new_balance is None:
+            await self.raise_deduction_error(account_id, amount)
+        logger.info("deduct_balance: списано account_id=%s new_balance=%s", account_id, new_balance)
+        return new_balance
+
+    async def raise_deduction_error(self, account_id: int, amount: float) -> None:
+        """Условное списание не затронуло строк: выяснить причину и поднять ValueError."""
         account = await self._repo.get_by_id(account_id)
         if not account:
             logger.warning("deduct_balance: аккаунт не найден account_id=%s", account_id)
             raise ValueError("Аккаунт не найден")
-        logger.info("deduct_balance: баланс до списания account_id=%s balance=%s", account_id, account.balance)
-        if account.balance < amount:
-            logger.warning("deduct_balance: недостаточно средств account_id=%s balance=%s amount=%s", account_id, account.balance, amount)
-            raise ValueError("Недостаточно средств")
-        account.balance -= amount
-        logger.info("deduct_balance: списываем, баланс после account_id=%s new_balance=%s", account_id, account.balance)
-        await self._repo.save(account)
-        logger.info("deduct_balance: save() выполнен account_id=%s", account_id)
+        logger.warning("deduct_balance: недостаточно средств account_id=%s balance=%s amount=%s", account_id, account.balance, amount)
+        raise ValueError("Недостаточно средств")
 
     async def add_balance(self, account_id: int, amount: float) -> Account:
-        """Пополнить баланс аккаунта на указанную сумму > 0 и вернуть обновлённый аккаунт."""
+        """Пополнить баланс одним UPDATE ... SET balance = balance + :amount и вернуть обновлённый аккаунт."""
         logger.info("add_balance: account_id=%s amount=%s", account_id, amount)
         if amount <= 0:
             raise ValueError("Сумма пополнения должна быть больше нуля")
-        account = await self._repo.get_by_id(account_id)
+        account = await self._repo.try_add_balance(account_id, amount)
         if not account:
             logger.warning("add_balance: аккаунт не найден account_id=%s", account_id)
             raise ValueError("Аккаунт не найден")
-        account.balance += amount
         logger.info("add_balance: новый баланс account_id=%s balance=%s", account_id, account.balance)
-        return await self._repo.save(account)
+        return account
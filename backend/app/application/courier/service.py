@@ -34,6 +34,15 @@ class CourierService:
     async def get_all(self, *, skip: int = 0, limit: int = 100) -> list[Courier]:
         return await self._repo.get_all(skip=skip, limit=limit)
 
+    async def get_by_id_with_account(self, id: int) -> tuple[Courier, str | None, float | None] | None:
+        """(courier, имя аккаунта, баланс аккаунта) или None."""
+        return await self._repo.get_by_id_with_account(id)
+
+    async def get_all_with_account(
+        self, *, skip: int = 0, limit: int = 100
+    ) -> list[tuple[Courier, str | None, float | None]]:
+        return await self._repo.get_all_with_account(skip=skip, limit=limit)
+
     async def update(
         self,
         id: int,
@@ -35,6 +35,15 @@ class CustomerService:
     async def get_all(self, *, skip: int = 0, limit: int = 100) -> list[Customer]:
         return await self._repo.get_all(skip=skip, limit=limit)
 
+    async def get_by_id_with_account(self, id: int) -> tuple[Customer, str | None, float | None] | None:
+        """(customer, имя аккаунта, баланс аккаунта) или None."""
+        return await self._repo.get_by_id_with_account(id)
+
+    async def get_all_with_account(
+        self, *, skip: int = 0, limit: int = 100
+    ) -> list[tuple[Customer, str | None, float | None]]:
+        return await self._repo.get_all_with_account(skip=skip, limit=limit)
+
     async def update(
         self,
         id: int,
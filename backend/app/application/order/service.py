@@ -1,12 +1,18 @@
+import copy
 import logging
+from collections.abc import AsyncIterator
 from datetime import date, datetime
 from typing import TYPE_CHECKING
+from zoneinfo import ZoneInfo
+
+from app.config import settings
 
 from app.domain.order.entity import Order
 from app.domain.order.repository import IOrderRepository
 
 if TYPE_CHECKING:
     from app.application.account.service import AccountService
+    from app.core.result_cache import ResultCache
 
 logger = logging.getLogger(__name__)
 
@@ -14,9 +20,15 @@ logger = logging.getLogger(__name__)
 class OrderService:
     """Application Service для заказов."""
 
-    def __init__(self, repository: IOrderRepository, account_service: "AccountService | None" = None):
+    def __init__(
+        self,
+        repository: IOrderRepository,
+        account_service: "AccountService | None" = None,
+        search_cache: "ResultCache | None" = None,
+    ):
         self._repo = repository
         self._account_service = account_service
+        self._search_cache = search_cache
 
     async def create_with_balance_deduction(
         self,
@@ -30,14 +42,17 @@ class OrderService:
         courier_id: int | None = None,
         information: str | None = None,
     ) -> Order:
-        """Создать заказ: списать deduction_amount с баланса, заказ сохраняем с price=0 (цену заказа не трогаем)."""
+        """
+        Создать заказ: списать deduction_amount с баланса, заказ сохраняем с price=0 (цену заказа не трогаем).
+        Списание и INSERT заказа — один запрос; при недостатке средств ничего не меняется.
+        """
         logger.info("create_with_balance_deduction: account_id=%s customer_id=%s deduction_amount=%s", account_id, customer_id, deduction_amount)
         if not self._account_service:
             logger.error("create_with_balance_deduction: account_service не задан")
             raise ValueError("Сервис аккаунтов не задан для списания баланса")
-        await self._account_service.deduct_balance(account_id, deduction_amount)
-        logger.info("create_with_balance_deduction: списание выполнено, создаём заказ (price заказа=0)")
-        order = await self.create(
+        if deduction_amount < 0:
+            raise ValueError("Сумма списания не может быть отрицательной")
+        order = self._build(
             where_to=where_to,
             where_from=where_from,
             price=0.0,
@@ -47,20 +62,26 @@ class OrderService:
             courier_id=courier_id,
             information=information,
         )
-        logger.info("create_with_balance_deduction: заказ создан order_id=%s", order.id)
-        return order
+        created = await self._repo.add_with_balance_deduction(order, account_id, deduction_amount)
+        if not created:
+            await self._account_service.raise_deduction_error(account_id, deduction_amount)
+        logger.info("create_with_balance_deduction: заказ создан order_id=%s", created.id)
+        await self._schedule_expiry(created)
+        await self._repo.publish_event("created", created)
+        return created
 
-    async def create(
+    def _build(
         self,
         where_to: str,
         where_from: str,
         price: float,
         date_when: date,
         customer_id: int,
-        status: str = "new",
-        courier_id: int | None = None,
-        information: str | None = None,
+        status: str,
+        courier_id: int | None,
+        information: str | None,
     ) -> Order:
+        """Проверить поля и собрать новую (несохранённую) сущность заказа."""
         if not where_to or not where_to.strip():
             raise ValueError("Адрес назначения обязателен")
         if not where_from or not where_from.strip():
@@ -70,7 +91,7 @@ class OrderService:
         info_trimmed = information.strip() if information is not None else None
         if info_trimmed == "":
             info_trimmed = None
-        order = Order(
+        return Order(
             id=0,
             where_to=where_to.strip(),
             where_from=where_from.strip(),
@@ -83,7 +104,36 @@ class OrderService:
             created_at=datetime.now(),
             updated_at=datetime.now(),
         )
-        return await self._repo.add(order)
+
+    async def create(
+        self,
+        where_to: str,
+        where_from: str,
+        price: float,
+        date_when: date,
+        customer_id: int,
+        status: str = "new",
+        courier_id: int | None = None,
+        information: str | None = None,
+    ) -> Order:
+        order = self._build(
+            where_to=where_to,
+            where_from=where_from,
+            price=price,
+            date_when=date_when,
+            customer_id=customer_id,
+            status=status,
+            courier_id=courier_id,
+            information=information,
+        )
+        created = await self._repo.add(order)
+        await self._schedule_expiry(created)
+        await self._repo.publish_event("created", created)
+        return created
+
+    async def _schedule_expiry(self, order: Order) -> None:
+        """Срок истечения заказа — в очередь (её разбирает задача dispatch_order_expiry)."""
+        await self._repo.schedule_expiry(order, order.expires_at(ZoneInfo(settings.order_expiry_timezone)))
 
     async def get_by_id(self, id: int) -> Order | None:
         return await self._repo.get_by_id(id)
@@ -102,16 +152,65 @@ class OrderService:
         date_from: date | None = None,
         date_to: date | None = None,
         place: str | None = None,
+        order_by: str | None = None,
+        after: tuple[date | datetime, int] | None = None,
     ) -> list[Order]:
-        return await self._repo.search(
-            skip=skip,
-            limit=limit,
+        """Поиск с фильтрами. Без customer_id (лента, не only_own) — через кэш результатов, если он задан.
+        Ключ кэша — ровно те значения, что уходят в репозиторий."""
+        if statuses:
+            statuses = sorted(set(statuses))  # IN (...): порядок и повторы не важны
+
+        async def load() -> list[Order]:
+            return await self._repo.search(
+                skip=skip,
+                limit=limit,
+                statuses=statuses,
+                customer_name=customer_name,
+                customer_id=customer_id,
+                date_from=date_from,
+                date_to=date_to,
+                place=place,
+                order_by=order_by,
+                after=after,
+            )
+
+        if self._search_cache is None or customer_id is not None:
+            return await load()
+        key = (
+            tuple(statuses) if statuses else None,
+            customer_name,
+            date_from,
+            date_to,
+            place,
+            skip if order_by is None else None,
+            limit,
+            order_by,
+            after,
+        )
+        orders = await self._search_cache.get_or_load(key, load)
+        # Закэшированный список общий для запросов — отдаём копии.
+        return [copy.copy(o) for o in orders]
+
+    def stream_search(
+        self,
+        *,
+        statuses: list[str] | None = None,
+        customer_name: str | None = None,
+        customer_id: int | None = None,
+        date_from: date | None = None,
+        date_to: date | None = None,
+        place: str | None = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[list[Order]]:
+        """Все заказы по фильтрам search пачками (для выгрузки)."""
+        return self._repo.stream_search(
             statuses=statuses,
             customer_name=customer_name,
             customer_id=customer_id,
             date_from=date_from,
             date_to=date_to,
             place=place,
+            batch_size=batch_size,
         )
 
     async def update(
@@ -137,7 +236,25 @@ class OrderService:
             courier_id=courier_id,
             information=information,
         )
-        return await self._repo.save(order)
+        updated = await self._repo.save(order)
+        if date_when is not None or status is not None:
+            await self._schedule_expiry(updated)
+        await self._repo.publish_event("updated", updated)
+        return updated
+
+    async def accept(self, id: int, courier_id: int) -> Order | None:
+        """
+        Курьер принимает заказ атомарно. None — заказа нет.
+        ValueError — у заказа уже есть курьер (в т.ч. его только что принял другой курьер).
+        """
+        order = await self._repo.assign_courier_if_free(id, courier_id)
+        if order:
+            await self._repo.publish_event("accepted", order)
+            return order
+        # 0 строк: отличаем «нет заказа» от «уже занят» — только на неуспешном пути.
+        if not await self._repo.get_by_id(id):
+            return None
+        raise ValueError("Order already has courier")
 
     async def unassign_courier(self, id: int) -> Order | None:
         """Убрать курьера у заказа. Возвращает обновлённый заказ или None."""
@@ -145,11 +262,14 @@ class OrderService:
         if not order:
             return None
         order.courier_id = None
-        return await self._repo.save(order)
+        updated = await self._repo.save(order)
+        await self._repo.publish_event("unassigned", updated)
+        return updated
 
     async def delete(self, id: int) -> bool:
         order = await self._repo.get_by_id(id)
         if not order:
             return False
         await self._repo.delete(order)
+        await self._repo.publish_event("deleted", order)
         return True
@@ -0,0 +1,62 @@
+"""
+Инвалидация claims роли в JWT.
+
+Когда у аккаунта появляется, меняется или удаляется запись customer/courier,
+процессы API получают событие (NOTIFY identity_changed) и запоминают момент
+изменения. Токены, выданные до этого момента, перестают доверять своим claims
+роли — зависимости авторизации берут роль из БД.
+"""
+
+import json
+import time
+
+from app.config import settings
+from app.core.security import AccessClaims
+
+IDENTITY_CHANGED_CHANNEL = "identity_changed"
+
+
+class IdentityRegistry:
+    """Процессный реестр: account_id → когда изменилась роль."""
+
+    def __init__(self) -> None:
+        self._changed_at: dict[int, float] = {}
+        self._all_changed_at: float = 0.0
+
+    def mark_changed(self, account_id: int, at: float | None = None) -> None:
+        now = at if at is not None else time.time()
+        self._changed_at[account_id] = now
+        # Токены старше срока жизни JWT уже недействительны — записи о них не нужны.
+        horizon = now - settings.jwt_expire_minutes * 60
+        if len(self._changed_at) > 1000:
+            self._changed_at = {k: v for k, v in self._changed_at.items() if v >= horizon}
+
+    def mark_all_changed(self, at: float | None = None) -> None:
+        """События могли потеряться (например, разрыв LISTEN) или id аккаунтов пошли заново —
+        не доверять ранее выданным claims."""
+        self._all_changed_at = max(self._all_changed_at, at if at is not None else time.time())
+
+    def trusts(self, claims: AccessClaims) -> bool:
+        """Можно ли использовать роль из токена без запроса в БД."""
+        if not claims.has_identity or claims.issued_at is None:
+            return False
+        changed_at = max(self._changed_at.get(claims.account_id, 0.0), self._all_changed_at)
+        return claims.issued_at > changed_at
+
+
+identity_registry = IdentityRegistry()
+
+
+def on_identity_changed(payload: str) -> None:
+    """
+    Обработчик NOTIFY identity_changed: payload — JSON {"account_id", "at"} (время изменения);
+    {"account_id": null} — изменились все аккаунты (например, очистка БД).
+    """
+    try:
+        data = json.loads(payload)
+        if data.get("account_id") is None:
+            identity_registry.mark_all_changed(float(data["at"]) if "at" in data else None)
+            return
+        identity_registry.mark_changed(int(data["account_id"]), float(data["at"]))
+    except (ValueError, KeyError, TypeError):
+        identity_registry.mark_all_changed()
@@ -0,0 +1,219 @@
+"""
+Метрики процесса в текстовом формате Prometheus (GET /metrics).
+
+Counter / Gauge / Histogram с метками; значения — в памяти процесса, обновление —
+несколько арифметических операций (без блокировок: API работает в одном event loop).
+Значения, которые дешевле прочитать в момент запроса /metrics (пул соединений,
+статистика кэшей), отдают коллекторы: add_collector(fn), fn() → итерируемое Family.
+"""
+
+import functools
+import math
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterable, Sequence
+from dataclasses import dataclass, field
+
+# Границы гистограмм задержек, секунды.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+TASK_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+@dataclass
+class Family:
+    """Семейство значений от коллектора: name, type (gauge/counter), help и (метки, значение)."""
+
+    name: str
+    type: str
+    help: str
+    samples: list[tuple[dict[str, str], float]] = field(default_factory=list)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for labels, value in self.samples:
+            lines.append(f"{self.name}{_labels(list(labels), list(labels.values()))} {_number(value)}")
+        return lines
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], object] = {}
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name}: ожидаются метки {self.labelnames}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for values, child in self._children.items():
+            lines.extend(self._render_child(values, child))
+        return lines
+
+    def _render_child(self, values: tuple[str, ...], child) -> list[str]:
+        return [f"{self.name}{_labels(self.labelnames, values)} {_number(child.value)}"]
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+
+class _HistogramValue:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: tuple[float, ...]) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # по корзинам, последняя — +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+    def _render_child(self, values: tuple[str, ...], child: _HistogramValue) -> list[str]:
+        return render_histogram(self.name, self.labelnames, values, self.buckets, child.counts, child.sum, child.count)
+
+
+def render_histogram(
+    name: str,
+    labelnames: Sequence[str],
+    values: Sequence[str],
+    bounds: Sequence[float],
+    counts: Sequence[int],
+    total: float,
+    count: int,
+) -> list[str]:
+    """Строки гистограммы из счётчиков по корзинам (не накопленных; последняя — +Inf)."""
+    lines = []
+    cumulative = 0
+    for bound, n in zip([*bounds, math.inf], counts):
+        cumulative += n
+        le = 'le="' + _number(float(bound)) + '"'
+        lines.append(f"{name}_bucket{_labels(labelnames, values, le)} {cumulative}")
+    lines.append(f"{name}_sum{_labels(labelnames, values)} {_number(float(total))}")
+    lines.append(f"{name}_count{_labels(labelnames, values)} {count}")
+    return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: list[_Metric] = []
+        self._collectors: list[Callable[[], Iterable[Family]]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], Iterable[Family]]) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for family in collector():
+                lines.extend(family.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = Registry()
+
+http_request_duration = metrics.register(Histogram(
+    "http_request_duration_seconds", "Время обработки HTTP-запроса по шаблону маршрута",
+    ("method", "route", "status"),
+))
+http_requests_in_flight = metrics.register(Gauge(
+    "http_requests_in_flight", "HTTP-запросы, обрабатываемые сейчас",
+)).labels()
+repository_call_duration = metrics.register(Histogram(
+    "repository_call_duration_seconds", "Вызовы методов репозиториев: число и длительность",
+    ("repository", "method"),
+))
+db_pool_wait = metrics.register(Histogram(
+    "db_pool_wait_seconds", "Ожидание соединения из пула", ("pool",),
+))
+
+
+def timed(histogram: Histogram, *labels: str):
+    """Декоратор корутины: длительность каждого вызова → histogram.labels(*labels) (серия — с первого вызова)."""
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                histogram.labels(*labels).observe(time.perf_counter() - started)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,104 @@
+"""
+Кэш результатов запросов с коротким TTL и single-flight.
+
+Ключ — нормализованный кортеж параметров запроса. Одновременные промахи по одному
+ключу выполняют один запрос: остальные ждут его результат. Записи помечены версией
+данных; bump() (например, по событию записи заказа) делает все текущие записи
+устаревшими, а результат запроса, начатого до bump(), в кэш не попадает.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any
+
+from app.config import settings
+
+
+class ResultCache:
+    """LRU процесса: key → (значение, версия, время записи). Только для одного event loop."""
+
+    def __init__(self, *, enabled: bool, ttl_seconds: float, maxsize: int):
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self.maxsize = maxsize
+        self._entries: OrderedDict[Hashable, tuple[Any, int, float]] = OrderedDict()
+        self._inflight: dict[tuple[Hashable, int], asyncio.Future] = {}
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0  # промахи, дождавшиеся чужого запроса
+        self.invalidations = 0
+
+    def bump(self) -> None:
+        """Данные изменились: все записи устарели."""
+        self._version += 1
+        self._entries.clear()
+        self.invalidations += 1
+
+    async def get_or_load(self, key: Hashable, load: Callable[[], Awaitable[Any]]) -> Any:
+        if not self.enabled:
+            return await load()
+        version = self._version
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, entry_version, stored_at = entry
+            if entry_version == version and time.monotonic() - stored_at < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+        self.misses += 1
+
+        flight_key = (key, version)
+        future = self._inflight.get(flight_key)
+        if future is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # Отменили запрос-лидер, а не нас — выполняем свой.
+                return await load()
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[flight_key] = future
+        try:
+            value = await load()
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()  # ожидающих может не быть — не логировать «never retrieved»
+            raise
+        finally:
+            self._inflight.pop(flight_key, None)
+        future.set_result(value)
+        if version == self._version and self.maxsize > 0:
+            self._entries[key] = (value, version, time.monotonic())
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def stats(self) -> dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "invalidations": self.invalidations,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# Поиск заказов для ленты (GET /orders без only_own); версия растёт по событиям заказов.
+order_search_cache = ResultCache(
+    enabled=settings.order_search_cache_enabled,
+    ttl_seconds=settings.order_search_cache_ttl_seconds,
+    maxsize=settings.order_search_cache_size,
+)
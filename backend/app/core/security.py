@@ -1,6 +1,16 @@
-"""JWT: создание и проверка токена. В payload только account_id (sub) и exp."""
+"""
+JWT: создание и проверка токена.
 
+В payload: account_id (sub), exp, iat и — для новых токенов — роль и идентификаторы
+customer_id/courier_id, чтобы авторизация не ходила в БД за ролью на каждый запрос.
+Старые токены (без claims роли) по-прежнему принимаются: роль тогда берётся из БД.
+"""
+
+import hashlib
+import threading
 import time
+from collections import OrderedDict
+from dataclasses import dataclass
 
 import jwt
 from jwt import PyJWTError
@@ -8,12 +18,33 @@ from jwt import PyJWTError
 from app.config import settings
 
 
-def create_access_token(account_id: int) -> str:
-    """Создать JWT: sub = account_id, exp = срок действия."""
-    now = int(time.time())
+@dataclass(frozen=True)
+class AccessClaims:
+    """Проверенное содержимое токена."""
+
+    account_id: int
+    issued_at: float | None = None
+    role: str | None = None
+    customer_id: int | None = None
+    courier_id: int | None = None
+    has_identity: bool = False  # в токене есть claims роли (иначе — старый токен)
+
+
+def create_access_token(
+    account_id: int,
+    role: str | None = None,
+    customer_id: int | None = None,
+    courier_id: int | None = None,
+) -> str:
+    """Создать JWT: sub = account_id, exp = срок действия, iat и claims роли."""
+    now = time.time()
     payload = {
         "sub": str(account_id),
-        "exp": now + settings.jwt_expire_minutes * 60,
+        "iat": now,
+        "exp": int(now) + settings.jwt_expire_minutes * 60,
+        "role": role,
+        "customer_id": customer_id,
+        "courier_id": courier_id,
     }
     return jwt.encode(
         payload,
@@ -22,17 +53,122 @@ def create_access_token(account_id: int) -> str:
     )
 
 
-def decode_access_token(token: str) -> int | None:
-    """Проверить токен и вернуть account_id (sub). При ошибке — None."""
+class TokenCache:
+    """
+    LRU-кэш проверенных токенов: sha256(token) → (claims, exp).
+
+    Запись живёт не дольше exp самого токена и вытесняется по LRU при переполнении.
+    Невалидные токены не кэшируются. Операции не содержат await, поэтому атомарны
+    для asyncio-задач одного цикла; lock защищает от вызовов из потоков threadpool.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[bytes, tuple[AccessClaims, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, key: bytes) -> AccessClaims | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            claims, exp = entry
+            if exp <= time.time():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return claims
+
+    def put(self, key: bytes, claims: AccessClaims, exp: float) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (claims, exp)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Сбросить записи и статистику."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def stats(self) -> dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+token_cache = TokenCache(settings.jwt_cache_size)
+
+
+def decode_access_claims(token: str) -> AccessClaims | None:
+    """Проверить токен и вернуть его claims (с кэшем, см. TokenCache). При ошибке — None."""
+    key = TokenCache.key(token)
+    claims = token_cache.get(key)
+    if claims is not None:
+        return claims
+    payload = _verify(token)
+    if payload is None:
+        return None
+    claims = _claims_from_payload(payload)
+    exp = payload.get("exp")
+    if claims is not None and isinstance(exp, (int, float)):
+        token_cache.put(key, claims, exp)
+    return claims
+
+
+def _verify(token: str) -> dict | None:
+    """Проверить подпись и срок токена. При ошибке — None."""
     try:
-        payload = jwt.decode(
+        return jwt.decode(
             token,
             settings.jwt_secret,
             algorithms=[settings.jwt_algorithm],
         )
+    except PyJWTError:
+        return None
+
+
+def _claims_from_payload(payload: dict) -> AccessClaims | None:
+    try:
         sub = payload.get("sub")
         if sub is None:
             return None
-        return int(sub)
-    except (PyJWTError, ValueError):
+        return AccessClaims(
+            account_id=int(sub),
+            issued_at=payload.get("iat"),
+            role=payload.get("role"),
+            customer_id=payload.get("customer_id"),
+            courier_id=payload.get("courier_id"),
+            has_identity="role" in payload,
+        )
+    except (TypeError, ValueError):
         return None
+
+
+def decode_access_token(token: str) -> int | None:
+    """Проверить токен и вернуть account_id (sub). При ошибке — None."""
+    claims = decode_access_claims(token)
+    return claims.account_id if claims else None
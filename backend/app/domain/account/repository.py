@@ -8,6 +8,11 @@ class IAccountRepository(ABC):
     async def get_by_id(self, id: int) -> Account | None:
         ...
 
+    @abstractmethod
+    async def get_for_update(self, id: int) -> Account | None:
+        """Чтение перед изменением: из БД (не из кэша), строка заблокирована до конца транзакции."""
+        ...
+
     @abstractmethod
     async def get_by_phone(self, phone: str) -> Account | None:
         ...
@@ -24,6 +29,14 @@ class IAccountRepository(ABC):
     async def save(self, account: Account) -> Account:
         ...
 
+    @abstractmethod
+    async def try_deduct_balance(self, account_id: int, amount: float) -> float | None:
+        ...
+
+    @abstractmethod
+    async def try_add_balance(self, account_id: int, amount: float) -> Account | None:
+        ...
+
     @abstractmethod
     async def delete(self, account: Account) -> None:
         ...
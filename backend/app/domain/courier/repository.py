@@ -18,6 +18,17 @@ class ICourierRepository(ABC):
     async def get_all(self, *, skip: int = 0, limit: int = 100) -> list[Courier]:
         ...
 
+    @abstractmethod
+    async def get_by_id_with_account(self, id: int) -> tuple[Courier, str | None, float | None] | None:
+        """Courier вместе с именем и балансом аккаунта (одним запросом)."""
+        ...
+
+    @abstractmethod
+    async def get_all_with_account(
+        self, *, skip: int = 0, limit: int = 100
+    ) -> list[tuple[Courier, str | None, float | None]]:
+        ...
+
     @abstractmethod
     async def add(self, courier: Courier) -> Courier:
         ...
@@ -18,6 +18,17 @@ class ICustomerRepository(ABC):
     async def get_all(self, *, skip: int = 0, limit: int = 100) -> list[Customer]:
         ...
 
+    @abstractmethod
+    async def get_by_id_with_account(self, id: int) -> tuple[Customer, str | None, float | None] | None:
+        """Customer вместе с именем и балансом аккаунта (одним запросом)."""
+        ...
+
+    @abstractmethod
+    async def get_all_with_account(
+        self, *, skip: int = 0, limit: int = 100
+    ) -> list[tuple[Customer, str | None, float | None]]:
+        ...
+
     @abstractmethod
     async def add(self, customer: Customer) -> Customer:
         ...
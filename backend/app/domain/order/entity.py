@@ -1,8 +1,11 @@
 from dataclasses import dataclass
-from datetime import date, datetime
+from datetime import date, datetime, time, timedelta, tzinfo
 
 from app.api.dto.order import OrderStatus
 
+# Статусы, из которых заказ истекает, когда дата прошла; завершённые/отменённые не трогаем.
+OPEN_ORDER_STATUSES: tuple[str, ...] = (OrderStatus.ACTIVE,)
+
 
 @dataclass
 class Order:
@@ -24,6 +27,12 @@ class Order:
         """Назначить курьера на заказ."""
         self.courier_id = courier_id
 
+    def expires_at(self, tz: tzinfo) -> datetime | None:
+        """Когда заказ истекает: начало следующего за date_when дня в tz. None — заказ не открыт."""
+        if self.status not in OPEN_ORDER_STATUSES:
+            return None
+        return datetime.combine(self.date_when + timedelta(days=1), time.min, tzinfo=tz)
+
     def update_status(self, status: str) -> None:
         """Обновить статус заказа."""
         self.status = status
@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
-from datetime import date
+from collections.abc import AsyncIterator
+from datetime import date, datetime
 
 from app.domain.order.entity import Order
 
@@ -27,17 +28,62 @@ class IOrderRepository(ABC):
         date_from: date | None = None,
         date_to: date | None = None,
         place: str | None = None,
+        order_by: str | None = None,
+        after: tuple[date | datetime, int] | None = None,
     ) -> list[Order]:
         ...
 
+    @abstractmethod
+    def stream_search(
+        self,
+        *,
+        statuses: list[str] | None = None,
+        customer_name: str | None = None,
+        customer_id: int | None = None,
+        date_from: date | None = None,
+        date_to: date | None = None,
+        place: str | None = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[list[Order]]:
+        ...
+
     @abstractmethod
     async def add(self, order: Order) -> Order:
         ...
 
+    @abstractmethod
+    async def add_with_balance_deduction(self, order: Order, account_id: int, amount: float) -> Order | None:
+        ...
+
     @abstractmethod
     async def save(self, order: Order) -> Order:
         ...
 
+    @abstractmethod
+    async def assign_courier_if_free(self, order_id: int, courier_id: int) -> Order | None:
+        ...
+
     @abstractmethod
     async def delete(self, order: Order) -> None:
         ...
+
+    @abstractmethod
+    async def expire_due_batch(self, before: date, statuses: tuple[str, ...], limit: int) -> list[int]:
+        """Перевести в 'expired' до limit просроченных заказов (date_when < before). Возвращает их id."""
+        ...
+
+    @abstractmethod
+    async def schedule_expiry(self, order: Order, due_at: datetime | None) -> None:
+        """Поставить заказ в очередь истечения на due_at; None — убрать из очереди."""
+        ...
+
+    @abstractmethod
+    async def expire_from_queue(
+        self, now: datetime, before: date, statuses: tuple[str, ...], limit: int
+    ) -> tuple[int, list[int]]:
+        """Забрать из очереди до limit наступивших записей и истечь их заказы. (забрано, id истёкших)."""
+        ...
+
+    @abstractmethod
+    async def publish_event(self, event: str, order: Order | None = None, **extra) -> None:
+        ...
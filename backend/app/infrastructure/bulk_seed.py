@@ -0,0 +1,248 @@
+"""
+Очистка и массовое заполнение БД для нагрузочных тестов (эндпоинты /seed).
+
+truncate_all — один TRUNCATE ... RESTART IDENTITY CASCADE по всем таблицам данных.
+bulk_fill — генерация правдоподобных аккаунтов, заказчиков, курьеров, заказов и отзывов
+и загрузка через COPY (asyncpg copy_records_to_table) пачками по COPY_CHUNK строк.
+id заранее берутся из последовательностей таблиц (nextval), поэтому связи между
+таблицами известны до загрузки и ничего не приходится читать обратно.
+
+Обе операции идут в транзакции переданной сессии и сбрасывают кэши сущностей и поиска
+после COMMIT (через события, как обычные записи).
+"""
+
+import random
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from datetime import datetime, time as dtime, timedelta, timezone
+from typing import Any
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import String, bindparam, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.domain.order.entity import OPEN_ORDER_STATUSES
+from app.infrastructure.cache.entity_cache import entity_cache
+from app.infrastructure.identity_events import publish_all_identities_changed
+from app.infrastructure.order_events import order_event_payload, publish_order_event
+
+# Порядок не важен (CASCADE), но перечисляем все таблицы данных явно. identity_changes не очищается:
+# в ней остаётся отметка «изменились все» для процессов, стартующих после очистки (см. identity_events).
+SEED_TABLES = ("reviews", "order_expiry_queue", "orders", "customers", "couriers", "accounts")
+COPY_CHUNK = 50_000
+
+_FIRST_NAMES = (
+    "Иван", "Мария", "Алексей", "Елена", "Дмитрий", "Ольга", "Сергей", "Наталья", "Михаил", "Анна",
+    "Андрей", "Татьяна", "Павел", "Юлия", "Николай", "Светлана", "Артём", "Ксения", "Егор", "Дарья",
+)
+_LAST_NAMES = (
+    "Петров", "Сидоров", "Козлов", "Новиков", "Волков", "Смирнов", "Кузнецов", "Попов", "Соколов",
+    "Лебедев", "Морозов", "Павлов", "Фёдоров", "Егоров", "Орлов", "Никитин", "Зайцев", "Белов",
+)
+_STREETS = (
+    "ул. Ленина", "пр. Мира", "ул. Гагарина", "ул. Пушкина", "Садовая ул.", "ул. Советская",
+    "Вокзальная пл.", "ул. Кирова", "Набережная ул.", "ул. Молодёжная", "Лесная ул.", "ул. Победы",
+)
+_DESCRIPTIONS = ("офис", "квартира", "склад", "магазин", "ресторан", "пункт выдачи", None)
+_REVIEW_TEXTS = ("Всё отлично", "Быстро и аккуратно", "Немного опоздал", "Рекомендую", "Вежливый курьер", None)
+
+# Статусы, у которых всегда есть курьер.
+_STATUSES_WITH_COURIER = ("completed",)
+
+
+@dataclass
+class BulkSeedParams:
+    accounts: int = 1000
+    courier_share: float = 0.2  # доля аккаунтов-курьеров, остальные — заказчики
+    orders: int = 100_000
+    reviews: int = 10_000
+    days_back: int = 30  # date_when в диапазоне [сегодня - days_back, сегодня + days_ahead]
+    days_ahead: int = 30
+    status_mix: dict[str, float] = field(default_factory=lambda: {"active": 60, "completed": 30, "canceled": 10})
+    assigned_share: float = 0.3  # доля открытых заказов, уже принятых курьером
+    seed: int | None = None
+
+    def validate(self) -> None:
+        if self.accounts < 0 or self.orders < 0 or self.reviews < 0:
+            raise ValueError("Количество строк не может быть отрицательным")
+        if not 0 <= self.courier_share <= 1 or not 0 <= self.assigned_share <= 1:
+            raise ValueError("Доли должны быть от 0 до 1")
+        if self.days_back < 0 or self.days_ahead < 0:
+            raise ValueError("Разброс дат не может быть отрицательным")
+        if not self.status_mix or any(w < 0 for w in self.status_mix.values()) or sum(self.status_mix.values()) <= 0:
+            raise ValueError("Неверная смесь статусов")
+        couriers = round(self.accounts * self.courier_share)
+        customers = self.accounts - couriers
+        if (self.orders or self.reviews) and customers == 0:
+            raise ValueError("Для заказов и отзывов нужен хотя бы один заказчик")
+        if self.reviews and couriers == 0:
+            raise ValueError("Для отзывов нужен хотя бы один курьер")
+
+
+def parse_status_mix(value: str) -> dict[str, float]:
+    """'active:60,completed:30,canceled:10' → {"active": 60.0, ...}. ValueError при неверном формате."""
+    mix: dict[str, float] = {}
+    for part in value.split(","):
+        name, sep, weight = part.strip().partition(":")
+        if not sep or not name.strip():
+            raise ValueError(f"Неверный элемент смеси статусов: {part!r}")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+async def truncate_all(session: AsyncSession) -> dict[str, int]:
+    """Очистить все таблицы данных одним запросом и сбросить счётчики id. Возвращает, сколько строк было."""
+    counted = ("reviews", "orders", "customers", "couriers", "accounts")
+    result = await session.execute(
+        text("SELECT " + ", ".join(f"(SELECT count(*) FROM {table}) AS {table}" for table in counted))
+    )
+    counts = dict(result.one()._mapping)
+    await session.execute(text(f"TRUNCATE {', '.join(SEED_TABLES)} RESTART IDENTITY CASCADE"))
+    # id пойдут заново: кэш сущностей и claims ролей в выданных токенах недействительны целиком.
+    entity_cache.invalidate_all(session)
+    await publish_all_identities_changed(session)
+    await publish_order_event(session, order_event_payload("cleared"))
+    return counts
+
+
+async def _driver_connection(session: AsyncSession) -> Any:
+    """asyncpg-соединение текущей транзакции сессии (для COPY)."""
+    conn = await session.connection()
+    raw = await conn.get_raw_connection()
+    return raw.driver_connection
+
+
+async def _reserve_ids(session: AsyncSession, table: str, count: int) -> list[int]:
+    if count == 0:
+        return []
+    result = await session.execute(
+        text("SELECT nextval(pg_get_serial_sequence(:table, 'id')) FROM generate_series(1, :count)"),
+        {"table": table, "count": count},
+    )
+    return list(result.scalars())
+
+
+async def _copy(driver, table: str, columns: list[str], rows: Iterator[tuple]) -> int:
+    total = 0
+    while True:
+        chunk = [row for _, row in zip(range(COPY_CHUNK), rows)]
+        if not chunk:
+            return total
+        await driver.copy_records_to_table(table, records=chunk, columns=columns)
+        total += len(chunk)
+
+
+async def bulk_fill(session: AsyncSession, params: BulkSeedParams) -> dict[str, float]:
+    """Сгенерировать и загрузить данные по params. Возвращает число строк по таблицам и время."""
+    params.validate()
+    started = time.monotonic()
+    rng = random.Random(params.seed)
+    now = datetime.now(timezone.utc)
+    tz = ZoneInfo(settings.order_expiry_timezone)
+    today = datetime.now(tz).date()
+    driver = await _driver_connection(session)
+
+    account_ids = await _reserve_ids(session, "accounts", params.accounts)
+    couriers_count = round(params.accounts * params.courier_share)
+    courier_account_ids = account_ids[:couriers_count]
+    customer_account_ids = account_ids[couriers_count:]
+    courier_ids = await _reserve_ids(session, "couriers", len(courier_account_ids))
+    customer_ids = await _reserve_ids(session, "customers", len(customer_account_ids))
+    order_ids = await _reserve_ids(session, "orders", params.orders)
+
+    def phone(account_id: int) -> str:
+        # +78… — не пересекается с фикстурами (+79…); уникален по id аккаунта.
+        return f"+78{account_id:09d}"
+
+    def accounts() -> Iterator[tuple]:
+        for account_id in account_ids:
+            name = f"{rng.choice(_FIRST_NAMES)} {rng.choice(_LAST_NAMES)}"
+            created = now - timedelta(days=rng.uniform(0, 365))
+            yield account_id, name, phone(account_id), f"pass{account_id}", float(rng.randint(0, 50) * 100), created, created
+
+    def profiles(ids: list[int], owner_ids: list[int]) -> Iterator[tuple]:
+        for profile_id, account_id in zip(ids, owner_ids):
+            description = rng.choice(_DESCRIPTIONS)
+            created = now - timedelta(days=rng.uniform(0, 365))
+            yield profile_id, phone(account_id), description, account_id, created, created
+
+    # Заказов может быть миллионы: значения берутся пачками rng.choices из заранее
+    # построенных пулов, а не отдельными вызовами random/datetime на каждую строку.
+    addresses = [f"{street}, д. {house}" for street in _STREETS for house in range(1, 151)]
+    prices = [float(i * 100) for i in range(1, 51)]
+    first_date = today - timedelta(days=params.days_back)
+    dates = [first_date + timedelta(days=i) for i in range(params.days_back + params.days_ahead + 1)]
+    midnights = {d: datetime.combine(d, dtime.min, tzinfo=tz) for d in dates}
+    lead_times = [timedelta(hours=h) for h in range(14 * 24)]  # заказ создан за 0–14 дней до даты
+    status_names = list(params.status_mix)
+    status_weights = [params.status_mix[name] for name in status_names]
+
+    def orders() -> Iterator[tuple]:
+        for offset in range(0, len(order_ids), COPY_CHUNK):
+            ids = order_ids[offset:offset + COPY_CHUNK]
+            n = len(ids)
+            columns = zip(
+                ids,
+                rng.choices(addresses, k=n),
+                rng.choices(addresses, k=n),
+                rng.choices(prices, k=n),
+                rng.choices(status_names, weights=status_weights, k=n),
+                rng.choices(dates, k=n),
+                rng.choices(customer_ids, k=n),
+                rng.choices(courier_ids, k=n) if courier_ids else [None] * n,
+                rng.choices(lead_times, k=n),
+            )
+            for order_id, where_to, where_from, price, status, date_when, customer_id, courier_id, lead in columns:
+                if status not in _STATUSES_WITH_COURIER and rng.random() >= params.assigned_share:
+                    courier_id = None
+                created = min(now, midnights[date_when] - lead)
+                yield (
+                    order_id, where_to, where_from, price, status, date_when,
+                    customer_id, courier_id, None, created, created,
+                )
+
+    def reviews() -> Iterator[tuple]:
+        for _ in range(params.reviews):
+            created = now - timedelta(days=rng.uniform(0, params.days_back + 1))
+            yield (
+                rng.randint(1, 5), rng.choice(_REVIEW_TEXTS), rng.choice(customer_ids), rng.choice(courier_ids),
+                created, created,
+            )
+
+    counts: dict[str, float] = {}
+    counts["accounts"] = await _copy(
+        driver, "accounts", ["id", "name", "phone", "password", "balance", "created_at", "updated_at"], accounts()
+    )
+    profile_columns = ["id", "phone", "description", "account_id", "created_at", "updated_at"]
+    counts["customers"] = await _copy(driver, "customers", profile_columns, profiles(customer_ids, customer_account_ids))
+    counts["couriers"] = await _copy(driver, "couriers", profile_columns, profiles(courier_ids, courier_account_ids))
+    counts["orders"] = await _copy(
+        driver,
+        "orders",
+        ["id", "where_to", "where_from", "price", "status", "date_when", "customer_id", "courier_id", "information",
+         "created_at", "updated_at"],
+        orders(),
+    )
+    if order_ids:
+        # Очередь истечения для открытых заказов — как при создании через OrderService.
+        result = await session.execute(
+            text("""
+                INSERT INTO order_expiry_queue (order_id, due_at)
+                SELECT id, (date_when + 1)::timestamp AT TIME ZONE :tz FROM orders
+                WHERE id BETWEEN :first AND :last AND status = ANY(:statuses)
+                ON CONFLICT (order_id) DO NOTHING
+            """).bindparams(bindparam("statuses", type_=ARRAY(String))),
+            {"tz": settings.order_expiry_timezone, "first": order_ids[0], "last": order_ids[-1],
+             "statuses": list(OPEN_ORDER_STATUSES)},
+        )
+        counts["order_expiry_queue"] = result.rowcount
+    counts["reviews"] = await _copy(
+        driver, "reviews", ["score", "text", "customer_id", "courier_id", "created_at", "updated_at"], reviews()
+    )
+    entity_cache.invalidate_all(session)  # могли быть закэшированы «нет записи» для новых id
+    await publish_order_event(session, order_event_payload("seeded"))
+    counts["seconds"] = round(time.monotonic() - started, 3)
+    return counts
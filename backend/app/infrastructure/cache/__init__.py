@@ -0,0 +1,15 @@
+from app.infrastructure.cache.entity_cache import EntityCache, entity_cache, entity_key
+from app.infrastructure.cache.repositories import (
+    CachedAccountRepository,
+    CachedCourierRepository,
+    CachedCustomerRepository,
+)
+
+__all__ = [
+    "EntityCache",
+    "entity_cache",
+    "entity_key",
+    "CachedAccountRepository",
+    "CachedCourierRepository",
+    "CachedCustomerRepository",
+]
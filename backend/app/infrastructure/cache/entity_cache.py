@@ -0,0 +1,321 @@
+"""
+Двухуровневый кэш сущностей: LRU процесса → общий Redis → БД.
+
+Значения — словари полей сущности (JSON в Redis), None — «записи нет» (тоже кэшируется).
+LRU процесса живёт entity_cache_local_ttl_seconds, Redis — entity_cache_ttl_seconds.
+
+Инвалидация: репозиторий при записи вызывает invalidate(session, keys) — ключи сразу
+убираются из LRU процесса и копятся в session.info; после COMMIT get_db вызывает
+flush(session): ключи удаляются из Redis и публикуются в канал ENTITY_CACHE_CHANNEL,
+остальные процессы убирают их из своих LRU. Откаченная транзакция ничего не публикует.
+
+Гонка между процессами: процесс A прочитал строку из БД, процесс B её изменил и сбросил
+ключ, A кладёт прочитанное — в Redis устаревшее значение на entity_cache_ttl_seconds.
+Поэтому flush не удаляет ключ, а ставит на его место TOMBSTONE на
+entity_cache_invalidation_hold_seconds, а set кладёт значение только если ключа в Redis
+нет (SET NX) и с последнего «сбросить всё» прошло больше того же интервала (FLUSHED_KEY).
+Чтение из БД дольше этого интервала может положить устаревшее значение — интервал
+выбирается с запасом относительно самых долгих точечных чтений.
+Если подписка на канал рвётся, LRU процесса очищается целиком — события могли потеряться.
+
+Ошибки Redis не ломают запрос: кэш считается промахом, чтение идёт в БД.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+from datetime import date, datetime
+from typing import Any
+
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+ENTITY_CACHE_CHANNEL = "entity_cache:invalidate"
+ALL_KEYS = "entity:*"  # «сбросить всё» (например, после TRUNCATE)
+MISSING = object()  # ключа нет в кэше (в отличие от закэшированного None)
+TOMBSTONE = "~"  # ключ недавно инвалидирован: промах, заполнять из БД нельзя
+FLUSHED_KEY = "entity_cache:flushed"  # недавно был сброс всего кэша (ALL_KEYS)
+
+# KEYS[1] — ключ, KEYS[2] — FLUSHED_KEY; ARGV[1] — значение, ARGV[2] — TTL, с.
+_SET_IF_ABSENT = """
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    return 0
+end
+if redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2], 'NX') then
+    return 1
+end
+return 0
+"""
+
+
+def entity_key(kind: str, field: str, value: Any) -> str:
+    """Ключ кэша: entity:<kind>:<field>:<value>, например entity:account:id:5."""
+    return f"entity:{kind}:{field}:{value}"
+
+
+def _json_default(value: Any) -> str:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Не сериализуется в JSON: {type(value).__name__}")
+
+
+class EntityCache:
+    """LRU процесса перед Redis, инвалидация через pub/sub. Один экземпляр на процесс."""
+
+    RECONNECT_DELAY_SECONDS = 5.0
+
+    def __init__(
+        self,
+        redis_url: str,
+        *,
+        enabled: bool,
+        ttl_seconds: int,
+        local_ttl_seconds: float,
+        local_size: int,
+        invalidation_hold_seconds: float,
+    ):
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self.invalidation_hold_ms = max(1, int(invalidation_hold_seconds * 1000))
+        self.local_ttl_seconds = local_ttl_seconds
+        self.local_size = local_size
+        self._redis_url = redis_url
+        self._redis: redis.Redis | None = None
+        self._set_if_absent = None
+        self._local: OrderedDict[str, tuple[dict | None, float]] = OrderedDict()  # key → (value, stored_at)
+        # Растёт при каждой инвалидации: значение, прочитанное из БД до неё, в кэш не кладём.
+        self._epoch = 0
+        self._listener: asyncio.Task | None = None
+        self._reset_stats()
+
+    def _reset_stats(self) -> None:
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.redis_errors = 0
+        self.invalidations_sent = 0
+        self.invalidations_received = 0
+        self.invalidation_messages = 0
+        self.local_flushes = 0
+        self._served_age_total = 0.0
+        self._served_age_max = 0.0
+        self._lag_total = 0.0
+        self._lag_max = 0.0
+
+    def _client(self) -> redis.Redis:
+        if self._redis is None:
+            self._redis = redis.Redis.from_url(self._redis_url, decode_responses=True)
+            self._set_if_absent = self._redis.register_script(_SET_IF_ABSENT)
+        return self._redis
+
+    # --- чтение/запись ---
+
+    @property
+    def epoch(self) -> int:
+        return self._epoch
+
+    async def get(self, key: str) -> Any:
+        """Значение (dict или None) либо MISSING."""
+        entry = self._local.get(key)
+        if entry is not None:
+            value, stored_at = entry
+            age = time.monotonic() - stored_at
+            if age < self.local_ttl_seconds:
+                self._local.move_to_end(key)
+                self.local_hits += 1
+                self._served_age_total += age
+                self._served_age_max = max(self._served_age_max, age)
+                return value
+            del self._local[key]
+        epoch = self._epoch
+        try:
+            raw = await self._client().get(key)
+        except (RedisError, OSError):
+            self._redis_failed("GET")
+            raw = None
+        if raw is None or raw == TOMBSTONE:
+            self.misses += 1
+            return MISSING
+        self.redis_hits += 1
+        value = json.loads(raw)
+        if epoch == self._epoch:
+            self._put_local(key, value)
+        return value
+
+    async def set(self, key: str, value: dict | None, epoch: int) -> None:
+        """Положить прочитанное из БД. epoch — значение self.epoch до чтения: если с тех пор
+        была инвалидация в этом процессе, значение могло устареть и не кладётся. Инвалидации
+        из других процессов отсекает Redis: ключ занят TOMBSTONE или недавно был сброс всего."""
+        if epoch != self._epoch:
+            return
+        try:
+            client = self._client()
+            stored = await self._set_if_absent(
+                keys=[key, FLUSHED_KEY], args=[json.dumps(value, default=_json_default), self.ttl_seconds],
+                client=client,
+            )
+        except (RedisError, OSError):
+            self._redis_failed("SET")
+            stored = True  # Redis недоступен — остаётся LRU процесса с коротким TTL
+        if stored and epoch == self._epoch:
+            self._put_local(key, value)
+
+    def _put_local(self, key: str, value: dict | None) -> None:
+        if self.local_size <= 0:
+            return
+        self._local[key] = (value, time.monotonic())
+        self._local.move_to_end(key)
+        while len(self._local) > self.local_size:
+            self._local.popitem(last=False)
+
+    def _drop_local(self, keys: Iterable[str]) -> None:
+        self._epoch += 1
+        for key in keys:
+            if key == ALL_KEYS:
+                self._local.clear()
+                self.local_flushes += 1
+            else:
+                self._local.pop(key, None)
+
+    def _redis_failed(self, op: str) -> None:
+        self.redis_errors += 1
+        logger.warning("entity cache: Redis %s не удался, читаем из БД", op, exc_info=True)
+
+    # --- инвалидация ---
+
+    def invalidate(self, session: AsyncSession, keys: Iterable[str]) -> None:
+        """Записи по keys изменены в транзакции session: убрать из LRU сейчас, из Redis — после COMMIT."""
+        if not self.enabled:
+            return
+        keys = set(keys)
+        self._drop_local(keys)
+        session.info.setdefault("entity_cache_keys", set()).update(keys)
+
+    async def flush(self, session: AsyncSession) -> None:
+        """После COMMIT: заменить ключи транзакции в Redis на TOMBSTONE и разослать их остальным процессам."""
+        keys = session.info.pop("entity_cache_keys", None)
+        if not keys:
+            return
+        # Повторно: между invalidate и COMMIT параллельный запрос мог положить старое значение.
+        self._drop_local(keys)
+        payload = json.dumps({"keys": sorted(keys), "at": time.time()})
+        try:
+            stored = set(keys)
+            if ALL_KEYS in stored:
+                stored.discard(ALL_KEYS)
+                stored.update([key async for key in self._client().scan_iter(match=ALL_KEYS, count=1000)])
+            async with self._client().pipeline(transaction=False) as pipe:
+                if ALL_KEYS in keys:
+                    pipe.set(FLUSHED_KEY, "1", px=self.invalidation_hold_ms)
+                for key in stored:
+                    pipe.set(key, TOMBSTONE, px=self.invalidation_hold_ms)
+                pipe.publish(ENTITY_CACHE_CHANNEL, payload)
+                await pipe.execute()
+            self.invalidations_sent += len(stored) + (ALL_KEYS in keys)
+        except (RedisError, OSError):
+            self._redis_failed("SET TOMBSTONE/PUBLISH")
+
+    def invalidate_all(self, session: AsyncSession) -> None:
+        """Таблицы сущностей переписаны целиком: после COMMIT сбросить весь кэш во всех процессах."""
+        self.invalidate(session, [ALL_KEYS])
+
+    def discard(self, session: AsyncSession) -> None:
+        """Транзакция откачена — публиковать нечего."""
+        session.info.pop("entity_cache_keys", None)
+
+    def clear_local(self) -> None:
+        self._drop_local([ALL_KEYS])
+
+    # --- подписка на инвалидации ---
+
+    async def start(self) -> None:
+        if self.enabled and self._listener is None:
+            self._listener = asyncio.get_running_loop().create_task(self._listen())
+
+    async def _listen(self) -> None:
+        while True:
+            pubsub = self._client().pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(ENTITY_CACHE_CHANNEL)
+                logger.info("entity cache: SUBSCRIBE %s", ENTITY_CACHE_CHANNEL)
+                async for message in pubsub.listen():
+                    self._on_message(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except (RedisError, OSError):
+                logger.warning("entity cache: подписка потеряна, очищаем LRU и переподключаемся", exc_info=True)
+            finally:
+                await pubsub.aclose()
+            # Пока подписки не было, инвалидации могли пройти мимо.
+            self.clear_local()
+            await asyncio.sleep(self.RECONNECT_DELAY_SECONDS)
+
+    def _on_message(self, payload: str) -> None:
+        try:
+            data = json.loads(payload)
+            keys = data["keys"]
+            lag = max(0.0, time.time() - float(data["at"]))
+        except (ValueError, KeyError, TypeError):
+            logger.warning("entity cache: битый payload %r", payload)
+            self.clear_local()
+            return
+        self._drop_local(keys)
+        self.invalidations_received += len(keys)
+        self.invalidation_messages += 1
+        self._lag_total += lag
+        self._lag_max = max(self._lag_max, lag)
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+    # --- метрики ---
+
+    def stats(self) -> dict[str, float]:
+        """Попадания по уровням и устаревание: возраст отданных из LRU значений, задержка инвалидаций."""
+        hits = self.local_hits + self.redis_hits
+        lookups = hits + self.misses
+        messages = self.invalidation_messages
+        return {
+            "enabled": self.enabled,
+            "local_size": len(self._local),
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+            "local_hit_ratio": self.local_hits / lookups if lookups else 0.0,
+            "redis_errors": self.redis_errors,
+            "invalidations_sent": self.invalidations_sent,
+            "invalidations_received": self.invalidations_received,
+            "local_flushes": self.local_flushes,
+            "served_age_avg_seconds": self._served_age_total / self.local_hits if self.local_hits else 0.0,
+            "served_age_max_seconds": self._served_age_max,
+            "invalidation_lag_avg_seconds": self._lag_total / messages if messages else 0.0,
+            "invalidation_lag_max_seconds": self._lag_max,
+        }
+
+
+entity_cache = EntityCache(
+    settings.redis_url,
+    enabled=settings.entity_cache_enabled,
+    ttl_seconds=settings.entity_cache_ttl_seconds,
+    local_ttl_seconds=settings.entity_cache_local_ttl_seconds,
+    local_size=settings.entity_cache_local_size,
+    invalidation_hold_seconds=settings.entity_cache_invalidation_hold_seconds,
+)
@@ -0,0 +1,202 @@
+"""
+Кэширующие обёртки репозиториев аккаунтов, заказчиков и курьеров (см. entity_cache).
+
+Кэшируются точечные чтения: get_by_id и get_by_account_id. По account_id хранится
+только ссылка {"id": ...} на запись по id; при чтении ссылка сверяется с account_id
+самой записи, поэтому сменивший аккаунт customer/courier не отдаётся по старому ключу.
+Списки, чтения с JOIN и поиск по телефону идут во внутренний репозиторий как есть.
+Записи идут во внутренний репозиторий и инвалидируют затронутые ключи. Чтения перед
+изменением (get_for_update) и изменение баланса кэш не используют: закэшированный
+баланс мог устареть, а писать его обратно нельзя.
+"""
+
+import dataclasses
+from datetime import datetime
+from typing import Any, Generic, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.domain.account.entity import Account
+from app.domain.account.repository import IAccountRepository
+from app.domain.courier.entity import Courier
+from app.domain.courier.repository import ICourierRepository
+from app.domain.customer.entity import Customer
+from app.domain.customer.repository import ICustomerRepository
+from app.infrastructure.cache.entity_cache import MISSING, EntityCache, entity_cache, entity_key
+from app.infrastructure.persistence.base_repository import SqlAlchemyRepository
+
+E = TypeVar("E")
+
+
+class _CachedRepository(Generic[E]):
+    kind: str
+    entity_cls: type
+
+    def __init__(self, inner: SqlAlchemyRepository[E], session: AsyncSession, cache: EntityCache = entity_cache):
+        self._inner = inner
+        self._session = session
+        self._cache = cache
+        self._datetime_fields = [f.name for f in dataclasses.fields(self.entity_cls) if f.type is datetime]
+
+    def _key(self, field: str, value: Any) -> str:
+        return entity_key(self.kind, field, value)
+
+    def _encode(self, entity: E | None) -> dict | None:
+        return dataclasses.asdict(entity) if entity is not None else None
+
+    def _decode(self, data: dict | None) -> E | None:
+        if data is None:
+            return None
+        data = dict(data)
+        for name in self._datetime_fields:
+            if isinstance(data.get(name), str):
+                data[name] = datetime.fromisoformat(data[name])
+        return self.entity_cls(**data)
+
+    async def _get_by_id(self, id: int) -> E | None:
+        key = self._key("id", id)
+        cached = await self._cache.get(key)
+        if cached is not MISSING:
+            # Снимок во внутреннем репозитории — чтобы save() записал только изменённые поля.
+            return self._inner._track(self._decode(cached))
+        epoch = self._cache.epoch
+        entity = await self._inner.get_by_id(id)
+        await self._cache.set(key, self._encode(entity), epoch)
+        return entity
+
+    async def _get_by_account_id(self, account_id: int) -> E | None:
+        key = self._key("account_id", account_id)
+        cached = await self._cache.get(key)
+        if cached is None:
+            return None
+        if cached is not MISSING:
+            entity = await self._get_by_id(cached["id"])
+            if entity is not None and entity.account_id == account_id:
+                return entity
+        epoch = self._cache.epoch
+        entity = await self._inner.get_by_account_id(account_id)
+        await self._cache.set(key, {"id": entity.id} if entity else None, epoch)
+        if entity is not None:
+            await self._cache.set(self._key("id", entity.id), self._encode(entity), epoch)
+        return entity
+
+    def _invalidate(self, entity: E) -> None:
+        keys = [self._key("id", entity.id)]
+        if getattr(entity, "account_id", None) is not None:
+            keys.append(self._key("account_id", entity.account_id))
+        self._cache.invalidate(self._session, keys)
+
+
+class CachedAccountRepository(_CachedRepository[Account], IAccountRepository):
+    kind = "account"
+    entity_cls = Account
+
+    async def get_by_id(self, id: int) -> Account | None:
+        return await self._get_by_id(id)
+
+    async def get_for_update(self, id: int) -> Account | None:
+        return await self._inner.get_for_update(id)
+
+    async def get_by_phone(self, phone: str) -> Account | None:
+        return await self._inner.get_by_phone(phone)
+
+    async def get_all(self, *, skip: int = 0, limit: int = 100) -> list[Account]:
+        return await self._inner.get_all(skip=skip, limit=limit)
+
+    async def add(self, account: Account) -> Account:
+        created = await self._inner.add(account)
+        self._invalidate(created)  # мог быть закэширован «нет записи» с этим id
+        return created
+
+    async def save(self, account: Account) -> Account:
+        saved = await self._inner.save(account)
+        self._invalidate(saved)
+        return saved
+
+    async def try_deduct_balance(self, account_id: int, amount: float) -> float | None:
+        balance = await self._inner.try_deduct_balance(account_id, amount)
+        if balance is not None:
+            self._cache.invalidate(self._session, [self._key("id", account_id)])
+        return balance
+
+    async def try_add_balance(self, account_id: int, amount: float) -> Account | None:
+        account = await self._inner.try_add_balance(account_id, amount)
+        if account is not None:
+            self._invalidate(account)
+        return account
+
+    async def delete(self, account: Account) -> None:
+        await self._inner.delete(account)
+        self._invalidate(account)
+
+
+class CachedCustomerRepository(_CachedRepository[Customer], ICustomerRepository):
+    kind = "customer"
+    entity_cls = Customer
+
+    async def get_by_id(self, id: int) -> Customer | None:
+        return await self._get_by_id(id)
+
+    async def get_by_account_id(self, account_id: int) -> Customer | None:
+        return await self._get_by_account_id(account_id)
+
+    async def get_all(self, *, skip: int = 0, limit: int = 100) -> list[Customer]:
+        return await self._inner.get_all(skip=skip, limit=limit)
+
+    async def get_by_id_with_account(self, id: int) -> tuple[Customer, str | None, float | None] | None:
+        return await self._inner.get_by_id_with_account(id)
+
+    async def get_all_with_account(
+        self, *, skip: int = 0, limit: int = 100
+    ) -> list[tuple[Customer, str | None, float | None]]:
+        return await self._inner.get_all_with_account(skip=skip, limit=limit)
+
+    async def add(self, customer: Customer) -> Customer:
+        created = await self._inner.add(customer)
+        self._invalidate(created)
+        return created
+
+    async def save(self, customer: Customer) -> Customer:
+        saved = await self._inner.save(customer)
+        self._invalidate(saved)
+        return saved
+
+    async def delete(self, customer: Customer) -> None:
+        await self._inner.delete(customer)
+        self._invalidate(customer)
+
+
+class CachedCourierRepository(_CachedRepository[Courier], ICourierRepository):
+    kind = "courier"
+    entity_cls = Courier
+
+    async def get_by_id(self, id: int) -> Courier | None:
+        return await self._get_by_id(id)
+
+    async def get_by_account_id(self, account_id: int) -> Courier | None:
+        return await self._get_by_account_id(account_id)
+
+    async def get_all(self, *, skip: int = 0, limit: int = 100) -> list[Courier]:
+        return await self._inner.get_all(skip=skip, limit=limit)
+
+    async def get_by_id_with_account(self, id: int) -> tuple[Courier, str | None, float | None] | None:
+        return await self._inner.get_by_id_with_account(id)
+
+    async def get_all_with_account(
+        self, *, skip: int = 0, limit: int = 100
+    ) -> list[tuple[Courier, str | None, float | None]]:
+        return await self._inner.get_all_with_account(skip=skip, limit=limit)
+
+    async def add(self, courier: Courier) -> Courier:
+        created = await self._inner.add(courier)
+        self._invalidate(created)
+        return created
+
+    async def save(self, courier: Courier) -> Courier:
+        saved = await self._inner.save(courier)
+        self._invalidate(saved)
+        return saved
+
+    async def delete(self, courier: Courier) -> None:
+        await self._inner.delete(courier)
+        self._invalidate(courier)
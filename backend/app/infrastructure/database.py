@@ -1,12 +1,19 @@
-from sqlalchemy import text
+import logging
+
 from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine, AsyncSession
 
 from app.config import settings
-from app.infrastructure.persistence import (
-    Base,
-)
+from app.infrastructure.cache.entity_cache import entity_cache
+from app.core.metrics import metrics
+from app.infrastructure.migrations import migrate
+from app.infrastructure.pool import engine_options, pool_collector
+from app.infrastructure.sql_stats import instrument_engine
+
+logger = logging.getLogger(__name__)
 
-engine = create_async_engine(settings.database_url, echo=False)
+engine = create_async_engine(settings.database_url, **engine_options("api"))
+instrument_engine(engine)
+metrics.add_collector(pool_collector(engine))
 async_session = async_sessionmaker(
     engine,
     class_=AsyncSession,
@@ -16,51 +23,14 @@ async_session = async_sessionmaker(
 )
 
 
-async def _run_account_migrations(conn) -> None:
-    """Создать таблицу accounts и колонки account_id в customers/couriers, если их ещё нет."""
-    await conn.execute(text("""
-        CREATE TABLE IF NOT EXISTS accounts (
-            id SERIAL PRIMARY KEY,
-            name VARCHAR(255) NOT NULL,
-            phone VARCHAR(20) NOT NULL UNIQUE,
-            password VARCHAR(255) NOT NULL,
-            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
-            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
-        )
-    """))
-    await conn.execute(text("""
-        ALTER TABLE customers
-        ADD COLUMN IF NOT EXISTS account_id INTEGER REFERENCES accounts(id)
-    """))
-    await conn.execute(text("""
-        ALTER TABLE couriers
-        ADD COLUMN IF NOT EXISTS account_id INTEGER REFERENCES accounts(id)
-    """))
-    await conn.execute(text(
-        "CREATE INDEX IF NOT EXISTS ix_customers_account_id ON customers (account_id)"
-    ))
-    await conn.execute(text(
-        "CREATE INDEX IF NOT EXISTS ix_couriers_account_id ON couriers (account_id)"
-    ))
-    # Баланс аккаунта (для заказчика при создании заказа). По умолчанию 100.
-    await conn.execute(text("""
-        ALTER TABLE accounts
-        ADD COLUMN IF NOT EXISTS balance DOUBLE PRECISION NOT NULL DEFAULT 100
-    """))
-
-    # Поле "information" (необязательный текст) для заказов.
-    await conn.execute(text("""
-        ALTER TABLE orders
-        ADD COLUMN IF NOT EXISTS information TEXT
-    """))
-
-
 async def get_db() -> AsyncSession:
     async with async_session() as session:
         try:
             yield session
             await session.commit()
+            await entity_cache.flush(session)
         except Exception:
+            entity_cache.discard(session)
             await session.rollback()
             raise
         finally:
@@ -68,6 +38,9 @@ async def get_db() -> AsyncSession:
 
 
 async def init_db() -> None:
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-        await _run_account_migrations(conn)
\ No newline at end of file
+    """Применить неприменённые миграции (см. app.infrastructure.migrations)."""
+    if not settings.migrate_on_startup:
+        return
+    applied = await migrate(engine)
+    if applied:
+        logger.info("migrations: применены шаги %s", applied)
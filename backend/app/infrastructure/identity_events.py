@@ -0,0 +1,62 @@
+"""
+Публикация изменений роли аккаунта — см. app.core.identity.
+
+Изменение пишется в identity_changes (чтобы процесс, стартовавший позже, узнал о нём)
+и рассылается NOTIFY identity_changed уже работающим процессам. «Изменились все» (очистка
+таблиц аккаунтов) хранится там же строкой account_id = ALL_ACCOUNTS_ID; при очистке
+identity_changes не трогается.
+"""
+
+import json
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.identity import IDENTITY_CHANGED_CHANNEL, identity_registry
+
+ALL_ACCOUNTS_ID = 0  # id аккаунтов начинаются с 1
+
+_UPSERT_CHANGE = text("""
+    INSERT INTO identity_changes (account_id, changed_at) VALUES (:account_id, :at)
+    ON CONFLICT (account_id) DO UPDATE SET changed_at = EXCLUDED.changed_at
+""")
+
+
+async def publish_identity_changed(session: AsyncSession, account_id: int | None) -> None:
+    """NOTIFY об изменении роли аккаунта; процессы API получат его после COMMIT."""
+    if account_id is None:
+        return
+    at = time.time()
+    await session.execute(_UPSERT_CHANGE, {"account_id": account_id, "at": at})
+    payload = json.dumps({"account_id": account_id, "at": at})
+    await session.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": IDENTITY_CHANGED_CHANNEL, "payload": payload},
+    )
+
+
+async def publish_all_identities_changed(session: AsyncSession) -> None:
+    """Роли всех аккаунтов недействительны (таблицы аккаунтов очищены, id пойдут заново): строка
+    ALL_ACCOUNTS_ID для процессов, стартующих позже, и NOTIFY для работающих."""
+    at = time.time()
+    await session.execute(_UPSERT_CHANGE, {"account_id": ALL_ACCOUNTS_ID, "at": at})
+    await session.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": IDENTITY_CHANGED_CHANNEL, "payload": json.dumps({"account_id": None, "at": at})},
+    )
+
+
+async def load_identity_changes(session: AsyncSession) -> None:
+    """При старте процесса: загрузить изменения ролей за срок жизни JWT в реестр."""
+    horizon = time.time() - settings.jwt_expire_minutes * 60
+    result = await session.execute(
+        text("SELECT account_id, changed_at FROM identity_changes WHERE changed_at > :horizon"),
+        {"horizon": horizon},
+    )
+    for account_id, changed_at in result:
+        if account_id == ALL_ACCOUNTS_ID:
+            identity_registry.mark_all_changed(changed_at)
+        else:
+            identity_registry.mark_changed(account_id, changed_at)
@@ -0,0 +1,321 @@
+"""
+Версионированные миграции схемы.
+
+MIGRATIONS — упорядоченный список шагов; применённые записываются в schema_migrations
+(версия, имя, контрольная сумма). Применение — под advisory-блокировкой Postgres в одной
+транзакции: из нескольких одновременно стартующих процессов DDL выполняет один,
+остальные дожидаются блокировки и видят, что делать нечего. Если схема уже актуальна,
+процесс ограничивается одним SELECT из schema_migrations, без блокировок.
+
+Применённый шаг менять нельзя (контрольная сумма не сойдётся — старт упадёт):
+изменения схемы — только новым шагом в конце списка. Для шагов с run в сумму входит
+исходный код функции; шаги, записанные до этого, принимаются по прежней сумме
+(legacy_checksum) и при ближайшем migrate получают новую.
+
+Запуск вручную (например, перед деплоем):
+    python -m app.infrastructure.migrations            # применить
+    python -m app.infrastructure.migrations status     # показать состояние
+    python -m app.infrastructure.migrations reschedule-expiry  # пересчитать очередь истечения
+"""
+
+import argparse
+import asyncio
+import hashlib
+import inspect
+import logging
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+from sqlalchemy import String, bindparam, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from app.config import settings
+from app.domain.order.entity import OPEN_ORDER_STATUSES
+from app.infrastructure.persistence import Base
+
+logger = logging.getLogger(__name__)
+
+# Ключ pg_advisory_xact_lock: один на приложение.
+MIGRATIONS_LOCK_ID = 7_262_001
+
+
+@dataclass(frozen=True)
+class Migration:
+    """Шаг миграции: SQL-выражения и/или функция run. Контрольная сумма — по имени, SQL и исходнику run."""
+
+    version: int
+    name: str
+    statements: tuple[str, ...] = ()
+    run: Callable[[AsyncConnection], Awaitable[None]] | None = None
+
+    def _digest(self):
+        digest = hashlib.sha256(self.name.encode())
+        for statement in self.statements:
+            digest.update(b"\0" + " ".join(statement.split()).encode())
+        return digest
+
+    @property
+    def checksum(self) -> str:
+        digest = self._digest()
+        if self.run is not None:
+            digest.update(b"\0run\0" + " ".join(inspect.getsource(self.run).split()).encode())
+        return digest.hexdigest()
+
+    @property
+    def legacy_checksum(self) -> str | None:
+        """Сумма без исходника run — так записаны шаги с run, применённые до её учёта."""
+        return self._digest().hexdigest() if self.run is not None else None
+
+    async def apply(self, conn: AsyncConnection) -> None:
+        if self.run is not None:
+            await self.run(conn)
+        for statement in self.statements:
+            await conn.execute(text(statement))
+
+
+async def _create_tables(conn: AsyncConnection) -> None:
+    await conn.run_sync(Base.metadata.create_all)
+
+
+async def _reschedule_expiry(conn: AsyncConnection) -> None:
+    """Сроки в order_expiry_queue по settings.order_expiry_timezone — как Order.expires_at в OrderService.
+    Часовой пояс берётся на момент применения; после смены ORDER_EXPIRY_TIMEZONE — команда reschedule-expiry."""
+    await conn.execute(
+        text("""
+            INSERT INTO order_expiry_queue (order_id, due_at)
+            SELECT id, (date_when + 1)::timestamp AT TIME ZONE :tz FROM orders WHERE status = ANY(:statuses)
+            ON CONFLICT (order_id) DO UPDATE SET due_at = EXCLUDED.due_at
+        """).bindparams(bindparam("statuses", type_=ARRAY(String))),
+        {"tz": settings.order_expiry_timezone, "statuses": list(OPEN_ORDER_STATUSES)},
+    )
+
+
+async def expiry_queue_mismatches(conn: AsyncConnection) -> int:
+    """Записи order_expiry_queue, чей due_at посчитан не по текущему ORDER_EXPIRY_TIMEZONE."""
+    result = await conn.execute(
+        text("""
+            SELECT count(*) FROM order_expiry_queue q JOIN orders o ON o.id = q.order_id
+            WHERE q.due_at <> (o.date_when + 1)::timestamp AT TIME ZONE :tz
+        """),
+        {"tz": settings.order_expiry_timezone},
+    )
+    return result.scalar_one()
+
+
+MIGRATIONS: list[Migration] = [
+    # Таблицы по ORM-моделям (на существующей БД ничего не делает).
+    Migration(1, "create tables from models", run=_create_tables),
+    Migration(2, "accounts and account_id in customers/couriers", (
+        """
+        CREATE TABLE IF NOT EXISTS accounts (
+            id SERIAL PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            phone VARCHAR(20) NOT NULL UNIQUE,
+            password VARCHAR(255) NOT NULL,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """,
+        "ALTER TABLE customers ADD COLUMN IF NOT EXISTS account_id INTEGER REFERENCES accounts(id)",
+        "ALTER TABLE couriers ADD COLUMN IF NOT EXISTS account_id INTEGER REFERENCES accounts(id)",
+        "CREATE INDEX IF NOT EXISTS ix_customers_account_id ON customers (account_id)",
+        "CREATE INDEX IF NOT EXISTS ix_couriers_account_id ON couriers (account_id)",
+    )),
+    # Баланс аккаунта (для заказчика при создании заказа). По умолчанию 100.
+    Migration(3, "accounts.balance", (
+        "ALTER TABLE accounts ADD COLUMN IF NOT EXISTS balance DOUBLE PRECISION NOT NULL DEFAULT 100",
+    )),
+    # Когда менялась роль аккаунта (customer/courier) — для инвалидации claims роли в JWT.
+    Migration(4, "identity_changes", (
+        """
+        CREATE TABLE IF NOT EXISTS identity_changes (
+            account_id INTEGER PRIMARY KEY,
+            changed_at DOUBLE PRECISION NOT NULL
+        )
+        """,
+    )),
+    # Поле "information" (необязательный текст) для заказов.
+    Migration(5, "orders.information", (
+        "ALTER TABLE orders ADD COLUMN IF NOT EXISTS information TEXT",
+    )),
+    # Индексы под реальные запросы.
+    Migration(6, "order board indexes", (
+        # Keyset-пагинация GET /orders (sort=created_at / sort=date_when).
+        "CREATE INDEX IF NOT EXISTS ix_orders_created_at_id ON orders (created_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_orders_date_when_id ON orders (date_when, id)",
+        # Доска заказов: status IN (...) + диапазон date_when.
+        "CREATE INDEX IF NOT EXISTS ix_orders_status_date_when ON orders (status, date_when)",
+        # only_own=true: заказы заказчика, свежие сверху.
+        "CREATE INDEX IF NOT EXISTS ix_orders_customer_id_created_at ON orders (customer_id, created_at)",
+        # Заказы курьера; строки без курьера в индекс не попадают.
+        "CREATE INDEX IF NOT EXISTS ix_orders_courier_id ON orders (courier_id) WHERE courier_id IS NOT NULL",
+        # Частичные индексы по открытым статусам — маленькие и горячие.
+        "CREATE INDEX IF NOT EXISTS ix_orders_active_date_when ON orders (date_when, id) WHERE status = 'active'",
+        "CREATE INDEX IF NOT EXISTS ix_orders_new_date_when ON orders (date_when, id) WHERE status = 'new'",
+        # expire_orders: только ещё не истёкшие заказы.
+        "CREATE INDEX IF NOT EXISTS ix_orders_not_expired ON orders (date_when) WHERE status <> 'expired'",
+    )),
+    # Триграммные GIN под ILIKE '%...%' (place, customer_name).
+    Migration(7, "pg_trgm search indexes", (
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX IF NOT EXISTS ix_orders_where_from_trgm ON orders USING gin (where_from gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS ix_orders_where_to_trgm ON orders USING gin (where_to gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS ix_accounts_name_trgm ON accounts USING gin (name gin_trgm_ops)",
+    )),
+    # expire_orders выбирает кандидатов по ix_orders_active_date_when; индекс по всем неистёкшим не нужен.
+    Migration(8, "drop ix_orders_not_expired", (
+        "DROP INDEX IF EXISTS ix_orders_not_expired",
+    )),
+    # Очередь истечения: заказ истекает в начале дня после date_when. Заполняется для уже открытых заказов.
+    Migration(9, "order_expiry_queue", (
+        """
+        CREATE TABLE IF NOT EXISTS order_expiry_queue (
+            order_id INTEGER PRIMARY KEY REFERENCES orders(id) ON DELETE CASCADE,
+            due_at TIMESTAMPTZ NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS ix_order_expiry_queue_due_at ON order_expiry_queue (due_at)",
+        """
+        INSERT INTO order_expiry_queue (order_id, due_at)
+        SELECT id, (date_when + 1)::timestamp AT TIME ZONE 'Europe/Moscow' FROM orders WHERE status = 'active'
+        ON CONFLICT (order_id) DO NOTHING
+        """,
+    )),
+    # Статуса 'new' нет (OrderStatus: active/expired/completed/canceled) — частичный индекс шага 6 всегда пуст.
+    Migration(10, "drop ix_orders_new_date_when", (
+        "DROP INDEX IF EXISTS ix_orders_new_date_when",
+    )),
+    # Шаг 9 заполнил очередь по 'Europe/Moscow'; пересчитать по часовому поясу из настроек.
+    Migration(11, "order_expiry_queue in configured timezone", run=_reschedule_expiry),
+]
+
+
+async def _applied(conn: AsyncConnection) -> dict[int, str] | None:
+    """version → checksum применённых шагов; None — таблицы schema_migrations ещё нет."""
+    try:
+        result = await conn.execute(text("SELECT version, checksum FROM schema_migrations"))
+    except ProgrammingError:
+        return None
+    return dict(result.all())
+
+
+def _legacy(applied: dict[int, str]) -> list[Migration]:
+    """Применённые шаги с run, записанные с суммой без исходника run (обновляются в migrate)."""
+    return [
+        m for m in MIGRATIONS
+        if m.legacy_checksum is not None and applied.get(m.version) == m.legacy_checksum != m.checksum
+    ]
+
+
+def _pending(applied: dict[int, str]) -> list[Migration]:
+    """Неприменённые шаги. Изменённый применённый шаг — ошибка."""
+    pending = []
+    for migration in MIGRATIONS:
+        checksum = applied.get(migration.version)
+        if checksum is None:
+            pending.append(migration)
+        elif checksum not in (migration.checksum, migration.legacy_checksum):
+            raise RuntimeError(
+                f"Миграция {migration.version} ({migration.name}) изменена после применения: "
+                "изменения схемы добавляйте новым шагом"
+            )
+    unknown = sorted(set(applied) - {m.version for m in MIGRATIONS})
+    if unknown:
+        logger.warning("migrations: в БД есть шаги новее этого кода: %s", unknown)
+    return pending
+
+
+async def migrate(engine: AsyncEngine) -> list[int]:
+    """Применить неприменённые шаги. Возвращает их версии (пусто — схема актуальна)."""
+    async with engine.connect() as conn:
+        applied = await _applied(conn)
+    if applied is not None and not _pending(applied) and not _legacy(applied):
+        return []
+
+    async with engine.begin() as conn:
+        await conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": MIGRATIONS_LOCK_ID})
+        await conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                checksum TEXT NOT NULL,
+                applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            )
+        """))
+        # Пока ждали блокировку, шаги мог применить другой процесс.
+        applied = await _applied(conn)
+        pending = _pending(applied)
+        for migration in _legacy(applied):
+            await conn.execute(
+                text("UPDATE schema_migrations SET checksum = :checksum WHERE version = :version"),
+                {"version": migration.version, "checksum": migration.checksum},
+            )
+        for migration in pending:
+            logger.info("migrations: %s %s", migration.version, migration.name)
+            await migration.apply(conn)
+            await conn.execute(
+                text("INSERT INTO schema_migrations (version, name, checksum) VALUES (:version, :name, :checksum)"),
+                {"version": migration.version, "name": migration.name, "checksum": migration.checksum},
+            )
+    return [m.version for m in pending]
+
+
+async def status(engine: AsyncEngine) -> list[tuple[Migration, str]]:
+    """Состояние каждого шага: applied / pending / changed."""
+    async with engine.connect() as conn:
+        applied = await _applied(conn) or {}
+    states = []
+    for migration in MIGRATIONS:
+        checksum = applied.get(migration.version)
+        if checksum is None:
+            states.append((migration, "pending"))
+        else:
+            matches = checksum in (migration.checksum, migration.legacy_checksum)
+            states.append((migration, "applied" if matches else "changed"))
+    return states
+
+
+async def reschedule_expiry(engine: AsyncEngine) -> int:
+    """Пересчитать order_expiry_queue по текущему ORDER_EXPIRY_TIMEZONE. Возвращает, сколько было не по нему."""
+    async with engine.begin() as conn:
+        mismatched = await expiry_queue_mismatches(conn)
+        await _reschedule_expiry(conn)
+    return mismatched
+
+
+def main() -> None:
+    from app.infrastructure.database import engine
+
+    parser = argparse.ArgumentParser(prog="python -m app.infrastructure.migrations", description="Миграции схемы БД")
+    parser.add_argument("command", nargs="?", choices=["upgrade", "status", "reschedule-expiry"], default="upgrade")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s %(message)s")
+
+    async def run() -> None:
+        try:
+            if args.command == "status":
+                states = await status(engine)
+                for migration, state in states:
+                    print(f"{migration.version:>4}  {state:<8}  {migration.name}")
+                if all(state != "pending" for _, state in states):
+                    async with engine.connect() as conn:
+                        mismatched = await expiry_queue_mismatches(conn)
+                    if mismatched:
+                        print(f"order_expiry_queue: {mismatched} записей не по ORDER_EXPIRY_TIMEZONE="
+                              f"{settings.order_expiry_timezone} — выполните reschedule-expiry")
+            elif args.command == "reschedule-expiry":
+                mismatched = await reschedule_expiry(engine)
+                print(f"Очередь истечения пересчитана ({settings.order_expiry_timezone}), исправлено записей: {mismatched}")
+            else:
+                applied = await migrate(engine)
+                print(f"Применено шагов: {len(applied)}" if applied else "Схема актуальна.")
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
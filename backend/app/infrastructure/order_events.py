@@ -0,0 +1,201 @@
+"""
+События заказов через Postgres LISTEN/NOTIFY.
+
+Запись: publish_order_event внутри транзакции запроса — Postgres доставит NOTIFY
+только после COMMIT, откаченные изменения никто не увидит.
+Чтение: одно LISTEN-соединение на процесс API (order_event_hub), события
+раздаются подписчикам /orders/stream по их фильтрам (статусы, место).
+На то же соединение можно повесить другие каналы (add_channel), например
+инвалидацию claims роли в JWT, и обработчики самих событий заказов (add_order_handler),
+например сброс кэша поиска.
+"""
+
+import asyncio
+import json
+import logging
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime
+from typing import Any
+
+import asyncpg
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+ORDER_EVENTS_CHANNEL = "order_events"
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+def _json_default(value: Any) -> str:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Не сериализуется в JSON: {type(value).__name__}")
+
+
+def order_event_payload(event: str, order: Any | None = None, **extra: Any) -> str:
+    data: dict[str, Any] = {"event": event, **extra}
+    if order is not None:
+        data["order"] = asdict(order)
+    return json.dumps(data, default=_json_default, ensure_ascii=False)
+
+
+async def publish_order_event(session: AsyncSession, payload: str) -> None:
+    """NOTIFY в канал событий заказов (доставляется после COMMIT текущей транзакции)."""
+    await session.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": ORDER_EVENTS_CHANNEL, "payload": payload},
+    )
+
+
+@dataclass(eq=False)
+class OrderSubscription:
+    """Подписчик ленты: фильтры и очередь событий (None в очереди — подписка закрыта)."""
+
+    statuses: set[str] | None = None
+    place: str | None = None
+    queue: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE))
+
+    def matches(self, event: dict) -> bool:
+        order = event.get("order")
+        if order is None:
+            # Массовые события (например, истечение заказов) получают все.
+            return True
+        if self.statuses and order.get("status") not in self.statuses:
+            return False
+        if self.place:
+            needle = self.place.lower()
+            if needle not in order.get("where_from", "").lower() and needle not in order.get("where_to", "").lower():
+                return False
+        return True
+
+
+class OrderEventHub:
+    """Одно LISTEN-соединение на процесс и раздача событий подписчикам."""
+
+    RECONNECT_DELAY_SECONDS = 5.0
+
+    def __init__(self, dsn: str):
+        self._dsn = dsn
+        self._conn: asyncpg.Connection | None = None
+        self._lock = asyncio.Lock()
+        self._subscribers: set[OrderSubscription] = set()
+        self._channels: dict[str, Callable[[str], None]] = {}
+        self._order_handlers: list[Callable[[dict], None]] = []
+        self._disconnect_hooks: list[Callable[[], None]] = []
+        self._stopping = False
+        self._lost = False  # соединение рвалось: после нового LISTEN ещё раз вызвать disconnect-хуки
+
+    def add_channel(
+        self,
+        channel: str,
+        handler: Callable[[str], None],
+        on_disconnect: Callable[[], None] | None = None,
+    ) -> None:
+        """Слушать ещё один канал на том же соединении. on_disconnect — события могли потеряться
+        (вызывается при разрыве и повторно, когда LISTEN на новом соединении уже работает)."""
+        self._channels[channel] = handler
+        if on_disconnect is not None:
+            self._disconnect_hooks.append(on_disconnect)
+
+    def add_order_handler(self, handler: Callable[[dict], None], on_disconnect: Callable[[], None] | None = None) -> None:
+        """Вызывать handler(event) на каждое событие заказов (помимо подписчиков ленты)."""
+        self._order_handlers.append(handler)
+        if on_disconnect is not None:
+            self._disconnect_hooks.append(on_disconnect)
+
+    async def start(self) -> None:
+        self._stopping = False
+        await self._ensure_listening()
+
+    async def _ensure_listening(self) -> None:
+        async with self._lock:
+            if self._conn is not None and not self._conn.is_closed():
+                return
+            self._conn = await asyncpg.connect(self._dsn)
+            self._conn.add_termination_listener(self._on_terminated)
+            await self._conn.add_listener(ORDER_EVENTS_CHANNEL, self._on_notify)
+            for channel, handler in self._channels.items():
+                await self._conn.add_listener(
+                    channel, lambda conn, pid, ch, payload, handler=handler: handler(payload)
+                )
+            logger.info("order events: LISTEN %s", ", ".join([ORDER_EVENTS_CHANNEL, *self._channels]))
+            if self._lost:
+                # NOTIFY между разрывом и этим LISTEN не дошли: то, что хуки сбросили при разрыве,
+                # могло быть снова заполнено устаревшими данными в этом промежутке.
+                self._lost = False
+                self._run_disconnect_hooks()
+
+    def _run_disconnect_hooks(self) -> None:
+        for hook in self._disconnect_hooks:
+            try:
+                hook()
+            except Exception:
+                logger.exception("order events: ошибка в обработчике разрыва")
+
+    def _on_terminated(self, connection) -> None:
+        if self._stopping:
+            return
+        logger.warning("order events: LISTEN-соединение потеряно, переподключаемся")
+        self._lost = True
+        self._run_disconnect_hooks()
+        asyncio.get_running_loop().create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        while not self._stopping:
+            try:
+                await self._ensure_listening()
+                return
+            except (OSError, asyncpg.PostgresError):
+                logger.exception("order events: не удалось переподключиться")
+                await asyncio.sleep(self.RECONNECT_DELAY_SECONDS)
+
+    def _on_notify(self, connection, pid, channel, payload: str) -> None:
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.warning("order events: битый payload %r", payload)
+            return
+        for handler in self._order_handlers:
+            handler(event)
+        for subscription in list(self._subscribers):
+            if not subscription.matches(event):
+                continue
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Клиент не успевает читать — отключаем его, он переподключится и перечитает список.
+                logger.warning("order events: подписчик не успевает, отключаем")
+                self._close(subscription)
+
+    def _close(self, subscription: OrderSubscription) -> None:
+        self._subscribers.discard(subscription)
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(None)
+
+    async def subscribe(self, statuses: set[str] | None = None, place: str | None = None) -> OrderSubscription:
+        await self._ensure_listening()
+        subscription = OrderSubscription(statuses=statuses, place=place)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: OrderSubscription) -> None:
+        self._subscribers.discard(subscription)
+
+    async def stop(self) -> None:
+        self._stopping = True
+        for subscription in list(self._subscribers):
+            self._close(subscription)
+        if self._conn is not None and not self._conn.is_closed():
+            await self._conn.close()
+        self._conn = None
+
+
+# LISTEN держит сессию соединения: через PgBouncer в режиме transaction не работает — см. database_listen_url.
+order_event_hub = OrderEventHub(
+    (settings.database_listen_url or settings.database_url).replace("postgresql+asyncpg://", "postgresql://", 1)
+)
@@ -1,18 +1,18 @@
 import logging
 
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update
 
 from app.domain.account.entity import Account
 from app.domain.account.repository import IAccountRepository
+from app.infrastructure.persistence.base_repository import SqlAlchemyRepository
 from app.infrastructure.persistence.models import AccountModel
 
 logger = logging.getLogger(__name__)
 
 
-class AccountRepository(IAccountRepository):
-    def __init__(self, session: AsyncSession):
-        self._session = session
+class AccountRepository(SqlAlchemyRepository[Account], IAccountRepository):
+    model = AccountModel
+    writable_fields = ("name", "phone", "password", "balance")
 
     def _to_entity(self, model: AccountModel) -> Account:
         return Account(
@@ -26,46 +26,63 @@ class AccountRepository(IAccountRepository):
         )
 
     async def get_by_id(self, id: int) -> Account | None:
-        result = await self._session.execute(select(AccountModel).where(AccountModel.id == id))
-        model = result.scalar_one_or_none()
-        return self._to_entity(model) if model else None
+        return self._track(await self._loader(AccountModel.id).load(id))
+
+    async def get_for_update(self, id: int) -> Account | None:
+        """SELECT ... FOR UPDATE: строка заблокирована до конца транзакции, читается мимо загрузчика."""
+        result = await self._session.execute(self._select_rows().where(AccountModel.id == id).with_for_update())
+        row = result.first()
+        return self._track(self._to_entity(row) if row else None)
 
     async def get_by_phone(self, phone: str) -> Account | None:
         result = await self._session.execute(select(AccountModel).where(AccountModel.phone == phone))
         model = result.scalar_one_or_none()
-        return self._to_entity(model) if model else None
+        return self._track(self._to_entity(model) if model else None)
 
     async def get_all(self, *, skip: int = 0, limit: int = 100) -> list[Account]:
-        result = await self._session.execute(select(AccountModel).offset(skip).limit(limit))
-        return [self._to_entity(m) for m in result.scalars().all()]
+        return await self._fetch_entities(self._select_rows().offset(skip).limit(limit))
 
     async def add(self, account: Account) -> Account:
-        model = AccountModel(
-            name=account.name,
-            phone=account.phone,
-            password=account.password,
-            balance=account.balance,
-        )
-        self._session.add(model)
-        await self._session.flush()
-        await self._session.refresh(model)
-        return self._to_entity(model)
+        return await self._insert_returning(account)
 
     async def save(self, account: Account) -> Account:
         logger.info("AccountRepository.save: account_id=%s balance=%s", account.id, account.balance)
-        result = await self._session.execute(select(AccountModel).where(AccountModel.id == account.id))
-        model = result.scalar_one()
-        model.name = account.name
-        model.phone = account.phone
-        model.password = account.password
-        model.balance = account.balance
-        await self._session.flush()
-        logger.info("AccountRepository.save: flush выполнен account_id=%s", account.id)
-        await self._session.refresh(model)
-        return self._to_entity(model)
+        return await self._update_returning(account)
+
+    async def try_deduct_balance(self, account_id: int, amount: float) -> float | None:
+        """
+        Один запрос: UPDATE accounts SET balance = balance - :amount
+        WHERE id = :id AND balance >= :amount RETURNING balance.
+        Возвращает новый баланс; None — аккаунта нет или средств недостаточно.
+        """
+        result = await self._session.execute(
+            update(AccountModel)
+            .where(AccountModel.id == account_id, AccountModel.balance >= amount)
+            .values(balance=AccountModel.balance - amount)
+            .returning(AccountModel.balance)
+        )
+        balance = result.scalar_one_or_none()
+        self._forget_loaded()
+        return float(balance) if balance is not None else None
 
     async def delete(self, account: Account) -> None:
         result = await self._session.execute(select(AccountModel).where(AccountModel.id == account.id))
         model = result.scalar_one()
         await self._session.delete(model)
         await self._session.flush()
+        self._forget_loaded()
+
+    async def try_add_balance(self, account_id: int, amount: float) -> Account | None:
+        """
+        Один запрос: UPDATE accounts SET balance = balance + :amount WHERE id = :id RETURNING *.
+        Возвращает аккаунт с новым балансом; None — аккаунта нет.
+        """
+        result = await self._session.execute(
+            update(AccountModel)
+            .where(AccountModel.id == account_id)
+            .values(balance=AccountModel.balance + amount)
+            .returning(AccountModel)
+        )
+        model = result.scalar_one_or_none()
+        self._forget_loaded()
+        return self._track(self._to_entity(model) if model else None)
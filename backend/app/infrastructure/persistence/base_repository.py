@@ -0,0 +1,107 @@
+"""Базовый SQLAlchemy-репозиторий: запись одним INSERT/UPDATE ... RETURNING, чтение списков без ORM-гидратации."""
+
+import inspect
+from typing import Any, Generic, TypeVar
+
+from sqlalchemy import Column, Select, any_, bindparam, insert, select, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.metrics import repository_call_duration, timed
+from app.infrastructure.persistence.loader import BatchLoader, clear_loaders, get_loader
+from app.infrastructure.persistence.models import Base
+
+E = TypeVar("E")
+
+
+class SqlAlchemyRepository(Generic[E]):
+    """
+    Базовый репозиторий. Наследник задаёт model, writable_fields и _to_entity.
+
+    add/save — один запрос с RETURNING, строка сразу превращается в сущность
+    (без SELECT перед записью и refresh после). save пишет только поля, изменённые
+    с момента загрузки сущности этим репозиторием (см. _track); если снимка нет —
+    пишет все writable_fields.
+
+    Списки читаются через _select_rows/_fetch_entities: Core-select колонок таблицы,
+    строка сразу идёт в _to_entity — без ORM-объектов и роста identity map сессии.
+
+    Точечные чтения по ключу — через _loader (см. persistence.loader): запросы одного
+    тика склеиваются в WHERE key = ANY(:keys) и запоминаются до конца запроса.
+    Любая запись через этот класс сбрасывает запомненное по таблице.
+
+    Публичные async-методы наследника оборачиваются метрикой repository_call_duration_seconds
+    (число вызовов и длительность по репозиторию и методу).
+    """
+
+    model: type[Base]
+    writable_fields: tuple[str, ...] = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for name, attr in list(vars(cls).items()):
+            if not name.startswith("_") and inspect.iscoroutinefunction(attr):
+                setattr(cls, name, timed(repository_call_duration, cls.__name__, name)(attr))
+
+    def __init__(self, session: AsyncSession):
+        self._session = session
+        self._snapshots: dict[int, dict[str, Any]] = {}
+
+    def _to_entity(self, model: Any) -> E:
+        raise NotImplementedError
+
+    def _select_rows(self) -> Select:
+        """SELECT колонок таблицы модели (строки, а не ORM-объекты)."""
+        return select(self.model.__table__)
+
+    async def _fetch_entities(self, stmt: Select) -> list[E]:
+        result = await self._session.execute(stmt)
+        return [self._to_entity(row) for row in result]
+
+    def _loader(self, column: Column) -> BatchLoader:
+        """Загрузчик сущностей по колонке (id, account_id, ...) для текущей сессии."""
+
+        async def batch(keys: list) -> dict:
+            stmt = self._select_rows().where(column == any_(bindparam("keys", keys, type_=ARRAY(column.type))))
+            result = await self._session.execute(stmt)
+            found: dict = {}
+            for row in result:
+                found.setdefault(getattr(row, column.key), self._to_entity(row))
+            return found
+
+        return get_loader(self._session, f"{self.model.__tablename__}.{column.key}", batch)
+
+    def _forget_loaded(self) -> None:
+        clear_loaders(self._session, self.model.__tablename__)
+
+    def _values(self, entity: E) -> dict[str, Any]:
+        return {name: getattr(entity, name) for name in self.writable_fields}
+
+    def _track(self, entity: E | None) -> E | None:
+        """Запомнить значения полей загруженной сущности, чтобы save() отправил только изменения."""
+        if entity is not None:
+            self._snapshots[entity.id] = self._values(entity)
+        return entity
+
+    async def _insert_returning(self, entity: E) -> E:
+        result = await self._session.execute(
+            insert(self.model).values(**self._values(entity)).returning(self.model)
+        )
+        self._forget_loaded()
+        return self._track(self._to_entity(result.scalar_one()))
+
+    async def _update_returning(self, entity: E) -> E:
+        values = self._values(entity)
+        snapshot = self._snapshots.get(entity.id)
+        if snapshot is not None:
+            values = {name: value for name, value in values.items() if snapshot.get(name) != value}
+            if not values:
+                return entity
+        result = await self._session.execute(
+            update(self.model)
+            .where(self.model.id == entity.id)
+            .values(**values)
+            .returning(self.model)
+        )
+        self._forget_loaded()
+        return self._track(self._to_entity(result.scalar_one()))
@@ -1,14 +1,15 @@
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import Select, select
 
 from app.domain.courier.entity import Courier
 from app.domain.courier.repository import ICourierRepository
-from app.infrastructure.persistence.models import CourierModel
+from app.infrastructure.identity_events import publish_identity_changed
+from app.infrastructure.persistence.base_repository import SqlAlchemyRepository
+from app.infrastructure.persistence.models import AccountModel, CourierModel
 
 
-class CourierRepository(ICourierRepository):
-    def __init__(self, session: AsyncSession):
-        self._session = session
+class CourierRepository(SqlAlchemyRepository[Courier], ICourierRepository):
+    model = CourierModel
+    writable_fields = ("phone", "description", "account_id")
 
     def _to_entity(self, model: CourierModel) -> Courier:
         return Courier(
@@ -21,44 +22,55 @@ class CourierRepository(ICourierRepository):
         )
 
     async def get_by_id(self, id: int) -> Courier | None:
-        result = await self._session.execute(select(CourierModel).where(CourierModel.id == id))
-        model = result.scalar_one_or_none()
-        return self._to_entity(model) if model else None
+        return self._track(await self._loader(CourierModel.id).load(id))
 
     async def get_by_account_id(self, account_id: int) -> Courier | None:
-        result = await self._session.execute(
-            select(CourierModel).where(CourierModel.account_id == account_id)
-        )
-        model = result.scalar_one_or_none()
-        return self._to_entity(model) if model else None
+        return self._track(await self._loader(CourierModel.account_id).load(account_id))
 
     async def get_all(self, *, skip: int = 0, limit: int = 100) -> list[Courier]:
-        result = await self._session.execute(select(CourierModel).offset(skip).limit(limit))
-        return [self._to_entity(m) for m in result.scalars().all()]
+        return await self._fetch_entities(self._select_rows().offset(skip).limit(limit))
 
-    async def add(self, courier: Courier) -> Courier:
-        model = CourierModel(
-            phone=courier.phone,
-            description=courier.description,
-            account_id=courier.account_id,
+    def _select_with_account(self) -> Select:
+        """Строки couriers + имя и баланс аккаунта одним LEFT JOIN."""
+        return (
+            self._select_rows()
+            .add_columns(AccountModel.name.label("account_name"), AccountModel.balance.label("account_balance"))
+            .outerjoin(AccountModel, CourierModel.account_id == AccountModel.id)
         )
-        self._session.add(model)
-        await self._session.flush()
-        await self._session.refresh(model)
-        return self._to_entity(model)
+
+    def _with_account(self, row) -> tuple[Courier, str | None, float | None]:
+        balance = row.account_balance
+        return self._to_entity(row), row.account_name, float(balance) if balance is not None else None
+
+    async def get_by_id_with_account(self, id: int) -> tuple[Courier, str | None, float | None] | None:
+        result = await self._session.execute(self._select_with_account().where(CourierModel.id == id))
+        row = result.one_or_none()
+        return self._with_account(row) if row else None
+
+    async def get_all_with_account(
+        self, *, skip: int = 0, limit: int = 100
+    ) -> list[tuple[Courier, str | None, float | None]]:
+        result = await self._session.execute(self._select_with_account().offset(skip).limit(limit))
+        return [self._with_account(row) for row in result]
+
+    async def add(self, courier: Courier) -> Courier:
+        created = await self._insert_returning(courier)
+        await publish_identity_changed(self._session, created.account_id)
+        return created
 
     async def save(self, courier: Courier) -> Courier:
-        result = await self._session.execute(select(CourierModel).where(CourierModel.id == courier.id))
-        model = result.scalar_one()
-        model.phone = courier.phone
-        model.description = courier.description
-        model.account_id = courier.account_id
-        await self._session.flush()
-        await self._session.refresh(model)
-        return self._to_entity(model)
+        snapshot = self._snapshots.get(courier.id)
+        previous_account_id = snapshot["account_id"] if snapshot else None
+        saved = await self._update_returning(courier)
+        if snapshot is None or previous_account_id != saved.account_id:
+            await publish_identity_changed(self._session, previous_account_id)
+            await publish_identity_changed(self._session, saved.account_id)
+        return saved
 
     async def delete(self, courier: Courier) -> None:
         result = await self._session.execute(select(CourierModel).where(CourierModel.id == courier.id))
         model = result.scalar_one()
         await self._session.delete(model)
         await self._session.flush()
+        self._forget_loaded()
+        await publish_identity_changed(self._session, courier.account_id)
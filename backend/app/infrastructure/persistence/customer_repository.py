@@ -1,16 +1,17 @@
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import Select, select
 
 from app.domain.customer.entity import Customer
 from app.domain.customer.repository import ICustomerRepository
-from app.infrastructure.persistence.models import CustomerModel
+from app.infrastructure.identity_events import publish_identity_changed
+from app.infrastructure.persistence.base_repository import SqlAlchemyRepository
+from app.infrastructure.persistence.models import AccountModel, CustomerModel
 
 
-class CustomerRepository(ICustomerRepository):
+class CustomerRepository(SqlAlchemyRepository[Customer], ICustomerRepository):
     """Реализация репозитория заказчиков через SQLAlchemy."""
 
-    def __init__(self, session: AsyncSession):
-        self._session = session
+    model = CustomerModel
+    writable_fields = ("phone", "description", "account_id")
 
     def _to_entity(self, model: CustomerModel) -> Customer:
         return Customer(
@@ -23,44 +24,55 @@ class CustomerRepository(ICustomerRepository):
         )
 
     async def get_by_id(self, id: int) -> Customer | None:
-        result = await self._session.execute(select(CustomerModel).where(CustomerModel.id == id))
-        model = result.scalar_one_or_none()
-        return self._to_entity(model) if model else None
+        return self._track(await self._loader(CustomerModel.id).load(id))
 
     async def get_by_account_id(self, account_id: int) -> Customer | None:
-        result = await self._session.execute(
-            select(CustomerModel).where(CustomerModel.account_id == account_id)
-        )
-        model = result.scalar_one_or_none()
-        return self._to_entity(model) if model else None
+        return self._track(await self._loader(CustomerModel.account_id).load(account_id))
 
     async def get_all(self, *, skip: int = 0, limit: int = 100) -> list[Customer]:
-        result = await self._session.execute(select(CustomerModel).offset(skip).limit(limit))
-        return [self._to_entity(m) for m in result.scalars().all()]
+        return await self._fetch_entities(self._select_rows().offset(skip).limit(limit))
 
-    async def add(self, customer: Customer) -> Customer:
-        model = CustomerModel(
-            phone=customer.phone,
-            description=customer.description,
-            account_id=customer.account_id,
+    def _select_with_account(self) -> Select:
+        """Строки customers + имя и баланс аккаунта одним LEFT JOIN."""
+        return (
+            self._select_rows()
+            .add_columns(AccountModel.name.label("account_name"), AccountModel.balance.label("account_balance"))
+            .outerjoin(AccountModel, CustomerModel.account_id == AccountModel.id)
         )
-        self._session.add(model)
-        await self._session.flush()
-        await self._session.refresh(model)
-        return self._to_entity(model)
+
+    def _with_account(self, row) -> tuple[Customer, str | None, float | None]:
+        balance = row.account_balance
+        return self._to_entity(row), row.account_name, float(balance) if balance is not None else None
+
+    async def get_by_id_with_account(self, id: int) -> tuple[Customer, str | None, float | None] | None:
+        result = await self._session.execute(self._select_with_account().where(CustomerModel.id == id))
+        row = result.one_or_none()
+        return self._with_account(row) if row else None
+
+    async def get_all_with_account(
+        self, *, skip: int = 0, limit: int = 100
+    ) -> list[tuple[Customer, str | None, float | None]]:
+        result = await self._session.execute(self._select_with_account().offset(skip).limit(limit))
+        return [self._with_account(row) for row in result]
+
+    async def add(self, customer: Customer) -> Customer:
+        created = await self._insert_returning(customer)
+        await publish_identity_changed(self._session, created.account_id)
+        return created
 
     async def save(self, customer: Customer) -> Customer:
-        result = await self._session.execute(select(CustomerModel).where(CustomerModel.id == customer.id))
-        model = result.scalar_one()
-        model.phone = customer.phone
-        model.description = customer.description
-        model.account_id = customer.account_id
-        await self._session.flush()
-        await self._session.refresh(model)
-        return self._to_entity(model)
+        snapshot = self._snapshots.get(customer.id)
+        previous_account_id = snapshot["account_id"] if snapshot else None
+        saved = await self._update_returning(customer)
+        if snapshot is None or previous_account_id != saved.account_id:
+            await publish_identity_changed(self._session, previous_account_id)
+            await publish_identity_changed(self._session, saved.account_id)
+        return saved
 
     async def delete(self, customer: Customer) -> None:
         result = await self._session.execute(select(CustomerModel).where(CustomerModel.id == customer.id))
         model = result.scalar_one()
         await self._session.delete(model)
         await self._session.flush()
+        self._forget_loaded()
+        await publish_identity_changed(self._session, customer.account_id)
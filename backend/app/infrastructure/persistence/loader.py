@@ -0,0 +1,100 @@
+"""
+Пакетная загрузка сущностей в пределах одного запроса (DataLoader).
+
+Вызовы load() из одного «тика» event loop собираются в один запрос
+WHERE key = ANY(:keys), результаты запоминаются до конца запроса. Загрузчики
+живут в session.info, поэтому привязаны к сессии get_db и умирают вместе с ней.
+"""
+
+import asyncio
+import copy
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Generic, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+BatchFn = Callable[[list[K]], Awaitable[dict[K, V]]]
+
+
+class BatchLoader(Generic[K, V]):
+    def __init__(self, batch_fn: BatchFn, lock: asyncio.Lock):
+        self._batch_fn = batch_fn
+        self._lock = lock  # общий на сессию: AsyncSession не допускает параллельных запросов
+        self._futures: dict[K, asyncio.Future] = {}
+        self._pending: list[tuple[K, asyncio.Future]] = []
+        self._tasks: set[asyncio.Task] = set()  # отправленные пачки (ссылка — чтобы задачу не собрал GC)
+
+    async def load(self, key: K) -> V | None:
+        """Сущность по ключу (копия — вызывающий может её менять) или None."""
+        future = self._futures.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._futures[key] = future
+            self._pending.append((key, future))
+            if len(self._pending) == 1:
+                # Отправить пачку, когда отработают все задачи текущего тика.
+                loop.call_soon(self._schedule)
+        value = await asyncio.shield(future)
+        return copy.copy(value)
+
+    def _schedule(self) -> None:
+        batch, self._pending = self._pending, []
+        task = asyncio.get_running_loop().create_task(self._dispatch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(lambda task: self._finished(task, batch))
+
+    async def _dispatch(self, batch: list[tuple[K, asyncio.Future]]) -> None:
+        async with self._lock:
+            found = await self._batch_fn([key for key, _ in batch])
+        for key, future in batch:
+            if not future.done():
+                future.set_result(found.get(key))
+
+    def _finished(self, task: asyncio.Task, batch: list[tuple[K, asyncio.Future]]) -> None:
+        """Пачка упала или отменена: ожидающие получают ту же ошибку, ключи можно запросить снова."""
+        self._tasks.discard(task)
+        cancelled = task.cancelled()
+        error = None if cancelled else task.exception()
+        if not cancelled and error is None:
+            return
+        for key, future in batch:
+            if self._futures.get(key) is future:
+                del self._futures[key]
+            if future.done():
+                continue
+            if cancelled:
+                future.cancel()
+            else:
+                future.set_exception(error)
+
+    def prime(self, key: K, value: V | None) -> None:
+        """Положить известное значение (например, после записи)."""
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(copy.copy(value))
+        self._futures[key] = future
+
+    def clear(self) -> None:
+        """Забыть загруженное (после записей, которые могли его изменить). Незавершённые ключи остаются."""
+        self._futures = {key: f for key, f in self._futures.items() if not f.done()}
+
+
+def get_loader(session: AsyncSession, name: str, batch_fn: BatchFn) -> BatchLoader:
+    """Загрузчик name для сессии (создаётся при первом обращении)."""
+    loaders: dict[str, BatchLoader] = session.info.setdefault("loaders", {})
+    loader = loaders.get(name)
+    if loader is None:
+        lock = session.info.setdefault("loaders_lock", asyncio.Lock())
+        loader = loaders[name] = BatchLoader(batch_fn, lock)
+    return loader
+
+
+def clear_loaders(session: AsyncSession, table: str) -> None:
+    """Сбросить запомненное всеми загрузчиками таблицы (имена вида "<table>.<column>")."""
+    loaders: dict[str, BatchLoader] = session.info.get("loaders", {})
+    for name, loader in loaders.items():
+        if name.startswith(f"{table}."):
+            loader.clear()
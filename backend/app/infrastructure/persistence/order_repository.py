@@ -1,16 +1,64 @@
-from datetime import date
+from collections.abc import AsyncIterator
+from datetime import date, datetime
 
-from sqlalchemy import select, update, or_
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import Select, String, bindparam, insert, literal, or_, select, text, tuple_, update
+from sqlalchemy.dialects.postgresql import ARRAY
 
 from app.domain.order.entity import Order
 from app.domain.order.repository import IOrderRepository
+from app.infrastructure.cache.entity_cache import entity_cache, entity_key
+from app.infrastructure.order_events import order_event_payload, publish_order_event
+from app.infrastructure.persistence.base_repository import SqlAlchemyRepository
+from app.infrastructure.persistence.loader import clear_loaders
 from app.infrastructure.persistence.models import OrderModel, CustomerModel, AccountModel
 
+_EXPIRE_FROM_QUEUE = text("""
+    WITH due AS (
+        SELECT order_id FROM order_expiry_queue
+        WHERE due_at <= :now
+        ORDER BY due_at
+        LIMIT :limit
+        FOR UPDATE SKIP LOCKED
+    ), expired AS (
+        UPDATE orders SET status = 'expired', updated_at = now()
+        FROM due
+        WHERE orders.id = due.order_id AND orders.status = ANY(:statuses) AND orders.date_when < :before
+        RETURNING orders.id
+    ), popped AS (
+        -- Из очереди уходят истёкшие сейчас и уже закрытые заказы; открытые, но ещё не просроченные
+        -- (граница дня/часового пояса) остаются до следующего запуска. CTE видят один снимок:
+        -- статус истёкших здесь ещё прежний, поэтому они берутся из expired.
+        DELETE FROM order_expiry_queue
+        USING due LEFT JOIN orders ON orders.id = due.order_id
+        WHERE order_expiry_queue.order_id = due.order_id
+          AND (orders.id IS NULL
+               OR orders.id IN (SELECT id FROM expired)
+               OR NOT orders.status = ANY(:statuses))
+        RETURNING order_expiry_queue.order_id
+    )
+    SELECT (SELECT count(*) FROM popped) AS popped, ARRAY(SELECT id FROM expired) AS ids
+""").bindparams(bindparam("statuses", type_=ARRAY(String)))
 
-class OrderRepository(IOrderRepository):
-    def __init__(self, session: AsyncSession):
-        self._session = session
+# Ключи keyset-пагинации: колонка сортировки и направление (id — тай-брейкер).
+# created_at — новые сверху, date_when — ближайшие по дате сверху.
+ORDER_SORT_KEYS: dict[str, tuple[str, bool]] = {
+    "created_at": ("created_at", True),
+    "date_when": ("date_when", False),
+}
+
+
+class OrderRepository(SqlAlchemyRepository[Order], IOrderRepository):
+    model = OrderModel
+    writable_fields = (
+        "where_to",
+        "where_from",
+        "price",
+        "status",
+        "date_when",
+        "customer_id",
+        "courier_id",
+        "information",
+    )
 
     def _to_entity(self, model: OrderModel) -> Order:
         return Order(
@@ -30,34 +78,35 @@ class OrderRepository(IOrderRepository):
     async def get_by_id(self, id: int) -> Order | None:
         result = await self._session.execute(select(OrderModel).where(OrderModel.id == id))
         model = result.scalar_one_or_none()
-        return self._to_entity(model) if model else None
+        return self._track(self._to_entity(model) if model else None)
 
     async def get_all(self, *, skip: int = 0, limit: int = 100) -> list[Order]:
-        result = await self._session.execute(select(OrderModel).offset(skip).limit(limit))
-        return [self._to_entity(m) for m in result.scalars().all()]
+        return await self._fetch_entities(self._select_rows().offset(skip).limit(limit))
 
-    async def search(
+    def _filtered(
         self,
         *,
-        skip: int = 0,
-        limit: int = 100,
         statuses: list[str] | None = None,
         customer_name: str | None = None,
         customer_id: int | None = None,
         date_from: date | None = None,
         date_to: date | None = None,
         place: str | None = None,
-    ) -> list[Order]:
-        stmt = (
-            select(OrderModel)
-            .join(CustomerModel, OrderModel.customer_id == CustomerModel.id)
-            .join(AccountModel, CustomerModel.account_id == AccountModel.id, isouter=True)
-        )
+    ) -> Select:
+        """SELECT заказов с фильтрами поиска (без сортировки и пагинации)."""
+        stmt = self._select_rows()
         if statuses is not None and len(statuses) > 0:
             stmt = stmt.where(OrderModel.status.in_(statuses))
         if customer_name:
+            # Полу-join вместо outer join: планировщик ищет аккаунты по ix_accounts_name_trgm,
+            # а без фильтра по имени лишних join-ов нет вовсе.
             pattern_name = f"%{customer_name}%"
-            stmt = stmt.where(AccountModel.name.ilike(pattern_name))
+            matching_customers = (
+                select(CustomerModel.id)
+                .join(AccountModel, CustomerModel.account_id == AccountModel.id)
+                .where(AccountModel.name.ilike(pattern_name))
+            )
+            stmt = stmt.where(OrderModel.customer_id.in_(matching_customers))
         if customer_id is not None:
             stmt = stmt.where(OrderModel.customer_id == customer_id)
         if date_from is not None:
@@ -65,6 +114,7 @@ class OrderRepository(IOrderRepository):
         if date_to is not None:
             stmt = stmt.where(OrderModel.date_when <= date_to)
         if place:
+            # OR двух ILIKE по колонкам с отдельными триграммными индексами → BitmapOr.
             pattern = f"%{place}%"
             stmt = stmt.where(
                 or_(
@@ -72,39 +122,161 @@ class OrderRepository(IOrderRepository):
                     OrderModel.where_to.ilike(pattern),
                 )
             )
-        stmt = stmt.offset(skip).limit(limit)
-        result = await self._session.execute(stmt)
-        return [self._to_entity(m) for m in result.scalars().all()]
+        return stmt
+
+    async def search(
+        self,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        statuses: list[str] | None = None,
+        customer_name: str | None = None,
+        customer_id: int | None = None,
+        date_from: date | None = None,
+        date_to: date | None = None,
+        place: str | None = None,
+        order_by: str | None = None,
+        after: tuple[date | datetime, int] | None = None,
+    ) -> list[Order]:
+        """
+        Поиск заказов. Без order_by — старый режим skip/limit (OFFSET).
+        С order_by — keyset-пагинация по (order_by, id): after — ключ последней строки
+        предыдущей страницы, skip игнорируется, стоимость страницы не зависит от глубины.
+        """
+        return await self._fetch_entities(self._search_stmt(
+            skip=skip,
+            limit=limit,
+            statuses=statuses,
+            customer_name=customer_name,
+            customer_id=customer_id,
+            date_from=date_from,
+            date_to=date_to,
+            place=place,
+            order_by=order_by,
+            after=after,
+        ))
+
+    def _search_stmt(
+        self,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        statuses: list[str] | None = None,
+        customer_name: str | None = None,
+        customer_id: int | None = None,
+        date_from: date | None = None,
+        date_to: date | None = None,
+        place: str | None = None,
+        order_by: str | None = None,
+        after: tuple[date | datetime, int] | None = None,
+    ) -> Select:
+        """SELECT страницы search (его же разбирает bench.query_plans)."""
+        stmt = self._filtered(
+            statuses=statuses,
+            customer_name=customer_name,
+            customer_id=customer_id,
+            date_from=date_from,
+            date_to=date_to,
+            place=place,
+        )
+        if order_by is not None:
+            column_name, descending = ORDER_SORT_KEYS[order_by]
+            key = getattr(OrderModel, column_name)
+            if after is not None:
+                row_key = tuple_(key, OrderModel.id)
+                cursor_key = tuple_(*after)
+                stmt = stmt.where(row_key < cursor_key if descending else row_key > cursor_key)
+            if descending:
+                stmt = stmt.order_by(key.desc(), OrderModel.id.desc())
+            else:
+                stmt = stmt.order_by(key.asc(), OrderModel.id.asc())
+            stmt = stmt.limit(limit)
+        else:
+            stmt = stmt.offset(skip).limit(limit)
+        return stmt
+
+    async def stream_search(
+        self,
+        *,
+        statuses: list[str] | None = None,
+        customer_name: str | None = None,
+        customer_id: int | None = None,
+        date_from: date | None = None,
+        date_to: date | None = None,
+        place: str | None = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[list[Order]]:
+        """
+        Все заказы по фильтрам search пачками по batch_size через серверный курсор.
+        Память — одна пачка независимо от числа строк; следующая пачка читается,
+        только когда потребитель забрал предыдущую.
+        """
+        stmt = self._filtered(
+            statuses=statuses,
+            customer_name=customer_name,
+            customer_id=customer_id,
+            date_from=date_from,
+            date_to=date_to,
+            place=place,
+        ).order_by(OrderModel.id)
+        result = await self._session.stream(stmt.execution_options(yield_per=batch_size))
+        async for partition in result.partitions():
+            yield [self._to_entity(row) for row in partition]
 
     async def add(self, order: Order) -> Order:
-        model = OrderModel(
-            where_to=order.where_to,
-            where_from=order.where_from,
-            price=order.price,
-            status=order.status,
-            date_when=order.date_when,
-            customer_id=order.customer_id,
-            courier_id=order.courier_id,
-            information=order.information,
+        return await self._insert_returning(order)
+
+    async def add_with_balance_deduction(self, order: Order, account_id: int, amount: float) -> Order | None:
+        """
+        Один запрос (CTE): списать amount с баланса аккаунта и, только если списание прошло,
+        вставить заказ. None — аккаунта нет или средств недостаточно (ничего не изменено).
+        """
+        debit = (
+            update(AccountModel)
+            .where(AccountModel.id == account_id, AccountModel.balance >= amount)
+            .values(balance=AccountModel.balance - amount)
+            .returning(AccountModel.id)
+            .cte("debit")
         )
-        self._session.add(model)
-        await self._session.flush()
-        await self._session.refresh(model)
-        return self._to_entity(model)
+        values = {
+            "where_to": order.where_to,
+            "where_from": order.where_from,
+            "price": order.price,
+            "status": order.status,
+            "date_when": order.date_when,
+            "customer_id": order.customer_id,
+            "courier_id": order.courier_id,
+            "information": order.information,
+        }
+        columns = [getattr(OrderModel, name) for name in values]
+        source = select(
+            *(literal(value, column.type).label(name) for (name, value), column in zip(values.items(), columns))
+        ).select_from(debit)
+        result = await self._session.execute(
+            insert(OrderModel).from_select(list(values), source).returning(OrderModel)
+        )
+        clear_loaders(self._session, AccountModel.__tablename__)
+        model = result.scalar_one_or_none()
+        if model is not None:
+            entity_cache.invalidate(self._session, [entity_key("account", "id", account_id)])
+        return self._to_entity(model) if model else None
 
     async def save(self, order: Order) -> Order:
-        result = await self._session.execute(select(OrderModel).where(OrderModel.id == order.id))
-        model = result.scalar_one()
-        model.where_to = order.where_to
-        model.where_from = order.where_from
-        model.price = order.price
-        model.status = order.status
-        model.date_when = order.date_when
-        model.courier_id = order.courier_id
-        model.information = order.information
-        await self._session.flush()
-        await self._session.refresh(model)
-        return self._to_entity(model)
+        return await self._update_returning(order)
+
+    async def assign_courier_if_free(self, order_id: int, courier_id: int) -> Order | None:
+        """
+        Один запрос: UPDATE ... SET courier_id WHERE id = :id AND courier_id IS NULL RETURNING *.
+        None — заказа нет или курьер уже назначен (гонку выигрывает только один курьер).
+        """
+        result = await self._session.execute(
+            update(OrderModel)
+            .where(OrderModel.id == order_id, OrderModel.courier_id.is_(None))
+            .values(courier_id=courier_id)
+            .returning(OrderModel)
+        )
+        model = result.scalar_one_or_none()
+        return self._to_entity(model) if model else None
 
     async def delete(self, order: Order) -> None:
         result = await self._session.execute(select(OrderModel).where(OrderModel.id == order.id))
@@ -112,9 +284,62 @@ class OrderRepository(IOrderRepository):
         await self._session.delete(model)
         await self._session.flush()
 
-    async def bulk_set_status_where_not(self, new_status: str, exclude_status: str) -> int:
-        """Один запрос: SET status = new_status WHERE status != exclude_status. Возвращает число обновлённых строк."""
+    async def expire_due_batch(self, before: date, statuses: tuple[str, ...], limit: int) -> list[int]:
+        """
+        Одна пачка истечения: до limit заказов со статусом из statuses и date_when < before
+        переводятся в 'expired' одним UPDATE ... RETURNING id. Кандидаты берутся по индексу
+        (date_when, id) с FOR UPDATE SKIP LOCKED — строки, занятые другими транзакциями
+        (например, принятие заказа), пропускаются до следующей пачки.
+        """
+        due = (
+            select(OrderModel.id)
+            .where(OrderModel.status.in_(statuses), OrderModel.date_when < before)
+            .order_by(OrderModel.date_when, OrderModel.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .cte("due")
+        )
+        result = await self._session.execute(
+            update(OrderModel)
+            .where(OrderModel.id.in_(select(due.c.id)))
+            .values(status="expired")
+            .returning(OrderModel.id)
+        )
+        return list(result.scalars())
+
+    async def schedule_expiry(self, order: Order, due_at: datetime | None) -> None:
+        """Поставить заказ в очередь истечения на due_at (upsert); None — убрать из очереди."""
+        if due_at is None:
+            await self._session.execute(
+                text("DELETE FROM order_expiry_queue WHERE order_id = :order_id"), {"order_id": order.id}
+            )
+            return
+        await self._session.execute(
+            text("""
+                INSERT INTO order_expiry_queue (order_id, due_at) VALUES (:order_id, :due_at)
+                ON CONFLICT (order_id) DO UPDATE SET due_at = EXCLUDED.due_at
+            """),
+            {"order_id": order.id, "due_at": due_at},
+        )
+
+    async def expire_from_queue(
+        self, now: datetime, before: date, statuses: tuple[str, ...], limit: int
+    ) -> tuple[int, list[int]]:
+        """
+        Одна пачка очереди истечения: до limit записей с due_at <= now (FOR UPDATE SKIP LOCKED),
+        те из их заказов, что всё ещё открыты и просрочены (status из statuses, date_when < before),
+        переводятся в 'expired'. Из очереди удаляются записи истёкших и уже закрытых заказов;
+        открытый, но ещё не просроченный заказ остаётся в очереди. Один запрос; стоимость
+        зависит от числа наступивших записей, а не от размера orders.
+        Возвращает (сколько записей удалено из очереди, id истёкших заказов).
+        """
         result = await self._session.execute(
-            update(OrderModel).where(OrderModel.status != exclude_status).values(status=new_status)
+            _EXPIRE_FROM_QUEUE,
+            {"now": now, "before": before, "statuses": list(statuses), "limit": limit},
         )
-        return result.rowcount or 0
+        popped, ids = result.one()
+        return popped, list(ids)
+
+    async def publish_event(self, event: str, order: Order | None = None, **extra) -> None:
+        """NOTIFY о событии заказа; уйдёт подписчикам ленты после COMMIT."""
+        await publish_order_event(self._session, order_event_payload(event, order, **extra))
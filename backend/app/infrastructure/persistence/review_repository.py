@@ -1,14 +1,14 @@
 from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.domain.review.entity import Review
 from app.domain.review.repository import IReviewRepository
+from app.infrastructure.persistence.base_repository import SqlAlchemyRepository
 from app.infrastructure.persistence.models import ReviewModel
 
 
-class ReviewRepository(IReviewRepository):
-    def __init__(self, session: AsyncSession):
-        self._session = session
+class ReviewRepository(SqlAlchemyRepository[Review], IReviewRepository):
+    model = ReviewModel
+    writable_fields = ("customer_id", "courier_id", "score", "text")
 
     def _to_entity(self, model: ReviewModel) -> Review:
         return Review(
@@ -24,32 +24,16 @@ class ReviewRepository(IReviewRepository):
     async def get_by_id(self, id: int) -> Review | None:
         result = await self._session.execute(select(ReviewModel).where(ReviewModel.id == id))
         model = result.scalar_one_or_none()
-        return self._to_entity(model) if model else None
+        return self._track(self._to_entity(model) if model else None)
 
     async def get_all(self, *, skip: int = 0, limit: int = 100) -> list[Review]:
-        result = await self._session.execute(select(ReviewModel).offset(skip).limit(limit))
-        return [self._to_entity(m) for m in result.scalars().all()]
+        return await self._fetch_entities(self._select_rows().offset(skip).limit(limit))
 
     async def add(self, review: Review) -> Review:
-        model = ReviewModel(
-            customer_id=review.customer_id,
-            courier_id=review.courier_id,
-            score=review.score,
-            text=review.text,
-        )
-        self._session.add(model)
-        await self._session.flush()
-        await self._session.refresh(model)
-        return self._to_entity(model)
+        return await self._insert_returning(review)
 
     async def save(self, review: Review) -> Review:
-        result = await self._session.execute(select(ReviewModel).where(ReviewModel.id == review.id))
-        model = result.scalar_one()
-        model.score = review.score
-        model.text = review.text
-        await self._session.flush()
-        await self._session.refresh(model)
-        return self._to_entity(model)
+        return await self._update_returning(review)
 
     async def delete(self, review: Review) -> None:
         result = await self._session.execute(select(ReviewModel).where(ReviewModel.id == review.id))
@@ -0,0 +1,79 @@
+"""
+Пул соединений: параметры из настроек (engine_options) и метрики — время ожидания
+соединения (гистограмма db_pool_wait_seconds) и состояние пула на момент запроса
+/metrics (pool_collector).
+
+Ожидание соединения ограничено db_pool_timeout_seconds: дольше — sqlalchemy.exc.TimeoutError,
+API отвечает 503 с Retry-After (см. app.main), а не копит ждущие корутины.
+
+Метка pool — pool_logging_name движка (create_async_engine(..., pool_logging_name="api")).
+"""
+
+import time
+import uuid
+from collections.abc import Callable
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.config import settings
+from app.core.metrics import Counter, Family, db_pool_wait, metrics
+
+db_pool_timeouts = metrics.register(Counter(
+    "db_pool_timeouts_total", "Запросы, не дождавшиеся соединения из пула (ответ 503)",
+)).labels()
+
+
+class MeteredAsyncQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool, который меряет получение соединения (ожидание в очереди и подключение)."""
+
+    def _do_get(self):
+        wait = db_pool_wait.labels(self._orig_logging_name or "default")
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            wait.observe(time.perf_counter() - started)
+
+
+def engine_options(name: str) -> dict[str, Any]:
+    """Аргументы create_async_engine: пул из настроек, метрики, режим PgBouncer."""
+    options: dict[str, Any] = {
+        "echo": False,
+        "poolclass": MeteredAsyncQueuePool,
+        "pool_logging_name": name,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout_seconds,
+        "pool_recycle": settings.db_pool_recycle_seconds,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+    if settings.db_pgbouncer:
+        # Соединение сервера в PgBouncer меняется между транзакциями: подготовленные выражения
+        # не кэшируются (ни asyncpg, ни диалектом), а имена одноразовых — уникальны.
+        options["connect_args"] = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+        }
+    return options
+
+
+def pool_collector(engine: AsyncEngine) -> Callable[[], list[Family]]:
+    """Коллектор для metrics.add_collector: размер пула, занятые, свободные, overflow."""
+
+    def collect() -> list[Family]:
+        pool = engine.pool
+        if not isinstance(pool, AsyncAdaptedQueuePool):
+            return []
+        labels = {"pool": pool._orig_logging_name or "default"}
+        return [
+            Family("db_pool_size", "gauge", "Размер пула (постоянные соединения)", [(labels, pool.size())]),
+            Family("db_pool_checked_out", "gauge", "Соединения, выданные из пула", [(labels, pool.checkedout())]),
+            Family("db_pool_checked_in", "gauge", "Свободные соединения в пуле", [(labels, pool.checkedin())]),
+            Family("db_pool_overflow", "gauge", "Соединения сверх размера пула (отрицательное — пул не заполнен)",
+                   [(labels, pool.overflow())]),
+        ]
+
+    return collect
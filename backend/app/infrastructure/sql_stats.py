@@ -0,0 +1,101 @@
+"""
+Учёт SQL-запросов по HTTP-запросам (и любым другим единицам работы).
+
+instrument_engine(engine) вешает на движок события before/after_cursor_execute: каждый
+выполненный запрос засчитывается в QueryStats текущего контекста (contextvar, задаётся
+через track_queries — см. SqlTimingMiddleware). Запросы дольше settings.sql_slow_query_ms
+логируются с текстом — в том числе вне HTTP-запроса (воркер, миграции). Параметры
+(в них пароли аккаунтов, телефоны) в лог попадают только при sql_slow_query_log_params.
+"""
+
+import logging
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Текст запроса и параметры (если включены) в логе медленных запросов обрезаются до этой длины.
+_LOG_LIMIT = 2000
+_STARTED = "sql_stats_started"
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    seconds: float = 0.0
+    slowest_seconds: float = 0.0
+    slowest_statement: str | None = None
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+        if seconds > self.slowest_seconds:
+            self.slowest_seconds = seconds
+            self.slowest_statement = statement
+
+
+_current: ContextVar[QueryStats | None] = ContextVar("sql_query_stats", default=None)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Запросы, выполненные внутри блока (в этом контексте и порождённых задачах), попадают в QueryStats."""
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+def _shorten(value: object) -> str:
+    text = str(value)
+    return text if len(text) <= _LOG_LIMIT else text[:_LOG_LIMIT] + "…"
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault(_STARTED, []).append(time.perf_counter())
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    seconds = time.perf_counter() - conn.info[_STARTED].pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, seconds)
+    threshold_ms = settings.sql_slow_query_ms
+    if threshold_ms > 0 and seconds * 1000 >= threshold_ms:
+        if settings.sql_slow_query_log_params:
+            logger.warning(
+                "slow query: %.1f ms (порог %s ms): %s; параметры: %s",
+                seconds * 1000, threshold_ms, _shorten(" ".join(statement.split())), _shorten(parameters),
+            )
+        else:
+            logger.warning(
+                "slow query: %.1f ms (порог %s ms): %s",
+                seconds * 1000, threshold_ms, _shorten(" ".join(statement.split())),
+            )
+
+
+def _on_error(exception_context) -> None:
+    # Запрос упал — after_cursor_execute не будет, снимаем его отметку времени.
+    started = exception_context.connection.info.get(_STARTED) if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Подключить учёт запросов и лог медленных запросов к движку."""
+    sync_engine = engine.sync_engine
+    if event.contains(sync_engine, "before_cursor_execute", _before_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_execute)
+    event.listen(sync_engine, "handle_error", _on_error)
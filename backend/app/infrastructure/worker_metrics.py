@@ -0,0 +1,70 @@
+"""
+Метрики Celery-задач: воркеры пишут, API отдаёт в /metrics.
+
+Воркеры — отдельные процессы (и контейнеры), поэтому счётчики копятся в общем Redis:
+после каждой задачи record_task одним pipeline увеличивает поля хэша WORKER_METRICS_KEY
+(корзина гистограммы длительности, сумма, число; для задач истечения — число истёкших
+заказов). /metrics читает хэш одним HGETALL (worker_families). Ошибки Redis задачи не
+ломают: метрика теряется, в лог — предупреждение.
+"""
+
+import logging
+from bisect import bisect_left
+
+from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+from redis.exceptions import RedisError
+
+from app.core.metrics import TASK_BUCKETS, Family, render_histogram
+
+logger = logging.getLogger(__name__)
+
+WORKER_METRICS_KEY = "metrics:worker"
+_SEP = "|"
+
+
+def record_task(client: Redis, task: str, state: str, seconds: float, expired: int | None = None) -> None:
+    """Учесть выполнение задачи (синхронно, из обработчика сигнала Celery)."""
+    prefix = f"{task}{_SEP}{state}{_SEP}"
+    try:
+        pipe = client.pipeline(transaction=False)
+        pipe.hincrby(WORKER_METRICS_KEY, prefix + str(bisect_left(TASK_BUCKETS, seconds)), 1)
+        pipe.hincrbyfloat(WORKER_METRICS_KEY, prefix + "sum", seconds)
+        pipe.hincrby(WORKER_METRICS_KEY, prefix + "count", 1)
+        if expired:
+            pipe.hincrby(WORKER_METRICS_KEY, f"{task}{_SEP}expired", expired)
+        pipe.execute()
+    except RedisError as e:
+        logger.warning("worker metrics: не записаны (%s): %s", task, e)
+
+
+async def worker_families(client: AsyncRedis) -> tuple[list[str], list[Family]]:
+    """Гистограмма длительности задач (строки) и счётчики истёкших заказов из Redis."""
+    up = Family("celery_metrics_up", "gauge", "Метрики воркеров прочитаны из Redis")
+    try:
+        raw = await client.hgetall(WORKER_METRICS_KEY)
+    except RedisError as e:
+        logger.warning("worker metrics: Redis недоступен: %s", e)
+        up.samples.append(({}, 0))
+        return [], [up]
+    up.samples.append(({}, 1))
+
+    histograms: dict[tuple[str, str], dict[str, float]] = {}
+    expired = Family("celery_orders_expired_total", "counter", "Заказы, переведённые задачами в expired")
+    for field, value in raw.items():
+        field = field.decode() if isinstance(field, bytes) else field
+        parts = field.split(_SEP)
+        if len(parts) == 2 and parts[1] == "expired":
+            expired.samples.append(({"task": parts[0]}, int(value)))
+        elif len(parts) == 3:
+            histograms.setdefault((parts[0], parts[1]), {})[parts[2]] = float(value)
+
+    name = "celery_task_duration_seconds"
+    lines = [f"# HELP {name} Длительность Celery-задач", f"# TYPE {name} histogram"]
+    for (task, state), values in sorted(histograms.items()):
+        counts = [int(values.get(str(i), 0)) for i in range(len(TASK_BUCKETS) + 1)]
+        lines.extend(render_histogram(
+            name, ("task", "state"), (task, state), TASK_BUCKETS, counts,
+            values.get("sum", 0.0), int(values.get("count", 0)),
+        ))
+    return lines, [up, expired]
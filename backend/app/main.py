@@ -1,24 +1,62 @@
 import logging
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 
 logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s %(message)s")
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.api import metrics
+from app.api.middleware import MetricsMiddleware, SqlTimingMiddleware
 from app.api.v1.router import api_router
 from app.config import settings
-from app.infrastructure.database import init_db
+from app.core.identity import IDENTITY_CHANGED_CHANNEL, identity_registry, on_identity_changed
+from app.core.result_cache import order_search_cache
+from app.infrastructure.cache import entity_cache
+from app.infrastructure.database import async_session, init_db
+from app.infrastructure.identity_events import load_identity_changes
+from app.infrastructure.order_events import order_event_hub
+from app.infrastructure.pool import db_pool_timeouts
+
+logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_db()
+    # Одно LISTEN-соединение: лента заказов, кэш поиска и инвалидация claims роли в JWT.
+    order_event_hub.add_channel(IDENTITY_CHANGED_CHANNEL, on_identity_changed, identity_registry.mark_all_changed)
+    # Любое событие заказов (и разрыв LISTEN) сбрасывает кэш поиска ленты.
+    order_event_hub.add_order_handler(lambda event: order_search_cache.bump(), order_search_cache.bump)
+    await order_event_hub.start()
+    async with async_session() as session:
+        await load_identity_changes(session)
+    await entity_cache.start()
     yield
+    await entity_cache.stop()
+    await order_event_hub.stop()
 
 
 app = FastAPI(title="MNG Grab API", version="0.1.0", lifespan=lifespan)
 
+
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_handler(request: Request, exc: PoolTimeoutError) -> JSONResponse:
+    """Соединение из пула не получено за db_pool_timeout_seconds: быстрый 503 вместо очереди запросов."""
+    db_pool_timeouts.inc()
+    logger.warning("pool timeout: %s %s — 503", request.method, request.url.path)
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Сервис перегружен, повторите запрос позже"},
+        headers={"Retry-After": str(settings.db_overload_retry_after_seconds)},
+    )
+
+
+app.add_middleware(SqlTimingMiddleware)
+app.add_middleware(MetricsMiddleware)
+
 # CORS: разрешаем запросы с фронтенда (в dev можно оставить "*")
 app.add_middleware(
     CORSMiddleware,
@@ -26,9 +64,11 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Server-Timing"],
 )
 
 app.include_router(api_router, prefix="/api/v1")
+app.include_router(metrics.router)
 
 
 @app.get("/")
@@ -0,0 +1 @@
+"""Бенчмарки бэкенда. Запуск из backend/: python -m bench.<модуль> (нужен Postgres из DATABASE_URL)."""
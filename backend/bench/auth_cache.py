@@ -0,0 +1,48 @@
+"""
+Стоимость зависимости авторизации (get_access_claims) на запрос: без кэша и с кэшем токенов.
+
+    cd backend && python -m bench.auth_cache
+
+БД не нужна.
+"""
+
+import asyncio
+import json
+import time
+
+from app.api.dependencies import get_access_claims
+from app.core.security import create_access_token, token_cache
+
+CALLS = 50_000
+
+
+async def _per_call_us(header: str) -> float:
+    started = time.perf_counter()
+    for _ in range(CALLS):
+        await get_access_claims(header)
+    return (time.perf_counter() - started) * 1_000_000 / CALLS
+
+
+async def main() -> None:
+    header = "Bearer " + create_access_token(1, role="courier", courier_id=1)
+    maxsize = token_cache.maxsize
+
+    token_cache.maxsize = 0
+    token_cache.clear()
+    uncached = await _per_call_us(header)
+
+    token_cache.maxsize = maxsize
+    token_cache.clear()
+    cached = await _per_call_us(header)
+
+    print(json.dumps({
+        "calls": CALLS,
+        "uncached_us_per_call": round(uncached, 2),
+        "cached_us_per_call": round(cached, 2),
+        "speedup": round(uncached / cached, 1),
+        "cache": token_cache.stats(),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+"""
+Число SQL-запросов у списков и карточек заказчиков и курьеров не зависит от размера страницы.
+
+Замена тесту числа запросов: pytest в репозитории нет, поэтому проверка — скрипт с кодом выхода.
+
+    cd backend && python -m bench.listing_queries
+
+В транзакции, которая откатывается (блокируются только вставленные строки), добавляются
+PAGE аккаунтов с заказчиком и курьером. Затем эндпоинты list_customers / list_couriers
+вызываются со страницами 1 и PAGE, get_customer / get_courier — по одной записи; сервисы
+собираются теми же функциями, что и в Depends. На каждый вызов считаются запросы
+(count_queries) и сравниваются с EXPECTED_QUERIES: маршруты без авторизации, страница
+или карточка — один SELECT с JOIN на accounts. Код выхода 1 — есть расхождения.
+"""
+
+import asyncio
+import json
+import sys
+import time
+
+from sqlalchemy import insert
+
+from app.api.dependencies import (
+    get_courier_repository,
+    get_courier_service,
+    get_customer_repository,
+    get_customer_service,
+)
+from app.api.v1.endpoints.couriers import get_courier, list_couriers
+from app.api.v1.endpoints.customers import get_customer, list_customers
+from app.infrastructure.database import async_session, engine, init_db
+from app.infrastructure.persistence import AccountModel, CourierModel, CustomerModel
+from bench.querycount import count_queries
+
+PAGE = 100
+EXPECTED_QUERIES = 1
+
+
+async def _seed(session) -> tuple[list[int], list[int]]:
+    suffix = time.time_ns() % 10**12
+    account_ids = list((await session.execute(
+        insert(AccountModel).returning(AccountModel.id),
+        [{"name": f"listing {i}", "phone": f"lq{i:03d}{suffix}", "password": "x"} for i in range(PAGE)],
+    )).scalars())
+    customer_ids = list((await session.execute(
+        insert(CustomerModel).returning(CustomerModel.id),
+        [{"phone": "listing", "account_id": account_id} for account_id in account_ids],
+    )).scalars())
+    courier_ids = list((await session.execute(
+        insert(CourierModel).returning(CourierModel.id),
+        [{"phone": "listing", "account_id": account_id} for account_id in account_ids],
+    )).scalars())
+    return customer_ids, courier_ids
+
+
+async def _check(name: str, call, rows: int | None = None) -> dict:
+    with count_queries(engine) as qc:
+        result = await call()
+    returned = len(result) if isinstance(result, list) else 1
+    ok = qc.count == EXPECTED_QUERIES and (rows is None or returned == rows)
+    return {"case": name, "ok": ok, "queries": qc.count, "rows": returned, "statements": qc.statements}
+
+
+async def run() -> list[dict]:
+    async with async_session() as session:
+        try:
+            customer_ids, courier_ids = await _seed(session)
+            customers = get_customer_service(get_customer_repository(session))
+            couriers = get_courier_service(get_courier_repository(session))
+            results = []
+            for limit in (1, PAGE):
+                results.append(await _check(
+                    f"list_customers limit={limit}", lambda: list_customers(service=customers, skip=0, limit=limit), limit,
+                ))
+                results.append(await _check(
+                    f"list_couriers limit={limit}", lambda: list_couriers(service=couriers, skip=0, limit=limit), limit,
+                ))
+            results.append(await _check("get_customer", lambda: get_customer(customer_ids[0], service=customers)))
+            results.append(await _check("get_courier", lambda: get_courier(courier_ids[0], service=couriers)))
+            return results
+        finally:
+            await session.rollback()
+
+
+async def main() -> int:
+    await init_db()
+    try:
+        results = await run()
+    finally:
+        await engine.dispose()
+    print(json.dumps({"expected_queries": EXPECTED_QUERIES, "cases": results}, ensure_ascii=False, indent=2))
+    return 0 if all(r["ok"] for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,440 @@
+"""
+Нагрузочный тест HTTP API: смесь реальных сценариев, задержки и пропускная способность по маршрутам.
+
+    cd backend && python -m bench.load_test --base-url http://localhost:8000 --duration 60 --concurrency 50
+    python -m bench.load_test ... --save-baseline            # записать эталон (bench/load_baseline.json)
+    python -m bench.load_test ... --baseline bench/load_baseline.json --threshold 0.2
+
+Сервер должен работать с реальными Postgres и Redis. Подготовка: регистрация заказчиков и
+курьеров через /auth/register, пополнение баланса заказчиков. Затем --concurrency
+виртуальных пользователей в течение --duration секунд выполняют операции из --mix
+(операция:вес через запятую): создание заказов, лента /orders с разными фильтрами и курсором,
+принятие и снятие курьера, отзывы, /auth/me, регистрация новых аккаунтов. Первые --warmup
+секунд в статистику не идут.
+
+Отчёт — JSON (stdout и --report): по маршруту (шаблон пути) число запросов, ошибок, rps,
+p50/p95/p99. С --baseline сравнивает с эталоном: рост p95/p99 или падение rps больше чем на
+--threshold (доля), а также рост доли ошибок — регрессия, код выхода 1.
+
+Клиент — минимальный HTTP/1.1 поверх asyncio streams, keep-alive, одно соединение на
+виртуального пользователя (без сторонних зависимостей).
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from pathlib import Path
+from urllib.parse import urlencode, urlsplit
+
+API = "/api/v1"
+DEFAULT_BASELINE = Path(__file__).with_name("load_baseline.json")
+DEFAULT_MIX = "list_orders:50,create_order:15,accept:10,unassign:5,review:10,me:8,register:2"
+TOPUP_AMOUNT = 1_000_000
+_PLACES = ("Ленина", "Мира", "Гагарина", "Пушкина", "Садовая", "Кирова")
+_STREETS = ("ул. Ленина", "пр. Мира", "ул. Гагарина", "ул. Пушкина", "Садовая ул.", "ул. Кирова")
+
+
+class HttpError(Exception):
+    """Соединение оборвалось или ответ не разобран."""
+
+
+@dataclass
+class Response:
+    status: int
+    headers: dict[str, str]
+    body: bytes
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class Connection:
+    """Одно keep-alive соединение HTTP/1.1; переподключается, если сервер его закрыл."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+
+    async def request(self, method: str, path: str, body=None, token: str | None = None) -> Response:
+        payload = json.dumps(body).encode() if body is not None else b""
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}", f"Content-Length: {len(payload)}"]
+        if body is not None:
+            lines.append("Content-Type: application/json")
+        if token:
+            lines.append(f"Authorization: Bearer {token}")
+        raw = ("\r\n".join(lines) + "\r\n\r\n").encode() + payload
+        for attempt in (1, 2):
+            if self._writer is None:
+                self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+            try:
+                self._writer.write(raw)
+                await self._writer.drain()
+                return await self._read_response()
+            except (ConnectionError, asyncio.IncompleteReadError, HttpError):
+                await self.close()
+                if attempt == 2:
+                    raise
+        raise AssertionError("unreachable")
+
+    async def _read_response(self) -> Response:
+        head = await self._reader.readuntil(b"\r\n\r\n")
+        status_line, *header_lines = head.decode("latin-1").split("\r\n")
+        parts = status_line.split(" ", 2)
+        if len(parts) < 2 or not parts[1].isdigit():
+            raise HttpError(f"Неверная строка статуса: {status_line!r}")
+        headers = {}
+        for line in header_lines:
+            if line:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await self._reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                if size == 0:
+                    await self._reader.readuntil(b"\r\n")
+                    break
+                chunks.append(await self._reader.readexactly(size))
+                await self._reader.readexactly(2)
+            body = b"".join(chunks)
+        else:
+            body = await self._reader.readexactly(int(headers.get("content-length", 0)))
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+        return Response(int(parts[1]), headers, body)
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except ConnectionError:
+                pass
+        self._reader = self._writer = None
+
+
+@dataclass
+class User:
+    token: str
+    account_id: int
+    customer_id: int | None = None
+    courier_id: int | None = None
+
+
+@dataclass
+class State:
+    """Общее для виртуальных пользователей: аккаунты и заказы, созданные тестом."""
+
+    customers: list[User] = field(default_factory=list)
+    couriers: list[User] = field(default_factory=list)
+    open_orders: list[tuple[int, User]] = field(default_factory=list)  # (id заказа, владелец)
+    assigned_orders: list[tuple[int, User]] = field(default_factory=list)
+    next_phone: int = 0
+    run_id: int = field(default_factory=lambda: random.randrange(1_000_000))
+
+
+class Stats:
+    """Задержки по маршрутам (секунды) и ошибки; записывается только после разогрева."""
+
+    def __init__(self) -> None:
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.status_codes: dict[str, dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.recording = False
+
+    async def call(
+        self, conn: Connection, route: str, method: str, path: str, body=None, token: str | None = None,
+        expected: tuple[int, ...] = (200, 201, 204),
+    ) -> Response | None:
+        started = time.perf_counter()
+        try:
+            response = await conn.request(method, API + path, body, token)
+        except (OSError, asyncio.IncompleteReadError, HttpError):
+            response = None
+        elapsed = time.perf_counter() - started
+        if self.recording:
+            self.latencies[route].append(elapsed)
+            self.status_codes[route][response.status if response else 0] += 1
+            if response is None or response.status not in expected:
+                self.errors[route] += 1
+        return response
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    """Перцентиль по ближайшему рангу."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def build_report(stats: Stats, seconds: float, args: argparse.Namespace) -> dict:
+    routes = {}
+    for route in sorted(stats.latencies):
+        values = sorted(stats.latencies[route])
+        routes[route] = {
+            "requests": len(values),
+            "errors": stats.errors.get(route, 0),
+            "error_rate": round(stats.errors.get(route, 0) / len(values), 4),
+            "rps": round(len(values) / seconds, 2),
+            "p50_ms": round(_percentile(values, 50) * 1000, 2),
+            "p95_ms": round(_percentile(values, 95) * 1000, 2),
+            "p99_ms": round(_percentile(values, 99) * 1000, 2),
+            "max_ms": round(values[-1] * 1000, 2),
+            "status_codes": {str(code): n for code, n in sorted(stats.status_codes[route].items())},
+        }
+    total = sum(r["requests"] for r in routes.values())
+    return {
+        "config": {
+            "base_url": args.base_url, "duration": args.duration, "warmup": args.warmup,
+            "concurrency": args.concurrency, "customers": args.customers, "couriers": args.couriers,
+            "mix": args.mix, "seed": args.seed,
+        },
+        "seconds": round(seconds, 2),
+        "total": {
+            "requests": total,
+            "errors": sum(r["errors"] for r in routes.values()),
+            "rps": round(total / seconds, 2) if seconds else 0.0,
+        },
+        "routes": routes,
+    }
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> list[str]:
+    """Регрессии относительно эталона: по маршрутам, которые есть в обоих отчётах."""
+    regressions = []
+    for route, base in baseline.get("routes", {}).items():
+        current = report["routes"].get(route)
+        if current is None:
+            continue
+        for metric in ("p95_ms", "p99_ms"):
+            if base[metric] > 0 and current[metric] > base[metric] * (1 + threshold):
+                regressions.append(f"{route}: {metric} {base[metric]} → {current[metric]}")
+        if base["rps"] > 0 and current["rps"] < base["rps"] * (1 - threshold):
+            regressions.append(f"{route}: rps {base['rps']} → {current['rps']}")
+        if current["error_rate"] > base["error_rate"] + threshold / 10:
+            regressions.append(f"{route}: error_rate {base['error_rate']} → {current['error_rate']}")
+    return regressions
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    """'list_orders:50,accept:10' → {"list_orders": 50.0, ...}."""
+    mix = {}
+    for part in value.split(","):
+        name, sep, weight = part.strip().partition(":")
+        if not sep or name.strip() not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"Неверный элемент смеси: {part!r} (операции: {', '.join(OPERATIONS)})")
+        mix[name.strip()] = float(weight)
+    if sum(mix.values()) <= 0:
+        raise argparse.ArgumentTypeError("Сумма весов смеси должна быть больше 0")
+    return mix
+
+
+async def register(conn: Connection, stats: Stats, state: State, role: str) -> User | None:
+    state.next_phone += 1
+    phone = f"+77{state.run_id:06d}{state.next_phone:07d}"
+    response = await stats.call(conn, "POST /auth/register", "POST", "/auth/register", {
+        "name": f"Load {role} {state.next_phone}", "phone": phone, "password": "load-test", "role": role,
+    })
+    if response is None or response.status != 200:
+        return None
+    token = response.json()["access_token"]
+    me = await stats.call(conn, "GET /auth/me", "GET", "/auth/me", token=token)
+    if me is None or me.status != 200:
+        return None
+    data = me.json()
+    user = User(token, data["id"], data.get("customer_id"), data.get("courier_id"))
+    if role == "customer":
+        await stats.call(conn, "POST /accounts/{id}/topup", "POST", f"/accounts/{user.account_id}/topup",
+                         {"amount": TOPUP_AMOUNT})
+        state.customers.append(user)
+    else:
+        state.couriers.append(user)
+    return user
+
+
+async def op_register(conn: Connection, stats: Stats, state: State, rng: random.Random) -> None:
+    await register(conn, stats, state, rng.choice(("customer", "courier")))
+
+
+async def op_me(conn: Connection, stats: Stats, state: State, rng: random.Random) -> None:
+    user = rng.choice(state.customers + state.couriers)
+    await stats.call(conn, "GET /auth/me", "GET", "/auth/me", token=user.token)
+
+
+async def op_create_order(conn: Connection, stats: Stats, state: State, rng: random.Random) -> None:
+    user = rng.choice(state.customers)
+    response = await stats.call(conn, "POST /orders", "POST", "/orders", {
+        "where_from": f"{rng.choice(_STREETS)}, д. {rng.randint(1, 150)}",
+        "where_to": f"{rng.choice(_STREETS)}, д. {rng.randint(1, 150)}",
+        "date_when": (date.today() + timedelta(days=rng.randint(0, 14))).isoformat(),
+        "information": rng.choice((None, "Позвонить за час", "Хрупкое")),
+    }, token=user.token)
+    if response is not None and response.status == 201:
+        state.open_orders.append((response.json()["id"], user))
+
+
+def _list_query(user: User, rng: random.Random) -> dict:
+    """Фильтры ленты, как их комбинирует фронтенд."""
+    today = date.today()
+    variant = rng.randrange(6)
+    if variant == 0:
+        return {"limit": 20}
+    if variant == 1:
+        return {"statuses": "active", "sort": "date_when", "limit": 20}
+    if variant == 2:
+        return {"statuses": "active", "date_from": today.isoformat(),
+                "date_to": (today + timedelta(days=7)).isoformat(), "limit": 50}
+    if variant == 3:
+        return {"place": rng.choice(_PLACES), "limit": 20}
+    if variant == 4:
+        return {"statuses": "active,completed", "sort": "created_at", "limit": 50}
+    if user.customer_id is not None:
+        return {"only_own": "true", "limit": 20}
+    return {"customer_name": "Load", "limit": 20}
+
+
+async def op_list_orders(conn: Connection, stats: Stats, state: State, rng: random.Random) -> None:
+    user = rng.choice(state.customers + state.couriers)
+    query = _list_query(user, rng)
+    response = await stats.call(conn, "GET /orders", "GET", "/orders?" + urlencode(query), token=user.token)
+    cursor = response.headers.get("x-next-cursor") if response is not None else None
+    if cursor and rng.random() < 0.5:
+        # Вторая страница по курсору — отдельный маршрут: keyset без OFFSET.
+        await stats.call(conn, "GET /orders?cursor", "GET", "/orders?" + urlencode({**query, "cursor": cursor}),
+                         token=user.token)
+
+
+async def op_accept(conn: Connection, stats: Stats, state: State, rng: random.Random) -> None:
+    if not state.open_orders:
+        return await op_create_order(conn, stats, state, rng)
+    order_id, owner = state.open_orders.pop(rng.randrange(len(state.open_orders)))
+    courier = rng.choice(state.couriers)
+    response = await stats.call(conn, "POST /orders/{id}/accept", "POST", f"/orders/{order_id}/accept",
+                                token=courier.token)
+    if response is not None and response.status == 200:
+        state.assigned_orders.append((order_id, owner))
+
+
+async def op_unassign(conn: Connection, stats: Stats, state: State, rng: random.Random) -> None:
+    if not state.assigned_orders:
+        return await op_accept(conn, stats, state, rng)
+    order_id, owner = state.assigned_orders.pop(rng.randrange(len(state.assigned_orders)))
+    response = await stats.call(conn, "POST /orders/{id}/unassign-courier", "POST",
+                                f"/orders/{order_id}/unassign-courier", token=owner.token)
+    if response is not None and response.status == 200:
+        state.open_orders.append((order_id, owner))
+
+
+async def op_review(conn: Connection, stats: Stats, state: State, rng: random.Random) -> None:
+    customer, courier = rng.choice(state.customers), rng.choice(state.couriers)
+    await stats.call(conn, "POST /reviews", "POST", "/reviews", {
+        "customer_id": customer.customer_id, "courier_id": courier.courier_id,
+        "score": rng.randint(1, 5), "text": rng.choice((None, "Быстро", "Вежливо", "Опоздал")),
+    }, token=customer.token)
+
+
+OPERATIONS = {
+    "list_orders": op_list_orders,
+    "create_order": op_create_order,
+    "accept": op_accept,
+    "unassign": op_unassign,
+    "review": op_review,
+    "me": op_me,
+    "register": op_register,
+}
+
+
+async def _setup(host: str, port: int, stats: Stats, state: State, args: argparse.Namespace) -> None:
+    roles = ["customer"] * args.customers + ["courier"] * args.couriers
+    queue = iter(roles)
+
+    async def worker() -> None:
+        conn = Connection(host, port)
+        try:
+            for role in queue:
+                await register(conn, stats, state, role)
+        finally:
+            await conn.close()
+
+    await asyncio.gather(*(worker() for _ in range(min(args.concurrency, len(roles)))))
+    if not state.customers or not state.couriers:
+        raise SystemExit("Подготовка не удалась: не зарегистрированы заказчики или курьеры (сервер доступен?)")
+
+
+async def run(args: argparse.Namespace) -> dict:
+    url = urlsplit(args.base_url)
+    if url.scheme != "http":
+        raise SystemExit("Поддерживается только http://")
+    host, port = url.hostname, url.port or 80
+    stats, state = Stats(), State()
+    await _setup(host, port, stats, state, args)
+
+    names = list(args.mix)
+    weights = [args.mix[name] for name in names]
+    started = time.monotonic()
+    measure_from = started + args.warmup
+    stop_at = measure_from + args.duration
+
+    async def user(index: int) -> None:
+        rng = random.Random(None if args.seed is None else args.seed + index)
+        conn = Connection(host, port)
+        try:
+            while (now := time.monotonic()) < stop_at:
+                if not stats.recording and now >= measure_from:
+                    stats.recording = True
+                await OPERATIONS[rng.choices(names, weights)[0]](conn, stats, state, rng)
+        finally:
+            await conn.close()
+
+    await asyncio.gather(*(user(i) for i in range(args.concurrency)))
+    seconds = time.monotonic() - max(measure_from, started)
+    return build_report(stats, seconds, args)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m bench.load_test", description="Нагрузочный тест HTTP API")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--duration", type=float, default=60, help="секунд измерения")
+    parser.add_argument("--warmup", type=float, default=5, help="секунд разогрева (не в статистике)")
+    parser.add_argument("--concurrency", type=int, default=50, help="виртуальных пользователей / соединений")
+    parser.add_argument("--customers", type=int, default=100, help="заказчиков при подготовке")
+    parser.add_argument("--couriers", type=int, default=30, help="курьеров при подготовке")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"по умолчанию {DEFAULT_MIX}")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--report", type=Path, help="куда записать JSON-отчёт")
+    parser.add_argument("--baseline", type=Path, help="эталонный отчёт для сравнения")
+    parser.add_argument("--threshold", type=float, default=0.2, help="допустимое ухудшение (доля)")
+    parser.add_argument("--save-baseline", nargs="?", type=Path, const=DEFAULT_BASELINE,
+                        help=f"записать отчёт как эталон (по умолчанию {DEFAULT_BASELINE.name})")
+    args = parser.parse_args()
+    if args.concurrency < 1 or args.customers < 1 or args.couriers < 1:
+        parser.error("--concurrency, --customers и --couriers должны быть ≥ 1")
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    print(text)
+    for path in filter(None, (args.report, args.save_baseline)):
+        path.write_text(text + "\n", encoding="utf-8")
+
+    if args.baseline is not None:
+        regressions = compare(report, json.loads(args.baseline.read_text(encoding="utf-8")), args.threshold)
+        if regressions:
+            print(f"Регрессии относительно {args.baseline} (порог {args.threshold:.0%}):", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            sys.exit(1)
+        print(f"Регрессий относительно {args.baseline} нет (порог {args.threshold:.0%}).", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Проверка планов запросов ленты и поиска GET /orders: используются ли индексы из миграций.
+
+Замена тесту планов запросов: pytest и тестовой БД в репозитории нет, поэтому проверка —
+скрипт с кодом выхода, который можно запускать в CI против одноразовой БД.
+
+    cd backend && python -m bench.query_plans --allow-truncate
+    python -m bench.query_plans --orders 500000 --report plans.json   # БД с именем *_bench / *_test
+
+В ОДНОЙ транзакции: truncate_all, bulk_fill с фиксированным seed, ANALYZE, затем для
+каждого кейса EXPLAIN (FORMAT JSON) запроса, собранного OrderRepository._search_stmt
+(тот же SQL, что у search), с параметрами, подставленными литералами; в конце ROLLBACK.
+Данные не остаются, но TRUNCATE держит ACCESS EXCLUSIVE на все таблицы данных до конца
+прогона — приложение на этой БД стоит. Поэтому скрипт запускается только на одноразовой
+БД: её имя оканчивается на THROWAWAY_DB_SUFFIXES, либо явно передан --allow-truncate.
+
+Кейс проходит, если в плане есть хотя бы один из ожидаемых индексов. Дополнительно
+проверяется, что все ожидаемые индексы есть в БД, а удалённых миграциями — нет.
+Печатает JSON-отчёт (индексы и корневой узел плана по кейсам); код выхода 1 — есть провалы.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import text
+
+from app.config import settings
+from app.infrastructure.bulk_seed import BulkSeedParams, bulk_fill, truncate_all
+from app.infrastructure.database import async_session, engine, init_db
+from app.infrastructure.persistence import OrderRepository
+
+SEED = 42
+ORDERS = 200_000
+THROWAWAY_DB_SUFFIXES = ("_bench", "_test")
+# Удалены миграциями (шаги 8 и 10) — в БД их быть не должно.
+DROPPED_INDEXES = ("ix_orders_not_expired", "ix_orders_new_date_when")
+
+
+@dataclass
+class Case:
+    name: str
+    filters: dict
+    indexes: tuple[str, ...]  # достаточно любого из них
+    limit: int = 50
+
+
+@dataclass
+class Plan:
+    indexes: list[str] = field(default_factory=list)
+    nodes: list[str] = field(default_factory=list)
+
+
+def _walk(node: dict, plan: Plan) -> None:
+    plan.nodes.append(node["Node Type"])
+    if "Index Name" in node:
+        plan.indexes.append(node["Index Name"])
+    for child in node.get("Plans", ()):
+        _walk(child, plan)
+
+
+def _cases(customer_id: int, cursor: tuple[datetime, int]) -> list[Case]:
+    today = datetime.now(ZoneInfo(settings.order_expiry_timezone)).date()
+    return [
+        Case("лента: sort=created_at", {"order_by": "created_at"}, ("ix_orders_created_at_id",)),
+        Case("лента: sort=created_at, следующая страница", {"order_by": "created_at", "after": cursor},
+             ("ix_orders_created_at_id",)),
+        Case("лента: status=active, sort=date_when", {"statuses": ["active"], "order_by": "date_when"},
+             ("ix_orders_active_date_when", "ix_orders_status_date_when")),
+        Case("доска: статусы + неделя, sort=date_when",
+             {"statuses": ["active", "completed"], "date_from": today, "date_to": today + timedelta(days=7),
+              "order_by": "date_when"},
+             ("ix_orders_status_date_when", "ix_orders_date_when_id", "ix_orders_active_date_when")),
+        Case("only_own: заказы заказчика, sort=created_at", {"customer_id": customer_id, "order_by": "created_at"},
+             ("ix_orders_customer_id_created_at",)),
+        Case("поиск по месту", {"place": "ул. Ленина, д. 137"},
+             ("ix_orders_where_from_trgm", "ix_orders_where_to_trgm")),
+        Case("поиск по имени заказчика", {"customer_name": "Иван Петров"}, ("ix_accounts_name_trgm",)),
+    ]
+
+
+async def _explain(session, repo: OrderRepository, case: Case) -> Plan:
+    stmt = repo._search_stmt(limit=case.limit, **case.filters)
+    sql = str(stmt.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+    raw = (await session.execute(text("EXPLAIN (FORMAT JSON) " + sql))).scalar_one()
+    document = json.loads(raw) if isinstance(raw, str) else raw
+    plan = Plan()
+    _walk(document[0]["Plan"], plan)
+    return plan
+
+
+async def run(orders: int) -> dict:
+    async with async_session() as session:
+        try:
+            await truncate_all(session)
+            await bulk_fill(session, BulkSeedParams(accounts=max(100, orders // 10), orders=orders, reviews=0, seed=SEED))
+            await session.execute(text("ANALYZE accounts, customers, couriers, orders"))
+            customer_id = (await session.execute(
+                text("SELECT customer_id FROM orders GROUP BY customer_id ORDER BY count(*) DESC LIMIT 1")
+            )).scalar_one()
+            cursor = tuple((await session.execute(
+                text("SELECT created_at, id FROM orders ORDER BY created_at DESC, id DESC OFFSET 1000 LIMIT 1")
+            )).one())
+
+            cases = _cases(customer_id, cursor)
+            existing = set((await session.execute(
+                text("SELECT indexname FROM pg_indexes WHERE schemaname = current_schema()")
+            )).scalars())
+            expected = sorted({name for case in cases for name in case.indexes})
+            failures = [f"индекса {name} нет в БД" for name in expected if name not in existing]
+            failures += [f"индекс {name} должен быть удалён миграцией" for name in DROPPED_INDEXES if name in existing]
+
+            repo = OrderRepository(session)
+            results = []
+            for case in cases:
+                plan = await _explain(session, repo, case)
+                ok = any(name in plan.indexes for name in case.indexes)
+                if not ok:
+                    failures.append(f"{case.name}: ожидался один из {', '.join(case.indexes)}")
+                results.append({"case": case.name, "ok": ok, "indexes": plan.indexes, "nodes": plan.nodes})
+            return {"orders": orders, "cases": results, "failures": failures}
+        finally:
+            await session.rollback()
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench.query_plans", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--orders", type=int, default=ORDERS, help="заказов в наборе данных")
+    parser.add_argument("--report", type=Path, help="куда записать JSON-отчёт")
+    parser.add_argument("--allow-truncate", action="store_true",
+                        help="БД одноразовая: можно блокировать таблицы на время прогона")
+    args = parser.parse_args()
+    database = engine.url.database or ""
+    if not args.allow_truncate and not database.endswith(THROWAWAY_DB_SUFFIXES):
+        print(f"БД {database!r} не похожа на одноразовую (имя не оканчивается на "
+              f"{', '.join(THROWAWAY_DB_SUFFIXES)}): TRUNCATE заблокирует её таблицы на время прогона. "
+              "Запустите на отдельной БД или передайте --allow-truncate.", file=sys.stderr)
+        return 2
+
+    await init_db()
+    try:
+        report = await run(args.orders)
+    finally:
+        await engine.dispose()
+    output = json.dumps(report, ensure_ascii=False, indent=2, default=str)
+    print(output)
+    if args.report is not None:
+        args.report.write_text(output + "\n", encoding="utf-8")
+    return 1 if report["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
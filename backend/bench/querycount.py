@@ -0,0 +1,27 @@
+"""Подсчёт SQL-запросов, отправленных движком (события before_cursor_execute)."""
+
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+class QueryCounter:
+    def __init__(self) -> None:
+        self.count = 0
+        self.statements: list[str] = []
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        self.count += 1
+        self.statements.append(statement)
+
+
+@contextmanager
+def count_queries(engine: AsyncEngine):
+    """with count_queries(engine) as qc: ... → qc.count — число запросов внутри блока."""
+    counter = QueryCounter()
+    event.listen(engine.sync_engine, "before_cursor_execute", counter._on_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", counter._on_execute)
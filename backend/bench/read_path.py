@@ -0,0 +1,79 @@
+"""
+Чтение страницы из 10k заказов: ORM-объекты → сущность против Core-строк → сущность.
+
+    cd backend && python -m bench.read_path
+
+Строки вставляются в транзакции, которая откатывается. Печатает rows/s и пик памяти
+(tracemalloc) на путь, включая OrderRead.model_validate — как в эндпоинте.
+"""
+
+import asyncio
+import json
+import time
+import tracemalloc
+from datetime import date
+
+from sqlalchemy import insert, select
+
+from app.api.dto.order import OrderRead
+from app.infrastructure.database import async_session, engine, init_db
+from app.infrastructure.persistence import AccountModel, CustomerModel, OrderModel, OrderRepository
+
+PAGE = 10_000
+ROUNDS = 5
+
+
+async def _seed(session) -> None:
+    account_id = (await session.execute(
+        insert(AccountModel).values(name="bench", phone=f"b{time.time_ns()}"[:20], password="x")
+        .returning(AccountModel.id)
+    )).scalar_one()
+    customer_id = (await session.execute(
+        insert(CustomerModel).values(phone="bench", account_id=account_id).returning(CustomerModel.id)
+    )).scalar_one()
+    await session.execute(insert(OrderModel), [
+        {"where_to": f"to {i}", "where_from": f"from {i}", "price": 0.0, "status": "active",
+         "date_when": date.today(), "customer_id": customer_id}
+        for i in range(PAGE)
+    ])
+
+
+async def _orm_page(session, repo: OrderRepository) -> list[OrderRead]:
+    result = await session.execute(select(OrderModel).limit(PAGE))
+    page = [OrderRead.model_validate(repo._to_entity(m)) for m in result.scalars().all()]
+    session.expunge_all()
+    return page
+
+
+async def _core_page(session, repo: OrderRepository) -> list[OrderRead]:
+    return [OrderRead.model_validate(e) for e in await repo.get_all(limit=PAGE)]
+
+
+async def _measure(name: str, fetch) -> dict:
+    best = float("inf")
+    tracemalloc.start()
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        rows = await fetch()
+        best = min(best, time.perf_counter() - started)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"case": name, "rows": len(rows), "rows_per_sec": int(len(rows) / best), "peak_mib": round(peak / 2**20, 1)}
+
+
+async def main() -> None:
+    await init_db()
+    async with async_session() as session:
+        await _seed(session)
+        repo = OrderRepository(session)
+        results = [
+            await _measure("ORM hydration", lambda: _orm_page(session, repo)),
+            await _measure("Core projection", lambda: _core_page(session, repo)),
+        ]
+        await session.rollback()
+    await engine.dispose()
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,228 @@
+"""
+Микробенчмарки репозиториев и сервисов на фиксированных наборах данных (1k / 100k / 1M заказов).
+
+    cd backend && python -m bench.repositories
+    python -m bench.repositories --sizes 1000,100000 --rounds 50 --report bench-repos.json
+
+Для каждого размера в ОДНОЙ транзакции: truncate_all, bulk_fill с фиксированным seed,
+ANALYZE, затем кейсы; в конце ROLLBACK — данные в БД не остаются. TRUNCATE берёт
+эксклюзивные блокировки таблиц на время прогона: запускать на отдельной БД, не на
+работающем приложении.
+
+Кейс вызывает метод репозитория или сервиса напрямую (без HTTP). Изменяющие кейсы
+выполняются в SAVEPOINT, который откатывается после вызова, — каждый вызов видит
+одни и те же данные; SAVEPOINT в замер не входит. На кейс: запросов на вызов
+(count_queries), p50 и среднее время вызова, пик памяти Python на вызов (tracemalloc,
+отдельным проходом — трассировка искажает время). Кейсы с «+ OrderRead» добавляют
+сериализацию, как в эндпоинте: разница с тем же кейсом без неё — цена Pydantic.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+import tracemalloc
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import text
+
+from app.api.dto.order import OrderRead
+from app.application.account.service import AccountService
+from app.application.order.service import OrderService
+from app.config import settings
+from app.domain.order.entity import OPEN_ORDER_STATUSES, Order
+from app.infrastructure.bulk_seed import BulkSeedParams, bulk_fill, truncate_all
+from app.infrastructure.database import async_session, engine, init_db
+from app.infrastructure.persistence import AccountRepository, OrderRepository
+from bench.querycount import count_queries
+
+SIZES = (1_000, 100_000, 1_000_000)
+SEED = 42
+ALLOC_ROUNDS = 20
+EXPIRE_LIMIT = 1000
+
+
+@dataclass
+class Case:
+    name: str
+    call: Callable[[int], Awaitable[object]]
+    mutates: bool = False
+
+
+def dataset_params(orders: int) -> BulkSeedParams:
+    """Фиксированный набор данных на orders заказов (воспроизводим по SEED)."""
+    return BulkSeedParams(
+        accounts=min(10_000, max(100, orders // 100)),
+        orders=orders,
+        reviews=orders // 10,
+        seed=SEED,
+    )
+
+
+async def _measure(session, case: Case, rounds: int) -> dict:
+    times: list[float] = []
+    queries = 0
+    with count_queries(engine) as qc:
+        for i in range(rounds):
+            savepoint = await session.begin_nested() if case.mutates else None
+            before = qc.count
+            started = time.perf_counter()
+            await case.call(i)
+            times.append(time.perf_counter() - started)
+            queries += qc.count - before
+            if savepoint is not None:
+                await savepoint.rollback()
+
+    peaks: list[int] = []
+    tracemalloc.start()
+    try:
+        for i in range(min(rounds, ALLOC_ROUNDS)):
+            savepoint = await session.begin_nested() if case.mutates else None
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            await case.call(i)
+            peaks.append(tracemalloc.get_traced_memory()[1] - base)
+            if savepoint is not None:
+                await savepoint.rollback()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "case": case.name,
+        "queries_per_call": round(queries / rounds, 2),
+        "ms_p50": round(statistics.median(times) * 1000, 3),
+        "ms_mean": round(statistics.fmean(times) * 1000, 3),
+        "peak_kib_per_call": round(statistics.fmean(peaks) / 1024, 1),
+    }
+
+
+def _cases(
+    session, size: int, customer_id: int, account_id: int, courier_id: int, free_ids: list[int]
+) -> list[Case]:
+    orders = OrderRepository(session)
+    accounts = AccountRepository(session)
+    account_service = AccountService(accounts)
+    service = OrderService(orders, account_service)  # без кэша поиска: меряем запросы, а не попадания
+    rng = random.Random(SEED)
+    order_ids = [rng.randint(1, size) for _ in range(1000)]
+    today = datetime.now(ZoneInfo(settings.order_expiry_timezone)).date()
+    week = today + timedelta(days=7)
+    active = list(OPEN_ORDER_STATUSES)
+
+    def search(**filters) -> Callable[[int], Awaitable[object]]:
+        return lambda i: orders.search(limit=50, **filters)
+
+    def search_read(**filters) -> Callable[[int], Awaitable[object]]:
+        async def call(i: int) -> list[OrderRead]:
+            return [OrderRead.model_validate(o) for o in await orders.search(limit=50, **filters)]
+        return call
+
+    def new_order() -> Order:
+        now = datetime.now()
+        return Order(id=0, where_to="ул. Ленина, д. 1", where_from="пр. Мира, д. 2", price=0.0, status="active",
+                     date_when=today, customer_id=customer_id, courier_id=None, information=None,
+                     created_at=now, updated_at=now)
+
+    async def save(i: int) -> Order:
+        order = await orders.get_by_id(order_ids[i % len(order_ids)])
+        order.update(price=float(i + 1))
+        return await orders.save(order)
+
+    deep_skip = min(10_000, max(0, size - 50))
+    return [
+        Case("OrderRepository.get_by_id", lambda i: orders.get_by_id(order_ids[i % len(order_ids)])),
+        Case("OrderRepository.search: без фильтров", search()),
+        Case("OrderRepository.search: без фильтров + OrderRead", search_read()),
+        Case("OrderRepository.search: status=active", search(statuses=active)),
+        Case("OrderRepository.search: status=active, неделя", search(statuses=active, date_from=today, date_to=week)),
+        Case("OrderRepository.search: place", search(place="Ленина")),
+        Case("OrderRepository.search: customer_name", search(customer_name="Иван")),
+        Case("OrderRepository.search: customer_id (only_own)", search(customer_id=customer_id)),
+        Case("OrderRepository.search: sort=date_when", search(statuses=active, order_by="date_when")),
+        Case("OrderRepository.search: sort=created_at + курсор",
+             search(order_by="created_at", after=(datetime.now(timezone.utc) - timedelta(days=15), size // 2))),
+        Case(f"OrderRepository.search: OFFSET {deep_skip}", search(skip=deep_skip)),
+        Case(f"OrderRepository.search: OFFSET {deep_skip} + OrderRead", search_read(skip=deep_skip)),
+        Case("OrderRepository.add", lambda i: orders.add(new_order()), mutates=True),
+        Case("OrderRepository.get_by_id + save", save, mutates=True),
+        Case("OrderRepository.add_with_balance_deduction",
+             lambda i: orders.add_with_balance_deduction(new_order(), account_id, 100), mutates=True),
+        Case(f"OrderRepository.expire_due_batch (limit {EXPIRE_LIMIT})",
+             lambda i: orders.expire_due_batch(today, OPEN_ORDER_STATUSES, EXPIRE_LIMIT), mutates=True),
+        Case(f"OrderRepository.expire_from_queue (limit {EXPIRE_LIMIT})",
+             lambda i: orders.expire_from_queue(
+                 datetime.now(ZoneInfo(settings.order_expiry_timezone)), today, OPEN_ORDER_STATUSES, EXPIRE_LIMIT),
+             mutates=True),
+        Case("AccountRepository.try_deduct_balance", lambda i: accounts.try_deduct_balance(account_id, 100),
+             mutates=True),
+        Case("AccountService.deduct_balance", lambda i: account_service.deduct_balance(account_id, 100),
+             mutates=True),
+        Case("OrderService.search: status=active, неделя",
+             lambda i: service.search(limit=50, statuses=active, date_from=today, date_to=week)),
+        Case("OrderService.create_with_balance_deduction",
+             lambda i: service.create_with_balance_deduction(
+                 account_id=account_id, where_to="ул. Ленина, д. 1", where_from="пр. Мира, д. 2",
+                 date_when=today, customer_id=customer_id, deduction_amount=100, status="active"),
+             mutates=True),
+        Case("OrderService.update (date_when)",
+             lambda i: service.update(order_ids[i % len(order_ids)], date_when=week), mutates=True),
+        Case("OrderService.accept",
+             lambda i: service.accept(free_ids[i % len(free_ids)], courier_id), mutates=True),
+    ]
+
+
+async def run_size(size: int, rounds: int) -> dict:
+    async with async_session() as session:
+        try:
+            await truncate_all(session)
+            seeded = await bulk_fill(session, dataset_params(size))
+            await session.execute(text("ANALYZE accounts, customers, couriers, orders, order_expiry_queue, reviews"))
+            customer_id, account_id = (await session.execute(
+                text("SELECT id, account_id FROM customers ORDER BY id LIMIT 1")
+            )).one()
+            courier_id = (await session.execute(text("SELECT id FROM couriers ORDER BY id LIMIT 1"))).scalar_one()
+            # accept — только по свободным открытым заказам (занятый — ValueError).
+            free_ids = list((await session.execute(
+                text("SELECT id FROM orders WHERE status = 'active' AND courier_id IS NULL ORDER BY id LIMIT 1000")
+            )).scalars())
+            # Списания в кейсах не должны упираться в баланс.
+            await session.execute(text("UPDATE accounts SET balance = 1e12 WHERE id = :id"), {"id": account_id})
+
+            results = []
+            for case in _cases(session, size, customer_id, account_id, courier_id, free_ids):
+                results.append(await _measure(session, case, rounds))
+                session.expunge_all()
+            return {"orders": size, "seed_seconds": seeded["seconds"], "cases": results}
+        finally:
+            await session.rollback()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m bench.repositories", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)), help="размеры наборов (заказов) через запятую")
+    parser.add_argument("--rounds", type=int, default=100, help="вызовов на кейс")
+    parser.add_argument("--report", type=Path, help="куда записать JSON-отчёт")
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+
+    await init_db()
+    try:
+        report = {"rounds": args.rounds, "date": date.today().isoformat(), "sizes": []}
+        for size in sizes:
+            report["sizes"].append(await run_size(size, args.rounds))
+    finally:
+        await engine.dispose()
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    print(output)
+    if args.report is not None:
+        args.report.write_text(output + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
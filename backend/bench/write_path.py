@@ -0,0 +1,99 @@
+"""
+Запросов на одну запись: старый путь (SELECT + flush + refresh) против RETURNING.
+
+    cd backend && python -m bench.write_path
+
+Работает в транзакции, которая откатывается, — данные в БД не остаются.
+"""
+
+import asyncio
+import json
+import time
+from datetime import date, datetime
+
+from sqlalchemy import select
+
+from app.domain.account.entity import Account
+from app.domain.customer.entity import Customer
+from app.domain.order.entity import Order
+from app.infrastructure.database import async_session, engine, init_db
+from app.infrastructure.persistence import AccountRepository, CustomerRepository, OrderModel, OrderRepository
+from bench.querycount import count_queries
+
+ROUNDS = 200
+
+
+async def _legacy_add(session, order: Order) -> None:
+    model = OrderModel(
+        where_to=order.where_to,
+        where_from=order.where_from,
+        price=order.price,
+        status=order.status,
+        date_when=order.date_when,
+        customer_id=order.customer_id,
+    )
+    session.add(model)
+    await session.flush()
+    await session.refresh(model)
+
+
+async def _legacy_save(session, orders: OrderRepository, order_id: int, price: float) -> None:
+    await orders.get_by_id(order_id)  # как в OrderService.update
+    result = await session.execute(select(OrderModel).where(OrderModel.id == order_id))
+    model = result.scalar_one()
+    model.price = price
+    await session.flush()
+    await session.refresh(model)
+
+
+async def _measure(name: str, make_call) -> dict:
+    with count_queries(engine) as qc:
+        started = time.perf_counter()
+        for i in range(ROUNDS):
+            await make_call(i)
+        elapsed = time.perf_counter() - started
+    return {
+        "case": name,
+        "queries_per_call": qc.count / ROUNDS,
+        "ms_per_call": round(elapsed * 1000 / ROUNDS, 3),
+    }
+
+
+async def main() -> None:
+    await init_db()
+    now = datetime.now()
+    async with async_session() as session:
+        accounts = AccountRepository(session)
+        account = await accounts.add(
+            Account(id=0, name="bench", phone=f"bench-{time.time_ns()}"[:20], password="x",
+                    balance=100.0, created_at=now, updated_at=now)
+        )
+        customer = await CustomerRepository(session).add(
+            Customer(id=0, phone="bench", description=None, account_id=account.id, created_at=now, updated_at=now)
+        )
+        orders = OrderRepository(session)
+
+        def new_order() -> Order:
+            return Order(id=0, where_to="A", where_from="B", price=0.0, status="active", date_when=date.today(),
+                         customer_id=customer.id, courier_id=None, information=None, created_at=now, updated_at=now)
+
+        order = await orders.add(new_order())
+
+        async def returning_save(i: int) -> None:
+            entity = await orders.get_by_id(order.id)
+            entity.update(price=float(i + 1))
+            await orders.save(entity)
+
+        results = [
+            await _measure("POST order: legacy add", lambda i: _legacy_add(session, new_order())),
+            await _measure("POST order: RETURNING add", lambda i: orders.add(new_order())),
+            await _measure("PATCH order: legacy get + save", lambda i: _legacy_save(session, orders, order.id, float(i + 1))),
+            await _measure("PATCH order: get_by_id + RETURNING save", returning_save),
+        ]
+        await session.rollback()
+    await engine.dispose()
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -7,8 +7,15 @@ _backend_root = Path(__file__).resolve().parent.parent
 if str(_backend_root) not in sys.path:
     sys.path.insert(0, str(_backend_root))
 
+import functools
+from collections.abc import Callable, Coroutine
+from typing import Any
+
 from celery import Celery
 
+from worker.db import get_runtime
+import worker.metrics  # noqa: F401  (сигналы: длительность задач → Redis)
+
 
 celery_app = Celery(
     "mng_grab_worker",
@@ -21,10 +28,31 @@ celery_app.conf.update(
     timezone="Europe/Moscow",
     enable_utc=True,
     beat_schedule={
-        "expire-orders-every-5-minutes": {
+        # Истечение по очереди order_expiry_queue: работа пропорциональна числу наступивших заказов.
+        "dispatch-order-expiry-every-minute": {
+            "task": "worker.tasks.orders.dispatch_order_expiry",
+            "schedule": 60.0,
+        },
+        # Страховочный проход по индексу открытых заказов.
+        "expire-orders-every-hour": {
             "task": "worker.tasks.orders.expire_orders",
-            "schedule": 300.0,
+            "schedule": 3600.0,
         },
     },
 )
 
+
+def async_task(*task_args, **task_kwargs) -> Callable[[Callable[..., Coroutine[Any, Any, Any]]], Any]:
+    """
+    Celery-задача из async def: корутина выполняется в event loop процесса воркера
+    (worker.db.WorkerRuntime) и пользуется его пулом соединений.
+    """
+
+    def decorator(fn: Callable[..., Coroutine[Any, Any, Any]]):
+        @functools.wraps(fn)
+        def run(*args, **kwargs):
+            return get_runtime().run(fn(*args, **kwargs))
+
+        return celery_app.task(*task_args, **task_kwargs)(run)
+
+    return decorator
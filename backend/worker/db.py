@@ -1,28 +1,87 @@
 """
-Сессия БД для Celery-задач.
+Async-рантайм процесса Celery-воркера: один event loop и один пул соединений.
 
-В задачах мы вызываем asyncio.run(coro), поэтому каждый запуск создаёт новый event loop.
-Глобальные engine/async_session из app.infrastructure.database создаются при импорте
-и оказываются привязаны к другому loop → "Future attached to a different loop".
+Loop и engine создаются при старте дочернего процесса (worker_process_init) и живут,
+пока он жив: задачи выполняются в этом loop (run), соединения берутся из общего пула
+и переживают отдельные задачи. При остановке процесса (worker_process_shutdown) пул
+закрывается, loop — тоже. Если сигнала не было (пул solo, beat, вызов задачи напрямую),
+рантайм создаётся при первом обращении.
 
-Фабрика создаёт engine и сессию внутри корутины задачи, в текущем loop.
+Асинхронные задачи объявляются через worker.celery.async_task.
 """
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+import asyncio
+import logging
+from collections.abc import Coroutine
+from typing import Any, TypeVar
 
+from celery.signals import worker_process_init, worker_process_shutdown, worker_shutdown
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 
-def get_session_factory():
-    """
-    Создать фабрику сессий в текущем event loop.
-    Вызывать из async-функции задачи (внутри asyncio.run(...)).
-    """
-    from app.config import settings
+logger = logging.getLogger(__name__)
 
-    engine = create_async_engine(settings.database_url, echo=False)
-    return async_sessionmaker(
-        engine,
-        class_=AsyncSession,
-        expire_on_commit=False,
-        autocommit=False,
-        autoflush=False,
-    )
+T = TypeVar("T")
+
+
+class WorkerRuntime:
+    """Event loop и engine одного процесса воркера."""
+
+    def __init__(self) -> None:
+        from app.config import settings
+        from app.infrastructure.pool import engine_options
+        from app.infrastructure.sql_stats import instrument_engine
+
+        self.loop = asyncio.new_event_loop()
+        self.engine: AsyncEngine = create_async_engine(settings.database_url, **engine_options("worker"))
+        instrument_engine(self.engine)  # лог медленных запросов задач
+        self.session_factory = async_sessionmaker(
+            self.engine,
+            class_=AsyncSession,
+            expire_on_commit=False,
+            autocommit=False,
+            autoflush=False,
+        )
+
+    def run(self, coro: Coroutine[Any, Any, T]) -> T:
+        """Выполнить корутину задачи в loop процесса."""
+        return self.loop.run_until_complete(coro)
+
+    def close(self) -> None:
+        try:
+            self.loop.run_until_complete(self.engine.dispose())
+            self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+        finally:
+            self.loop.close()
+
+
+_runtime: WorkerRuntime | None = None
+
+
+def get_runtime() -> WorkerRuntime:
+    global _runtime
+    if _runtime is None:
+        _runtime = WorkerRuntime()
+    return _runtime
+
+
+def get_session_factory() -> async_sessionmaker[AsyncSession]:
+    """Фабрика сессий на пуле процесса. Вызывать из корутины, выполняемой через get_runtime().run."""
+    return get_runtime().session_factory
+
+
+@worker_process_init.connect
+def _start_runtime(**kwargs) -> None:
+    # Пул, унаследованный при fork от родителя, дочернему процессу не годится — создаём свой.
+    global _runtime
+    _runtime = WorkerRuntime()
+    logger.info("worker runtime: loop и пул соединений созданы")
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect  # пул solo: задачи шли в главном процессе
+def _stop_runtime(**kwargs) -> None:
+    global _runtime
+    if _runtime is not None:
+        _runtime.close()
+        _runtime = None
+        logger.info("worker runtime: пул соединений закрыт")
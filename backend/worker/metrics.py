@@ -0,0 +1,42 @@
+"""
+Длительность задач воркера → Redis (см. app.infrastructure.worker_metrics), оттуда — в /metrics API.
+
+task_prerun запоминает время старта, task_postrun пишет длительность и состояние
+(SUCCESS / FAILURE / ...); для задач истечения — ещё и число истёкших заказов из результата.
+"""
+
+import time
+
+from celery.signals import task_postrun, task_prerun
+from redis import Redis
+
+_started: dict[str, float] = {}
+_client: Redis | None = None
+
+
+def _redis() -> Redis:
+    global _client
+    if _client is None:
+        from app.config import settings
+
+        _client = Redis.from_url(settings.redis_url, socket_timeout=1, socket_connect_timeout=1)
+    return _client
+
+
+@task_prerun.connect
+def _task_started(task_id: str, **kwargs) -> None:
+    _started[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def _task_finished(task_id: str, task, retval=None, state: str | None = None, **kwargs) -> None:
+    started = _started.pop(task_id, None)
+    if started is None:
+        return
+    from app.config import settings
+    from app.infrastructure.worker_metrics import record_task
+
+    if not settings.worker_metrics_enabled:
+        return
+    expired = retval.get("expired") if isinstance(retval, dict) else None
+    record_task(_redis(), task.name.rsplit(".", 1)[-1], state or "UNKNOWN", time.perf_counter() - started, expired)
@@ -1,65 +1,116 @@
-import asyncio
+import logging
 import sys
+import time
+from datetime import datetime
 from pathlib import Path
+from zoneinfo import ZoneInfo
 
 # Корень backend в PYTHONPATH (в форк-воркере celery путь может быть не задан)
 _backend_root = Path(__file__).resolve().parent.parent.parent
 if str(_backend_root) not in sys.path:
     sys.path.insert(0, str(_backend_root))
 
-from worker.celery import celery_app
+from worker.celery import async_task
 from worker.db import get_session_factory
 
+logger = logging.getLogger(__name__)
 
-@celery_app.task
-def print_orders() -> None:
+
+@async_task()
+async def print_orders() -> None:
+    """Периодическая задача: печатает список заказов."""
+    from app.infrastructure.persistence.order_repository import OrderRepository
+    from app.application.order.service import OrderService
+
+    async with get_session_factory()() as session:
+        repo = OrderRepository(session)
+        service = OrderService(repo)
+        orders = await service.get_all()
+
+        # Просто печатаем в stdout — будет видно в логах celery beat/worker
+        print("=== Orders list ===")
+        if not orders:
+            print("No orders found")
+        else:
+            for o in orders:
+                print(
+                    f"[{o.id}] {o.status} {o.where_from} -> {o.where_to} "
+                    f"price={o.price} customer_id={o.customer_id} courier_id={o.courier_id}"
+                )
+        print("===================")
+
+
+async def _expire_in_batches(task: str, expire_batch) -> dict:
     """
-    Периодическая задача: каждые 10 секунд печатает список заказов.
-    Используем asyncio.run, чтобы вызвать асинхронные репозитории.
+    Общий цикл истечения: expire_batch(repo, batch_size) → (обработано, id истёкших),
+    каждая пачка — отдельная транзакция; цикл идёт, пока пачки полные.
+    Возвращает метрики прогона: сколько истекло, сколько пачек, сколько секунд.
     """
+    from app.config import settings
+    from app.infrastructure.persistence.order_repository import OrderRepository
 
-    async def _print() -> None:
-        from app.infrastructure.persistence.order_repository import OrderRepository
-        from app.application.order.service import OrderService
-
-        session_factory = get_session_factory()
-        async with session_factory() as session:
+    batch_size = settings.order_expiry_batch_size
+    started = time.monotonic()
+    expired = batches = 0
+    while True:
+        async with get_session_factory()() as session:
             repo = OrderRepository(session)
-            service = OrderService(repo)
-            orders = await service.get_all()
-
-            # Просто печатаем в stdout — будет видно в логах celery beat/worker
-            print("=== Orders list ===")
-            if not orders:
-                print("No orders found")
-            else:
-                for o in orders:
-                    print(
-                        f"[{o.id}] {o.status} {o.where_from} -> {o.where_to} "
-                        f"price={o.price} customer_id={o.customer_id} courier_id={o.courier_id}"
-                    )
-            print("===================")
-
-    asyncio.run(_print())
-
-
-@celery_app.task
-def expire_orders() -> None:
+            processed, ids = await expire_batch(repo, batch_size)
+            if ids:
+                await repo.publish_event("expired", count=len(ids))
+            await session.commit()
+        if not processed:
+            break
+        expired += len(ids)
+        batches += 1
+        logger.info("%s: пачка %s, истекло %s (всего %s)", task, batches, len(ids), expired)
+        if processed < batch_size:
+            break
+    seconds = time.monotonic() - started
+    logger.info(
+        "%s: истекло %s заказов, пачек %s, %.2f с (%.0f заказов/с)",
+        task, expired, batches, seconds, expired / seconds if seconds else 0.0,
+    )
+    return {"expired": expired, "batches": batches, "seconds": round(seconds, 3)}
+
+
+def _now() -> datetime:
+    from app.config import settings
+
+    return datetime.now(ZoneInfo(settings.order_expiry_timezone))
+
+
+@async_task()
+async def dispatch_order_expiry() -> dict:
     """
-    Каждые 5 минут помечаем заказы как 'expired',
-    если у них ещё не такой статус.
+    Каждую минуту: разобрать наступившие записи order_expiry_queue (ставятся при создании
+    заказа и смене date_when/статуса) и истечь ровно эти заказы, если они всё ещё открыты.
     """
+    from app.domain.order.entity import OPEN_ORDER_STATUSES
 
-    async def _expire() -> None:
-        from app.infrastructure.persistence.order_repository import OrderRepository
+    now = _now()
 
-        session_factory = get_session_factory()
-        async with session_factory() as session:
-            repo = OrderRepository(session)
-            # Один запрос UPDATE — без цикла, чтобы не было "another operation is in progress"
-            updated = await repo.bulk_set_status_where_not("expired", "expired")
-            await session.commit()
-            print(f"[expire_orders] updated {updated} orders to 'expired'")
+    async def batch(repo, limit: int) -> tuple[int, list[int]]:
+        return await repo.expire_from_queue(now, now.date(), OPEN_ORDER_STATUSES, limit)
+
+    return await _expire_in_batches("dispatch_order_expiry", batch)
+
+
+@async_task()
+async def expire_orders() -> dict:
+    """
+    Раз в час, страховка к очереди: открытые заказы с прошедшей датой (date_when < сегодня),
+    которые в очередь не попали (например, записаны в БД в обход OrderService) → 'expired'.
+
+    Пачками по order_expiry_batch_size, каждая — отдельная транзакция (короткие блокировки,
+    занятые строки пропускаются через SKIP LOCKED). Завершённые и отменённые заказы не трогаются.
+    """
+    from app.domain.order.entity import OPEN_ORDER_STATUSES
+
+    today = _now().date()
 
-    asyncio.run(_expire())
+    async def batch(repo, limit: int) -> tuple[int, list[int]]:
+        ids = await repo.expire_due_batch(today, OPEN_ORDER_STATUSES, limit)
+        return len(ids), ids
 
+    return await _expire_in_batches("expire_orders", batch)